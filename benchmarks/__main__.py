@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+from . import cases
+from . import runner
+from . import stats
+
+"""The default file of the baseline results."""
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+            description="Run the smplayer benchmarks and compare their results.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("-k", "--filter", metavar="PATTERN",
+            help="only run the benchmarks whose names match the shell-style PATTERN")
+    run.add_argument("-r", "--repeat", type=int, default=5, metavar="N",
+            help="time every benchmark N times (default: 5)")
+    run.add_argument("--quick", action="store_true",
+            help="use smaller workloads")
+    run.add_argument("-o", "--output", metavar="FILE",
+            help="save the results to FILE")
+    run.add_argument("--save-baseline", action="store_true",
+            help="save the results as the baseline ({0})".format(BASELINE))
+
+    compare = commands.add_parser("compare",
+            help="compare results with the baseline and report significant changes")
+    compare.add_argument("results", metavar="results-file",
+            help="results saved with run --output")
+    compare.add_argument("--baseline", default=BASELINE, metavar="FILE",
+            help="the baseline results (default: {0})".format(BASELINE))
+    compare.add_argument("--threshold", type=float, default=0.05, metavar="FRACTION",
+            help="ignore changes smaller than FRACTION of the baseline time (default: 0.05)")
+    return parser.parse_args()
+
+def print_result(name, result):
+    median = statistics.median(result["times"])
+    line = "{0:<42} {1:9.2f} ms {2:8.2f} Mvalues/s".format(name, median * 1000,
+            result["values"] / median / 1e6)
+    if result["bytes"] is not None:
+        line += " {0:8.2f} MB/s".format(result["bytes"] / median / 1e6)
+    line += "  rss {0:.0f} MB, peak alloc {1:.1f} MB, {2} blocks".format(
+            result["peak_rss"] / 1e6, result["alloc_peak"] / 1e6, result["alloc_blocks"])
+    print(line)
+    sys.stdout.flush()
+
+def run(args):
+    if args.repeat < 2:
+        sys.exit("at least 2 repetitions are needed to compare results")
+    results = runner.run_cases(cases.cases(args.quick), args.repeat, args.filter, print_result)
+    if not results["results"]:
+        sys.exit("no benchmarks match {0!r}".format(args.filter))
+    if args.output is not None:
+        runner.save_results(results, args.output)
+    if args.save_baseline:
+        runner.save_results(results, BASELINE)
+
+def print_comparisons(title, comparisons):
+    print(title)
+    for c in comparisons:
+        print("  {0:<42} {1:+7.1%} (t = {2:.1f})".format(c.name, c.ratio - 1, c.t))
+
+def compare(args):
+    try:
+        baseline = runner.load_results(args.baseline)
+        results = runner.load_results(args.results)
+    except (OSError, ValueError) as err:
+        sys.exit(err)
+
+    (slower, faster, comparisons) = stats.compare_results(baseline, results, args.threshold)
+    if not comparisons:
+        sys.exit("the results have no benchmarks in common with the baseline")
+    if faster:
+        print_comparisons("Significantly faster:", faster)
+    if slower:
+        print_comparisons("Significantly slower:", slower)
+        sys.exit(1)
+    print("No significant regressions in {0} benchmarks.".format(len(comparisons)))
+
+def main():
+    args = parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+if __name__ == "__main__":
+    main()
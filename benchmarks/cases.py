@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""The benchmarks and their workloads.
+
+A benchmark is a Case with a name and a setup function. The setup function
+prepares a workload (generating protocols or writing a log, which is not
+timed) and returns a Workload, whose *run* function is the code that is
+timed. *reset* is called before every timed run to undo the effects of the
+previous run (e.g. cached simulation results), outside of the timing.
+
+"""
+
+import collections
+import functools
+import itertools
+import os
+import tempfile
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+from smplayer.core import _vector as vector
+from smplayer.core._generate import PROTOCOL_TAGS
+
+class Case(collections.namedtuple("Case", "name setup")):
+    __slots__ = ()
+    """A benchmark.
+
+    Attributes:
+        name: The name of the benchmark, including its parameters.
+        setup: A function without arguments that returns a Workload.
+
+    """
+
+class Workload(collections.namedtuple("Workload", "run reset values bytes cleanup")):
+    __slots__ = ()
+    """The code timed by a benchmark.
+
+    Attributes:
+        run: The function to time.
+        reset: A function called before every run, or None.
+        values: The number of vector values processed by a run.
+        bytes: The number of bytes of log processed by a run, or None.
+        cleanup: A function called once the benchmark is done, or None.
+
+    """
+
+"""The protocol counts and vector lengths of the full and quick benchmarks."""
+COUNTS = (1000, 10000)
+SIZES = (4, 256)
+QUICK_COUNTS = (200, )
+QUICK_SIZES = (4, 64)
+
+def cases(quick=False):
+    """Returns a list of all Cases, with smaller workloads if *quick* is True."""
+    counts = QUICK_COUNTS if quick else COUNTS
+    sizes = QUICK_SIZES if quick else SIZES
+    result = []
+    for (count, size) in itertools.product(counts, sizes):
+        params = "n={0},size={1}".format(count, size)
+        result.append(Case("parse_log/" + params, functools.partial(_parse_log, count, size)))
+        result.append(Case("SMPlayer.verify/" + params, functools.partial(_player_verify, count, size)))
+        result.append(Case("SMPlayer.hash/" + params, functools.partial(_player_hash, count, size)))
+        for tag in PROTOCOL_TAGS:
+            result.append(Case("{0}._simulate/{1}".format(tag, params),
+                    functools.partial(_simulate, count, size, tag)))
+            result.append(Case("{0}.verify/{1}".format(tag, params),
+                    functools.partial(_verify, count, size, tag)))
+            result.append(Case("{0}.check/{1}".format(tag, params),
+                    functools.partial(_check, count, size, tag)))
+    return result
+
+def _protocols(count, size, tag=None):
+    """Returns *count* protocols of node 0 with vectors of length *size*."""
+    mix = None if tag is None else {tag: 1}
+    generated = smplayer.generate_protocols(count, mix=mix, sizes=(size, size), seed=count + size)
+    return tuple(g.protocols[0] for g in generated)
+
+def count_values(protocols):
+    """Returns the number of values in the vectors of *protocols*."""
+    total = 0
+    def add(v):
+        nonlocal total
+        total += len(v)
+    for p in protocols:
+        for value in (p.input, p.output, getattr(p, "send", None), getattr(p, "recv", None)):
+            if value is not None:
+                vector.map_vectors(add, value)
+    return total
+
+def _clear(protocols):
+    return lambda: [p.clear_cache() for p in protocols]
+
+def _parse_log(count, size):
+    tmpdir = tempfile.TemporaryDirectory()
+    filenames = [os.path.join(tmpdir.name, "audit-{0}.log".format(i)) for i in range(0, 3)]
+    smplayer.write_logs(smplayer.generate_protocols(count, sizes=(size, size), seed=count + size),
+            filenames)
+    values = count_values(parser.parse_log(filenames[0]))
+    return Workload(lambda: parser.parse_log(filenames[0]), None, values,
+            os.path.getsize(filenames[0]), tmpdir.cleanup)
+
+def _player(count, size):
+    player = smplayer.SMPlayer()
+    player.protocols = _protocols(count, size)
+    return player
+
+def _player_verify(count, size):
+    player = _player(count, size)
+    return Workload(player.verify, _clear(player.protocols), count_values(player.protocols),
+            None, None)
+
+def _player_hash(count, size):
+    player = _player(count, size)
+    return Workload(player.hash, None, count_values(player.protocols), None, None)
+
+def _simulate(count, size, tag):
+    protocols = _protocols(count, size, tag)
+    return Workload(lambda: [p._simulate() for p in protocols], None, count_values(protocols),
+            None, None)
+
+def _verify(count, size, tag):
+    protocols = _protocols(count, size, tag)
+    return Workload(lambda: [p.verify() for p in protocols], _clear(protocols),
+            count_values(protocols), None, None)
+
+def _check(count, size, tag):
+    protocols = _protocols(count, size, tag)
+    return Workload(lambda: [p.check() for p in protocols], None,
+            count_values(protocols), None, None)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Running benchmarks and saving their results."""
+
+import concurrent.futures
+import fnmatch
+import gc
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+"""The version of the results file format."""
+RESULTS_VERSION = 1
+
+def run_case(case, repeat):
+    """Runs a benchmark *repeat* times and returns its result as a dict.
+
+    The result contains the wall time of every run, the number of values and
+    bytes processed by a run, the peak RSS of the process (in bytes), and the
+    peak memory allocated during a run and the number of memory blocks still
+    allocated after it, as measured by an additional run with tracemalloc.
+
+    """
+    workload = case.setup()
+    try:
+        if workload.reset:
+            workload.reset()
+        workload.run() # Warm up.
+
+        times = []
+        for i in range(0, repeat):
+            if workload.reset:
+                workload.reset()
+            gc.collect()
+            start = time.perf_counter()
+            workload.run()
+            times.append(time.perf_counter() - start)
+
+        if workload.reset:
+            workload.reset()
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            result = workload.run()
+            (current, peak) = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        blocks = sys.getallocatedblocks() - blocks
+        del result
+    finally:
+        if workload.cleanup:
+            workload.cleanup()
+
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024
+    return {"times": times, "values": workload.values, "bytes": workload.bytes,
+            "peak_rss": rss, "alloc_peak": peak, "alloc_blocks": blocks}
+
+def run_cases(cases, repeat=5, pattern=None, progress=None):
+    """Runs the benchmarks whose names match the shell-style *pattern* (or all
+    of them), each in a fresh worker process, and returns the results as a
+    dict that can be saved with save_results().
+
+    *progress* is called with the name and result of every benchmark.
+
+    """
+    results = {}
+    for case in cases:
+        if pattern is not None and not fnmatch.fnmatch(case.name, pattern):
+            continue
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            result = executor.submit(run_case, case, repeat).result()
+        results[case.name] = result
+        if progress is not None:
+            progress(case.name, result)
+    return {"version": RESULTS_VERSION, "python": platform.python_version(),
+            "machine": platform.machine(), "results": results}
+
+def save_results(results, filename):
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+def load_results(filename):
+    """Loads results saved with save_results().
+
+    Raises:
+        ValueError: If the file does not contain benchmark results.
+
+    """
+    with open(filename) as f:
+        results = json.load(f)
+    if not isinstance(results, dict) or results.get("version") != RESULTS_VERSION:
+        raise ValueError("{0} does not contain benchmark results".format(filename))
+    return results
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Statistics for comparing benchmark results.
+
+The run times of a benchmark before and after a change are compared with
+Welch's t-test, which does not assume that both have the same variance. A
+change is only reported if the difference of the means is both significant
+(one-sided, at the 1% level) and larger than a threshold, so that neither
+noise nor tiny but consistent differences are reported.
+
+"""
+
+import collections
+import math
+import statistics
+
+"""Critical values of Student's t-distribution for a one-sided test at the 1%
+level, by degrees of freedom. Larger degrees of freedom use the last value
+(the normal distribution)."""
+_T_CRITICAL = ((1, 31.821), (2, 6.965), (3, 4.541), (4, 3.747), (5, 3.365),
+        (6, 3.143), (7, 2.998), (8, 2.896), (9, 2.821), (10, 2.764), (12, 2.681),
+        (15, 2.602), (20, 2.528), (30, 2.457), (60, 2.390), (math.inf, 2.326))
+
+class Comparison(collections.namedtuple("Comparison", "name ratio t significant")):
+    __slots__ = ()
+    """The comparison of the run times of a benchmark.
+
+    Attributes:
+        name: The name of the benchmark.
+        ratio: The mean run time after the change divided by the mean before.
+        t: Welch's t statistic, positive if the benchmark got slower.
+        significant: True if the difference is statistically significant.
+
+    """
+
+def welch_t(before, after):
+    """Returns Welch's t statistic and its degrees of freedom for two samples
+    of at least two values each."""
+    (m1, m2) = (statistics.mean(before), statistics.mean(after))
+    (v1, v2) = (statistics.variance(before) / len(before), statistics.variance(after) / len(after))
+    if v1 + v2 == 0:
+        return (math.copysign(math.inf, m2 - m1) if m1 != m2 else 0.0, math.inf)
+    t = (m2 - m1) / math.sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / (v1 ** 2 / (len(before) - 1) + v2 ** 2 / (len(after) - 1))
+    return (t, df)
+
+def t_critical(df):
+    """Returns the critical t value for *df* degrees of freedom, rounding the
+    degrees of freedom down to the nearest tabulated value."""
+    value = _T_CRITICAL[0][1]
+    for (d, critical) in _T_CRITICAL:
+        if d > df:
+            break
+        value = critical
+    return value
+
+def compare(name, before, after):
+    """Compares two samples of run times of the benchmark *name*."""
+    ratio = statistics.mean(after) / statistics.mean(before)
+    if len(before) < 2 or len(after) < 2:
+        return Comparison(name, ratio, math.nan, False)
+    (t, df) = welch_t(before, after)
+    return Comparison(name, ratio, t, abs(t) >= t_critical(df))
+
+def compare_results(baseline, results, threshold=0.05):
+    """Compares the run times of the benchmarks in two sets of results.
+
+    Returns:
+        A tuple of lists of the Comparisons of the benchmarks that got
+        significantly slower and faster by more than *threshold* (a fraction
+        of the baseline time), and of all benchmarks in both results.
+
+    """
+    comparisons = []
+    for (name, result) in sorted(results["results"].items()):
+        if name in baseline["results"]:
+            comparisons.append(compare(name, baseline["results"][name]["times"], result["times"]))
+    slower = [c for c in comparisons if c.significant and c.ratio > 1 + threshold]
+    faster = [c for c in comparisons if c.significant and c.ratio < 1 - threshold]
+    return (slower, faster, comparisons)
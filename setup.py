@@ -58,6 +58,8 @@ setup(name="smplayer",
       author_email="tiit.pikma@cyber.ee",
       packages=["smplayer", "smplayer.core", "smplayer.core.protocol", "smplayer.widgets"],
       package_data={"smplayer": ["smplayer.kv"]},
-      scripts=["scripts/smplayer", "scripts/smplayer-gui"],
+      scripts=["scripts/smplayer", "scripts/smplayer-gui", "scripts/smplayer-merkle-diff",
+               "scripts/smplayer-crosscheck", "scripts/smplayer-convert",
+               "scripts/smplayer-gen"],
       cmdclass={"test": TestCommand},
     )
@@ -40,9 +40,22 @@ from kivy.uix.popup import Popup
 from kivy.uix.label import Label
 from kivy.properties import ObjectProperty
 
+import json
 import os
 import types
 
+"""The settings panel of the application (see SMPlayerApp.build_settings)."""
+_settings = json.dumps([
+        { "type": "title", "title": "Audit logs" },
+        { "type": "bool", "title": "Cache parsed logs",
+          "desc": "Save the parsed logs in the binary format, so they are not "
+                  "parsed again while they do not change",
+          "section": "smplayer", "key": "parse_cache" },
+        { "type": "path", "title": "Cache directory",
+          "desc": "Where to save the cached logs (next to the logs if empty)",
+          "section": "smplayer", "key": "parse_cache_dir" },
+    ])
+
 class LoadDialog(Popup):
 
     """A popup dialog for loading files."""
@@ -60,6 +73,10 @@ class SMPlayerWindow(BoxLayout):
     player = ObjectProperty(core.SMPlayer(), baseclass=core.SMPlayer)
     """Reference to a Sharemind Player instance."""
 
+    parse_cache = ObjectProperty(None, allownone=True)
+    """Whether to cache the parsed logs: None, True or the directory of the
+    cache (see core.SMPlayer.open())."""
+
     def show_load(self):
         """Show a popup dialog to choose the file to load."""
         self._load_dialog = LoadDialog(load=self.load)
@@ -71,7 +88,10 @@ class SMPlayerWindow(BoxLayout):
             return
         full_path = os.path.join(path, filename[0])
         try:
-            self.player.open(full_path)
+            # The simulation of a protocol is only needed when its body is
+            # shown, see widgets.ProtocolBody.
+            self.player.cache_results = False
+            self.player.open(full_path, cache=self.parse_cache)
         except core.LogError as e:
             Popup(title="Error loading " + filename[0], content=Label(text=str(e)),
                     size_hint=(None, None), size=(600, 200)).open()
@@ -87,4 +107,22 @@ class SMPlayerApp(App):
 
     def build(self):
         self.title = "Sharemind Player"
-        return SMPlayerWindow()
+        window = SMPlayerWindow()
+        window.parse_cache = self._parse_cache()
+        return window
+
+    def build_config(self, config):
+        config.setdefaults("smplayer", { "parse_cache": "0", "parse_cache_dir": "" })
+
+    def build_settings(self, settings):
+        settings.add_json_panel("Sharemind Player", self.config, data=_settings)
+
+    def on_config_change(self, config, section, key, value):
+        if section == "smplayer":
+            self.root.parse_cache = self._parse_cache()
+
+    def _parse_cache(self):
+        """Returns the cache option of SMPlayer.open() for the settings."""
+        if not self.config.getboolean("smplayer", "parse_cache"):
+            return None
+        return self.config.get("smplayer", "parse_cache_dir") or True
@@ -31,7 +31,21 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """
 
-__all__ = ["SMPlayer", "MessageHash", "LogError"]
-
-from .smplayer import SMPlayer, MessageHash
+__all__ = ["SMPlayer", "MessageHash", "AuditResult", "FollowResult", "HASH_VERSIONS", "LogError",
+           "save_hash_report", "load_hash_report",
+           "MerkleTree", "save_merkle_trees", "load_merkle_trees",
+           "BinaryLog", "is_binary_log", "write_binary_log", "iter_binary_log",
+           "LinkMismatch", "crosscheck_logs", "crosscheck_protocols", "crosscheck_hashes",
+           "VerdictCache", "GeneratedProtocol", "generate_protocols", "write_logs",
+           "Stats", "MemoryProfile"]
+
+from .smplayer import SMPlayer, MessageHash, AuditResult, FollowResult, HASH_VERSIONS
+from .smplayer import save_hash_report, load_hash_report
 from ._parser import LogError
+from ._merkle import MerkleTree, save_merkle_trees, load_merkle_trees
+from ._binlog import BinaryLog, is_binary_log, write_binary_log, iter_binary_log
+from ._crosscheck import LinkMismatch, crosscheck_logs, crosscheck_protocols, crosscheck_hashes
+from ._verdicts import VerdictCache
+from ._generate import GeneratedProtocol, generate_protocols, write_logs
+from ._stats import Stats
+from ._memory import MemoryProfile
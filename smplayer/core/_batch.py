@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Batched verification of many protocols.
+
+Verifying protocols one at a time has a fixed Python overhead per protocol,
+which dominates for logs of many short protocols. Instead, protocols of the
+same type, context and vector layout are merged into a single protocol whose
+vectors are the concatenations of the vectors of the original protocols. The
+merged protocol is simulated once with the vectorized kernels and the
+elementwise comparison with the expected values is split back into a verdict
+per protocol.
+
+"""
+
+import itertools
+
+from . import protocol as smprotocol
+from . import _vector as vector
+
+"""A dict from a protocol type that can be batched to a function returning the
+part of its batching key that is not implied by its type and context."""
+_batch_keys = {
+        smprotocol.Addition: lambda p: None,
+        smprotocol.Subtraction: lambda p: None,
+        smprotocol.Multiplication: lambda p: None,
+        smprotocol.Declassification: lambda p: None,
+        # Merged summations are only correct if all slices have equal length.
+        smprotocol.Summation: lambda p: len(p.input) // len(p.output),
+    }
+
+def verify_batch(protocols):
+    """Verify a sequence of protocols and return a list with a boolean for
+    each of them.
+
+    The result is the same as *[p.verify() for p in protocols]*, but the
+    protocols are simulated in batches if NumPy is available. Simulation
+    results are not cached in the protocols. Tuples and lists of vectors are
+    treated alike, which only matters for protocols that were not parsed from
+    a log.
+
+    """
+    if vector.numpy is None:
+        return [p.check() for p in protocols]
+
+    verdicts = [None] * len(protocols)
+    groups = {}
+    for (i, p) in enumerate(protocols):
+        key = _group_key(p)
+        if key is None:
+            verdicts[i] = p.check()
+        else:
+            groups.setdefault(key, []).append(i)
+
+    for indices in groups.values():
+        members = [protocols[i] for i in indices]
+        try:
+            group_verdicts = _verify_group(members)
+        except Exception:
+            # Something in the group can't be merged (e.g. a value which
+            # doesn't fit in an array), fall back to verifying one by one.
+            group_verdicts = [p.check() for p in members]
+        for (i, ok) in zip(indices, group_verdicts):
+            verdicts[i] = ok
+
+    return verdicts
+
+def _group_key(protocol):
+    """Returns the key of the batch *protocol* belongs to, or None if it can't
+    be batched."""
+    batch_key = _batch_keys.get(type(protocol))
+    if batch_key is None:
+        return None
+
+    # The protocols check the number of vectors in each argument, so only the
+    # order of the messages is left to distinguish.
+    messages = None
+    if isinstance(protocol, smprotocol.Protocol):
+        messages = (tuple(protocol.send), tuple(protocol.recv))
+    return (type(protocol), protocol.context, messages, batch_key(protocol))
+
+def _merge(values, concatenate):
+    """Merges values of equal layout by concatenating corresponding vectors."""
+    first = values[0]
+    if isinstance(first, dict):
+        return { k: _merge([v[k] for v in values], concatenate) for k in first }
+    if not vector.is_vector(first):
+        return type(first)(_merge([v[i] for v in values], concatenate) for i in range(0, len(first)))
+    return concatenate(values)
+
+def _concatenate(vectors):
+    """Concatenates vectors into an array without changing any values."""
+    # Vectors of a log all have the same representation, so checking the first
+    # one is enough. Mixed vectors are correctly concatenated either way.
+    if vector.is_array(vectors[0]):
+        return vector.numpy.concatenate(vectors)
+    # Convert lists to an array in one go instead of one by one.
+    return vector.exact_array(list(itertools.chain.from_iterable(vectors)))
+
+def _verify_group(members):
+    """Verifies protocols of a single batch, returning a list of booleans."""
+    first = members[0]
+    ring = vector.ring(first.context.mod)
+    operands = lambda vectors: ring.asarray(_concatenate(vectors))
+
+    # Operands that are only used for computing may be reduced, but the
+    # expected values must be compared as they are.
+    input = _merge([p.input for p in members], operands)
+    output = _merge([p.output for p in members], _concatenate)
+    if isinstance(first, smprotocol.Protocol):
+        send = _merge([p.send for p in members], _concatenate)
+        recv = _merge([p.recv for p in members], operands)
+        merged = type(first)(input, output, send, recv, first.context)
+        simulated = (merged.result.output, merged.result.send)
+        expected = ([p.output for p in members], [p.send for p in members])
+    else:
+        merged = type(first)(input, output, first.context)
+        simulated = (merged.result, )
+        expected = ([p.output for p in members], )
+
+    failed = vector.numpy.zeros(len(members), dtype=bool)
+    for (s, e) in zip(simulated, expected):
+        _find_failures(s, e, failed)
+    return [not f for f in failed.tolist()]
+
+def _find_failures(simulated, expected, failed):
+    """Marks the protocols whose vectors in *expected* differ from the
+    corresponding part of the merged vectors in *simulated* in *failed*.
+
+    Args:
+        simulated: A merged simulation result.
+        expected: A list of the expected values for each protocol.
+        failed: A boolean array with an element for each protocol.
+
+    """
+    numpy = vector.numpy
+    first = expected[0]
+    if isinstance(first, dict):
+        if simulated.keys() != first.keys():
+            raise KeyError("simulated and expected messages differ in keys")
+        for k in first:
+            _find_failures(simulated[k], [e[k] for e in expected], failed)
+    elif not vector.is_vector(first):
+        if len(simulated) != len(first):
+            raise ValueError("simulated and expected messages differ in length")
+        for i in range(0, len(first)):
+            _find_failures(simulated[i], [e[i] for e in expected], failed)
+    else:
+        lengths = numpy.fromiter(map(len, expected), dtype=numpy.int64, count=len(expected))
+        ends = numpy.cumsum(lengths)
+        if len(simulated) != ends[-1]:
+            raise ValueError("simulated and expected vectors differ in length")
+
+        mismatches = numpy.asarray(simulated) != _concatenate(expected)
+        # Count the mismatches in the segment of every protocol.
+        counts = numpy.concatenate(([0], numpy.cumsum(mismatches, dtype=numpy.int64)))
+        failed |= (counts[ends] - counts[ends - lengths]) > 0
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""A compact binary container for audit logs.
+
+Audit logs in XML spend most of their size and parsing time on the markup
+around every value. A binary log stores the same protocols with their vectors
+as contiguous little-endian uint32 values, so reading it needs no parsing.
+Use write_binary_log() (or the smplayer-convert script) to convert a log.
+
+All integers are little-endian and all sections start at offsets that are
+multiples of 4 bytes. A binary log starts with a header:
+
+    magic           8 bytes, b"SMPBLOG\\0"
+    version         uint32, currently 1
+    computing       uint32, the number of computing nodes of the context
+    count           uint64, the number of protocols
+    mod length      uint32, the number of bytes in mod
+    mod             the modulus of the context as an unsigned integer,
+                    padded with zero bytes to a multiple of 4 bytes
+
+followed by a record for every protocol:
+
+    size            uint64, the number of bytes in the rest of the record
+    type            uint8, the protocol tag: 0 add, 1 sub, 2 mult,
+                    3 declassify, 4 sum
+    block count     uint8
+    (padding)       2 bytes
+
+and for every block of the protocol:
+
+    kind            uint8: 0 input, 1 output, 2 send, 3 recv
+    node length     uint8, the length of the node name (0 for input and output)
+    (padding)       2 bytes
+    vector count    uint32
+    node            the node name (the "node" attribute in XML) in UTF-8,
+                    padded with zero bytes to a multiple of 4 bytes
+    lengths         uint64 for every vector, the number of values in it
+    values          uint32 for every value of every vector
+
+As in XML, a block with a single vector is a single message and a block with
+several vectors is a tuple of them.
+
+"""
+
+import array
+import collections.abc
+import mmap
+import os
+import struct
+
+from . import _parser as parser
+from . import _vector as smvector
+from . import protocol as smprotocol
+from .protocol import context as ctx
+
+_MAGIC = b"SMPBLOG\0"
+_VERSION = 1
+
+"""The protocol tags in the order of their type numbers."""
+_PROTOCOL_TAGS = ("add", "sub", "mult", "declassify", "sum")
+_protocol_types = {parser._supported_protocols[tag]: i for (i, tag) in enumerate(_PROTOCOL_TAGS)}
+
+_INPUT, _OUTPUT, _SEND, _RECV = range(0, 4)
+_BLOCK_TAGS = ("input", "output", "send", "recv")
+
+_HEADER = struct.Struct("<8sIIQI")
+_RECORD = struct.Struct("<QBBxx")
+_BLOCK = struct.Struct("<BBxxI")
+
+def is_binary_log(filename):
+    """Returns True if *filename* is a binary log and not an XML log."""
+    with open(filename, "rb") as f:
+        return f.read(len(_MAGIC)) == _MAGIC
+
+def write_binary_log(protocols, filename, context=None):
+    """Write protocols to a binary log and return the number of protocols.
+
+    The protocols are written one at a time, so an iterator over a streamed
+    XML log is converted without reading it into memory. The log is written
+    to a temporary file which replaces *filename* once all protocols are
+    written, so a failed conversion leaves no truncated log behind.
+
+    Args:
+        protocols: An iterable of protocols.
+        filename: The path of the binary log to write.
+        context: The context of all protocols. The default context is used
+            if None.
+
+    Raises:
+        ValueError: If a protocol has another context, is of an unsupported
+            type or contains values that don't fit in 32 bits.
+
+    """
+    context = context or ctx.default_context
+    mod = context.mod.to_bytes((context.mod.bit_length() + 7) // 8, "little")
+
+    temp = filename + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, context.computing, 0, len(mod)))
+            f.write(_pad(mod))
+
+            count = 0
+            for protocol in protocols:
+                if protocol.context != context:
+                    raise ValueError("protocol #{0} has a different context".format(count))
+                for buffer in _encode_protocol(protocol):
+                    f.write(buffer)
+                count += 1
+
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, _VERSION, context.computing, count, len(mod)))
+        os.replace(temp, filename)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    return count
+
+def iter_binary_log(filename, arrays=False):
+    """Read a binary log incrementally, yielding one protocol at a time.
+
+    Args:
+        filename: Path to the binary log.
+        arrays: If True, vectors are read into NumPy uint32 arrays instead of
+            lists of integers. Requires NumPy.
+
+    Raises:
+        LogError: If the file is not a binary log or is corrupt.
+
+    """
+    yield from BinaryLog(filename, arrays)
+
+class BinaryLog(collections.abc.Sequence):
+
+    """A read-only sequence of the protocols in a binary log.
+
+    The log is memory-mapped and a protocol is only decoded when it is
+    accessed, so opening even a huge log takes constant time and the
+    operating system decides which parts of it stay in memory. Every access
+    decodes the protocol again, returning a new protocol object.
+
+    With *arrays*, the vectors of the protocols are read-only NumPy arrays
+    on top of the memory map and no values are copied. Otherwise they are
+    lists, which are copied from the map when the protocol is accessed.
+
+    Protocols are found by following the size fields of the records, which
+    happens incrementally: indexing a protocol only requires the records
+    before it to have been skipped once.
+
+    Attributes:
+        context: The context of all protocols in the log.
+
+    """
+
+    def __init__(self, filename, arrays=False):
+        """Opens the binary log *filename*.
+
+        Raises:
+            LogError: If the file is not a binary log.
+
+        """
+        if arrays:
+            smvector.require_numpy()
+
+        with open(filename, "rb") as f:
+            try:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped.
+                raise parser.LogError("not a binary audit log")
+
+        (self.context, self._count, start) = _read_header(self._data)
+        self._view = memoryview(self._data)
+        self._arrays = arrays
+        self._offsets = array.array("Q", [start])
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("protocol index out of range")
+
+        while len(self._offsets) <= index:
+            self._offsets.append(self._record(self._offsets[-1])[1])
+        (record, end) = self._record(self._offsets[index])
+        return _decode_protocol(record, self.context, self._arrays)
+
+    def __iter__(self):
+        pos = self._offsets[0]
+        for i in range(0, self._count):
+            (record, pos) = self._record(pos)
+            yield _decode_protocol(record, self.context, self._arrays)
+
+    def _record(self, pos):
+        """Returns a view of the record at *pos* (without its size field) and
+        the position of the next record."""
+        if pos + 8 > len(self._data):
+            raise parser.LogError("binary log is truncated")
+        end = pos + 8 + struct.unpack_from("<Q", self._data, pos)[0]
+        if end > len(self._data):
+            raise parser.LogError("binary log is truncated")
+        return (self._view[pos + 8 : end], end)
+
+def _pad(data):
+    """Pads *data* with zero bytes to a multiple of 4 bytes."""
+    return data + b"\0" * (-len(data) % 4)
+
+def _encode_protocol(protocol):
+    """Returns a list of buffers containing the record of a protocol."""
+    if type(protocol) not in _protocol_types:
+        raise ValueError("unsupported protocol type: {0}".format(type(protocol).__name__))
+
+    blocks = [(_INPUT, "", protocol.input), (_OUTPUT, "", protocol.output)]
+    if isinstance(protocol, smprotocol.Protocol):
+        blocks.extend((_SEND, node, m) for (node, m) in (protocol.send or {}).items())
+        blocks.extend((_RECV, node, m) for (node, m) in (protocol.recv or {}).items())
+    blocks = [b for b in blocks if b[2] is not None]
+
+    buffers = [None]
+    for (kind, node, message) in blocks:
+        vectors = (message, ) if smvector.is_vector(message) else message
+        node = node.encode()
+        buffers.append(_BLOCK.pack(kind, len(node), len(vectors)))
+        buffers.append(_pad(node))
+        buffers.append(struct.pack("<%dQ" % len(vectors), *map(len, vectors)))
+        buffers.extend(smvector.uint32_bytes(v) for v in vectors)
+
+    size = sum(memoryview(b).nbytes for b in buffers[1:]) + _RECORD.size - 8
+    buffers[0] = _RECORD.pack(size, _protocol_types[type(protocol)], len(blocks))
+    return buffers
+
+def _read_header(data):
+    """Return the context, the protocol count and the position of the first
+    record of a binary log."""
+    if len(data) < _HEADER.size or data[: len(_MAGIC)] != _MAGIC:
+        raise parser.LogError("not a binary audit log")
+    (magic, version, computing, count, mod_len) = _HEADER.unpack_from(data, 0)
+    if version != _VERSION:
+        raise parser.LogError("unsupported binary log version {0}".format(version))
+    start = _HEADER.size + mod_len + (-mod_len % 4)
+    if start > len(data):
+        raise parser.LogError("binary log is truncated")
+    mod = int.from_bytes(data[_HEADER.size : _HEADER.size + mod_len], "little")
+    return (smprotocol.Context(mod, computing), count, start)
+
+def _record_info(record):
+    """Return the type number of the protocol in a record and the number of
+    values in its output, without decoding the vectors."""
+    try:
+        (index, count) = struct.unpack_from("<BBxx", record, 0)
+        pos = 4
+        for _ in range(0, count):
+            (kind, node_len, n) = _BLOCK.unpack_from(record, pos)
+            pos += _BLOCK.size + node_len + (-node_len % 4)
+            lengths = struct.unpack_from("<%dQ" % n, record, pos)
+            if kind == _OUTPUT:
+                return (index, sum(lengths))
+            pos += 8 * n + 4 * sum(lengths)
+    except struct.error as err:
+        raise parser.LogError("corrupt protocol record") from err
+    return (index, 0)
+
+def _decode_protocol(record, context, arrays=False):
+    """Return the protocol stored in a record (without its size field)."""
+    try:
+        (index, count) = struct.unpack_from("<BBxx", record, 0)
+        pos = 4
+        blocks = {}
+        send = {}
+        recv = {}
+        for _ in range(0, count):
+            (kind, node_len, n) = _BLOCK.unpack_from(record, pos)
+            pos += _BLOCK.size
+            node = bytes(record[pos : pos + node_len]).decode()
+            pos += node_len + (-node_len % 4)
+            lengths = struct.unpack_from("<%dQ" % n, record, pos)
+            pos += 8 * n
+
+            # Convert the values of all vectors at once and split them after.
+            size = 4 * sum(lengths)
+            if not lengths or pos + size > len(record):
+                raise parser.LogError("corrupt protocol record")
+            values = smvector.from_uint32_bytes(record[pos : pos + size], arrays)
+            pos += size
+            if n == 1:
+                vectors = [values]
+            else:
+                vectors = []
+                start = 0
+                for length in lengths:
+                    vectors.append(values[start : start + length])
+                    start += length
+
+            messages = send if kind == _SEND else recv if kind == _RECV else blocks
+            key = node if kind in (_SEND, _RECV) else kind
+            if key in messages:
+                raise parser.LogError("extra <%s> element" % _BLOCK_TAGS[kind])
+            messages[key] = vectors[0] if n == 1 else tuple(vectors)
+    except (struct.error, IndexError, UnicodeDecodeError) as err:
+        raise parser.LogError("corrupt protocol record") from err
+
+    if pos != len(record) or index >= len(_PROTOCOL_TAGS):
+        raise parser.LogError("corrupt protocol record")
+    return parser._new_protocol(_PROTOCOL_TAGS[index], blocks.get(_INPUT), blocks.get(_OUTPUT),
+            send, recv, context)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Checkpoints of long verifications.
+
+A checkpoint records how far the verification of a log got: the number of
+protocols verified, the position in the log after the last of them and the
+failures found so far. A SHA-256 digest of the log up to that position is
+stored as well, so a verification is only resumed if that part of the log
+has not changed.
+
+Hash objects can't be saved, so message hashes are not part of a checkpoint.
+A resumed audit hashes the protocols before the checkpoint again, but does
+not verify them again.
+
+"""
+
+import collections
+import hashlib
+import json
+import os
+
+class Checkpoint(collections.namedtuple("Checkpoint", "index offset digest failures")):
+    __slots__ = ()
+    """The state of an interrupted verification.
+
+    Attributes:
+        index: The number of protocols that were verified.
+        offset: The position in the log after the last verified protocol.
+        digest: The SHA-256 digest (in hex) of the log up to *offset*.
+        failures: A list with the indices of the protocols that did not
+            verify so far.
+
+    """
+
+def save_checkpoint(checkpoint, filename):
+    """Saves a checkpoint to a JSON file.
+
+    The file is replaced atomically, so an interruption while saving leaves
+    the previous checkpoint intact.
+
+    """
+    temp = filename + ".tmp"
+    with open(temp, "w") as f:
+        json.dump(checkpoint._asdict(), f)
+    os.replace(temp, filename)
+
+def load_checkpoint(filename):
+    """Loads a checkpoint saved by save_checkpoint().
+
+    Returns:
+        The Checkpoint, or None if the file does not exist.
+
+    Raises:
+        ValueError: If the file is not a valid checkpoint.
+
+    """
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    try:
+        return Checkpoint(**data)
+    except TypeError as err:
+        raise ValueError("{0} is not a valid checkpoint".format(filename)) from err
+
+def remove_checkpoint(filename):
+    """Removes a checkpoint file if it exists."""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+class PrefixDigest(object):
+
+    """Computes the SHA-256 digest of a growing prefix of a file."""
+
+    """The number of bytes read from the file at once."""
+    block_size = 2**20
+
+    def __init__(self, filename):
+        self._filename = filename
+        self._sha = hashlib.sha256()
+        self.offset = 0
+
+    def advance(self, offset):
+        """Adds the bytes of the file up to *offset* to the digest.
+
+        Raises:
+            ValueError: If the file is shorter than *offset*.
+
+        """
+        with open(self._filename, "rb") as f:
+            f.seek(self.offset)
+            while self.offset < offset:
+                data = f.read(min(self.block_size, offset - self.offset))
+                if not data:
+                    raise ValueError("{0} is shorter than {1} bytes".format(self._filename, offset))
+                self._sha.update(data)
+                self.offset += len(data)
+
+    def hexdigest(self):
+        return self._sha.hexdigest()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Consistency checks between the audit logs of all computing nodes.
+
+The computing nodes form a ring: every node sends messages to the next and
+the previous node and to all remote nodes. The logs of all nodes are read in
+lockstep, one protocol at a time, and every message a node sent is compared
+with the message its receiver logged for the same protocol. Messages are
+compared by their hashes, so lists and NumPy arrays compare alike.
+
+"""
+
+import collections
+import hashlib
+import itertools
+
+from . import _binlog as binlog
+from . import _parser as parser
+from . import _vector as vector
+from . import protocol as smprotocol
+from .protocol import context as ctx
+from .smplayer import MessageHash
+
+class LinkMismatch(collections.namedtuple("LinkMismatch", "sender receiver channel protocol")):
+    __slots__ = ()
+    """The first mismatching message of a link between two nodes.
+
+    Attributes:
+        sender: The index of the sending node (its position in the list of logs).
+        receiver: The index of the receiving node.
+        channel: The key of the message in the *send* dict of the sender's
+            protocol: "next", "prev" or "remote".
+        protocol: The index of the protocol at which the message sent did not
+            match the message received, or None if only the hashes of all
+            messages were compared (see crosscheck_hashes()).
+
+    """
+
+def crosscheck_logs(filenames, arrays=False, context=None):
+    """Checks that the messages sent and received by the computing nodes match.
+
+    Node *i* is the node that wrote the log *filenames[i]*. The logs are
+    streamed, so memory use does not depend on their length. Binary logs
+    (see smplayer._binlog) are detected automatically. See
+    crosscheck_protocols() for the checks done.
+
+    Args:
+        filenames: The audit logs of all computing nodes, in ring order.
+        arrays: If True, vectors are parsed into NumPy arrays.
+        context: The context of the protocols of XML logs. If None, the
+            default context with as many computing nodes as there are logs is
+            used. Binary logs contain their context.
+
+    Returns:
+        A list with the first LinkMismatch of every link which has one, sorted
+        by protocol index. The list is empty if all messages match.
+
+    Raises:
+        ValueError: If there are fewer than two logs.
+        LogError: If a log cannot be parsed.
+
+    """
+    if context is None:
+        context = ctx.Context(mod=ctx.default_context.mod, computing=len(filenames))
+    return crosscheck_protocols([_iter_log(filename, arrays, context) for filename in filenames])
+
+def _iter_log(filename, arrays, context):
+    """Returns an iterator over the protocols of an XML or binary log."""
+    if binlog.is_binary_log(filename):
+        return binlog.iter_binary_log(filename, arrays)
+    return parser.iter_log(filename, arrays, context)
+
+def crosscheck_protocols(logs):
+    """Checks that the messages sent and received by the computing nodes match.
+
+    Node *i* is the node whose protocols are in *logs[i]*. The next node of
+    node *i* is node *i + 1* and the previous node is *i - 1* (modulo the
+    number of nodes). For every protocol, the message node *i* sent to the
+    next node must equal the message the next node received from its
+    previous node and vice versa, and the message node *i* sent to the remote
+    nodes must be one of the messages every other node received from the
+    computing nodes. A protocol that is missing from a shorter log is treated
+    as a protocol without messages.
+
+    Args:
+        logs: A list of iterables of protocols, one for each computing node,
+            in ring order.
+
+    Returns:
+        A list with the first LinkMismatch of every link which has one, sorted
+        by protocol index. The list is empty if all messages match.
+
+    Raises:
+        ValueError: If there are fewer than two logs.
+
+    """
+    n = len(logs)
+    if n < 2:
+        raise ValueError("at least two logs are needed")
+
+    mismatches = {}
+    links = 2 * n + n * (n - 1)
+    for (index, protocols) in enumerate(itertools.zip_longest(*logs)):
+        send = [_messages(p, "send") for p in protocols]
+        recv = [_messages(p, "recv") for p in protocols]
+
+        for i in range(0, n):
+            (next_node, prev_node) = ((i + 1) % n, (i - 1) % n)
+            _check_link(mismatches, i, next_node, "next", index,
+                    send[i].get("next"), recv[next_node].get("prev"))
+            _check_link(mismatches, i, prev_node, "prev", index,
+                    send[i].get("prev"), recv[prev_node].get("next"))
+
+        # The messages a node receives from the computing nodes are not
+        # labelled with the sender, so match them as a multiset.
+        for j in range(0, n):
+            received = collections.Counter(map(_digest, recv[j].get("computing") or ()))
+            silent = []
+            for i in range(0, n):
+                if i == j:
+                    continue
+                sent = send[i].get("remote")
+                if sent is None:
+                    silent.append(i)
+                    continue
+                digest = _digest(sent)
+                if received[digest] > 0:
+                    received[digest] -= 1
+                else:
+                    mismatches.setdefault((i, j, "remote"), index)
+            if sum(received.values()) > 0:
+                # Messages were received that nobody sent.
+                for i in silent:
+                    mismatches.setdefault((i, j, "remote"), index)
+
+        if len(mismatches) == links:
+            break
+
+    return sorted((LinkMismatch(s, r, c, i) for ((s, r, c), i) in mismatches.items()),
+            key=lambda m: (m.protocol, m.sender, m.receiver))
+
+def crosscheck_hashes(hashes):
+    """Checks that the message hashes of the computing nodes match.
+
+    This is the same check as crosscheck_protocols(), but done on the
+    MessageHashes of the nodes (see SMPlayer.hash()), so it needs neither the
+    logs nor any of the messages in them. All hashes must have been computed
+    with the same hash format version. The hash of the messages a node sent
+    to the remote nodes must equal one of the hashes of the messages every
+    other node received from the computing nodes. Since a mismatch can only
+    be detected for the whole channel, the *protocol* of the mismatches
+    returned is None.
+
+    Args:
+        hashes: A list of MessageHashes, one for each computing node, in ring
+            order. None stands for a log without protocols.
+
+    Returns:
+        A list with a LinkMismatch for every link whose hashes do not match.
+
+    Raises:
+        ValueError: If there are fewer than two nodes or a node received
+            messages from the wrong number of computing nodes.
+
+    """
+    n = len(hashes)
+    if n < 2:
+        raise ValueError("at least two nodes are needed")
+    hashes = [h or MessageHash(None, None, None, None, None, []) for h in hashes]
+    for (i, h) in enumerate(hashes):
+        if h.recv_computing and len(h.recv_computing) != n - 1:
+            raise ValueError("node {0} received messages from {1} computing nodes, "
+                    "expected {2}".format(i, len(h.recv_computing), n - 1))
+
+    mismatches = []
+    for i in range(0, n):
+        (next_node, prev_node) = ((i + 1) % n, (i - 1) % n)
+        if hashes[i].send_next != hashes[next_node].recv_prev:
+            mismatches.append(LinkMismatch(i, next_node, "next", None))
+        if hashes[i].send_prev != hashes[prev_node].recv_next:
+            mismatches.append(LinkMismatch(i, prev_node, "prev", None))
+
+    for j in range(0, n):
+        received = collections.Counter(hashes[j].recv_computing or [None] * (n - 1))
+        for i in range(0, n):
+            if i == j:
+                continue
+            sent = hashes[i].send_remote
+            if received[sent] > 0:
+                received[sent] -= 1
+            else:
+                mismatches.append(LinkMismatch(i, j, "remote", None))
+
+    return sorted(mismatches, key=lambda m: (m.sender, m.receiver))
+
+def _messages(protocol, direction):
+    """Returns the *send* or *recv* dict of a protocol, or an empty dict if the
+    protocol is missing or does not send messages."""
+    if not isinstance(protocol, smprotocol.Protocol):
+        return {}
+    return getattr(protocol, direction) or {}
+
+def _check_link(mismatches, sender, receiver, channel, index, sent, received):
+    """Records a mismatch at *index* unless the link already has one or the
+    messages match."""
+    key = (sender, receiver, channel)
+    if key in mismatches:
+        return
+    if (sent is None) != (received is None) or \
+            (sent is not None and _digest(sent) != _digest(received)):
+        mismatches[key] = index
+
+def _digest(message):
+    """Returns the SHA-256 digest of the binary encoding of a message."""
+    sha = hashlib.sha256()
+    for buffer in vector.message_buffers(message):
+        sha.update(buffer)
+    return sha.digest()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Generation of synthetic audit logs for all computing nodes.
+
+The generated protocols are consistent across the nodes: every value is
+additively shared between the nodes, the random values used for resharing are
+sent to the nodes that need them and every message a node sends is the
+message its receiver gets. So every protocol verifies with SMPlayer.verify()
+and the logs of all nodes pass the checks of crosscheck_logs(), unless a
+fault was injected into it.
+
+The inputs of every protocol are fresh random shares, so the protocols do
+not compute anything meaningful together. Multiplication is the protocol for
+3 computing nodes and can't be generated for other set-ups.
+
+"""
+
+import collections
+import random
+
+from . import _parser as parser
+from . import _vector as vector
+from . import protocol as smprotocol
+from .protocol import context as ctx
+
+"""The protocol tags that can be generated."""
+PROTOCOL_TAGS = ("add", "sub", "mult", "declassify", "sum")
+
+class GeneratedProtocol(collections.namedtuple("GeneratedProtocol", "protocols fault")):
+    __slots__ = ()
+    """A protocol as logged by all computing nodes.
+
+    Attributes:
+        protocols: A tuple with the protocol of every node.
+        fault: The index of the node whose protocol has a fault injected
+            into its output, so it does not verify, or None.
+
+    """
+
+def generate_protocols(count, nodes=3, mix=None, sizes=(1, 16), fault_rate=0.0, seed=None):
+    """Yields *count* random GeneratedProtocols.
+
+    Args:
+        count: The number of protocols to generate.
+        nodes: The number of computing nodes.
+        mix: A dict from protocol tags to their relative frequencies. All
+            protocols are equally frequent if None (except multiplication if
+            *nodes* is not 3).
+        sizes: A pair with the minimum and maximum length of the vectors.
+        fault_rate: The probability that a fault is injected into a protocol.
+        seed: The seed of the random number generator. The same seed and
+            arguments generate the same protocols.
+
+    Raises:
+        ValueError: If any of the arguments are invalid.
+
+    """
+    if nodes < 2:
+        raise ValueError("at least two computing nodes are needed")
+    if mix is None:
+        mix = {tag: 1 for tag in PROTOCOL_TAGS if tag != "mult" or nodes == 3}
+    for (tag, weight) in mix.items():
+        if tag not in PROTOCOL_TAGS:
+            raise ValueError("unknown protocol: {0}".format(tag))
+        if weight < 0:
+            raise ValueError("the frequency of {0} is negative".format(tag))
+    if mix.get("mult") and nodes != 3:
+        raise ValueError("multiplication needs 3 computing nodes")
+    tags = [tag for tag in mix if mix[tag] > 0]
+    if not tags:
+        raise ValueError("no protocols to generate")
+    weights = [mix[tag] for tag in tags]
+    if not 1 <= sizes[0] <= sizes[1]:
+        raise ValueError("invalid vector sizes: {0}".format(sizes))
+    if not 0 <= fault_rate <= 1:
+        raise ValueError("the fault rate must be between 0 and 1")
+
+    generator = _Generator(random.Random(seed), ctx.Context(mod=ctx.default_context.mod,
+            computing=nodes))
+    for i in range(0, count):
+        tag = generator.rng.choices(tags, weights)[0]
+        protocols = generator.generate(tag, generator.rng.randint(*sizes))
+        fault = None
+        if generator.rng.random() < fault_rate:
+            fault = generator.rng.randrange(0, nodes)
+            protocols[fault] = generator.inject_fault(protocols[fault])
+        yield GeneratedProtocol(tuple(protocols), fault)
+
+class _Generator(object):
+
+    """Generates the protocols of all nodes for a single protocol tag."""
+
+    def __init__(self, rng, context):
+        self.rng = rng
+        self.context = context
+        self._n = context.computing
+        self._mod = context.mod
+
+    def generate(self, tag, size):
+        """Returns a list with the protocol of every node."""
+        return getattr(self, "_" + tag)(size)
+
+    def inject_fault(self, protocol):
+        """Returns a copy of *protocol* with one output value changed."""
+        output = list(protocol.output)
+        i = self.rng.randrange(0, len(output))
+        output[i] ^= self.rng.randrange(1, self._mod)
+        args = [protocol.input, output]
+        if isinstance(protocol, smprotocol.Protocol):
+            args.extend((protocol.send, protocol.recv))
+        return type(protocol)(*args, context=self.context)
+
+    def _random(self, size):
+        # Logs contain 32-bit values, so the modulus is 2**32.
+        return [self.rng.getrandbits(32) for _ in range(0, size)]
+
+    def _new(self, tag, *args):
+        return parser._supported_protocols[tag](*args, context=self.context)
+
+    def _add(self, size, sign=1):
+        protocols = []
+        for i in range(0, self._n):
+            (x, y) = (self._random(size), self._random(size))
+            output = [(a + sign * b) % self._mod for (a, b) in zip(x, y)]
+            protocols.append(self._new("add" if sign > 0 else "sub", (x, y), output))
+        return protocols
+
+    def _sub(self, size):
+        return self._add(size, -1)
+
+    def _sum(self, size):
+        divisors = [d for d in range(1, size + 1) if size % d == 0]
+        slices = self.rng.choice(divisors)
+        length = size // slices
+        protocols = []
+        for i in range(0, self._n):
+            x = self._random(size)
+            output = [sum(x[j * length : (j + 1) * length]) % self._mod for j in range(0, slices)]
+            protocols.append(self._new("sum", x, output))
+        return protocols
+
+    def _declassify(self, size):
+        n = self._n
+        shares = [self._random(size) for i in range(0, n)]
+        # Node i sends random values to the next node and reshares its input
+        # with them before sending it to all other nodes.
+        rand = [self._random(size) for i in range(0, n)]
+        reshared = [[(x + rp - r) % self._mod for (x, rp, r) in zip(shares[i], rand[i - 1], rand[i])]
+                for i in range(0, n)]
+        value = [sum(values) % self._mod for values in zip(*shares)]
+
+        protocols = []
+        for i in range(0, n):
+            send = {"next": rand[i], "remote": reshared[i]}
+            recv = {"prev": rand[i - 1],
+                    "computing": tuple(reshared[j] for j in range(0, n) if j != i)}
+            protocols.append(self._new("declassify", shares[i], list(value), send, recv))
+        return protocols
+
+    def _mult(self, size):
+        mod = self._mod
+        a = [self._random(size) for i in range(0, 3)]
+        b = [self._random(size) for i in range(0, 3)]
+        # Node i sends two random vectors to the previous node, its input
+        # reshared with them and a random vector for resharing the output to
+        # the next node (see Multiplication._simulate).
+        send_prev = [(self._random(size), self._random(size)) for i in range(0, 3)]
+        send_next = [([(x - r) % mod for (x, r) in zip(a[i], send_prev[i][0])],
+                      [(y - r) % mod for (y, r) in zip(b[i], send_prev[i][1])],
+                      self._random(size)) for i in range(0, 3)]
+        # The reshared inputs of every node.
+        ra = [[(x + r) % mod for (x, r) in zip(send_next[i][0], send_prev[(i + 1) % 3][0])]
+                for i in range(0, 3)]
+        rb = [[(y + r) % mod for (y, r) in zip(send_next[i][1], send_prev[(i + 1) % 3][1])]
+                for i in range(0, 3)]
+
+        protocols = []
+        for i in range(0, 3):
+            p = i - 1
+            output = [(x * y + x * yp + xp * y + r - rp) % mod for (x, y, xp, yp, r, rp) in
+                    zip(ra[i], rb[i], ra[p], rb[p], send_next[i][2], send_next[p][2])]
+            send = {"prev": send_prev[i], "next": send_next[i]}
+            recv = {"next": send_prev[(i + 1) % 3], "prev": send_next[p]}
+            protocols.append(self._new("mult", (a[i], b[i]), output, send, recv))
+        return protocols
+
+"""The tag of every protocol type."""
+_protocol_tags = {cls: tag for (tag, cls) in parser._supported_protocols.items()}
+
+def xml_protocol(protocol, indent="  "):
+    """Returns the XML element of *protocol* in the layout of the audit logs
+    written by the Application Server."""
+    lines = ["{0}<{1}>".format(indent, _protocol_tags[type(protocol)])]
+    _xml_block(lines, indent * 2, "input", None, protocol.input)
+    if isinstance(protocol, smprotocol.Protocol):
+        for (node, message) in protocol.send.items():
+            _xml_block(lines, indent * 2, "send", node, message)
+        for (node, message) in protocol.recv.items():
+            _xml_block(lines, indent * 2, "recv", node, message)
+    _xml_block(lines, indent * 2, "output", None, protocol.output)
+    lines.append("{0}</{1}>\n".format(indent, _protocol_tags[type(protocol)]))
+    return "\n".join(lines)
+
+def _xml_block(lines, indent, tag, node, message):
+    """Appends the lines of a block with a message to *lines*."""
+    attr = ' node="{0}"'.format(node) if node is not None else ""
+    lines.append("{0}<{1}{2}>".format(indent, tag, attr))
+    value = "{0}    <value>{{0}}</value>".format(indent)
+    for v in ((message, ) if vector.is_vector(message) else message):
+        lines.append(indent + "  <vector>")
+        lines.extend(map(value.format, vector.tolist(v)))
+        lines.append(indent + "  </vector>")
+    lines.append("{0}</{1}>".format(indent, tag))
+
+def write_logs(protocols, filenames):
+    """Writes GeneratedProtocols to the XML audit logs of all nodes.
+
+    The protocols are written one at a time, so the logs can be much larger
+    than the available memory.
+
+    Args:
+        protocols: An iterable of GeneratedProtocols.
+        filenames: The paths of the logs of all nodes in ring order.
+
+    Returns:
+        A list with a (protocol index, node index) pair for every protocol
+        with an injected fault.
+
+    """
+    faults = []
+    files = []
+    try:
+        for filename in filenames:
+            files.append(open(filename, "w"))
+            files[-1].write('<?xml version="1.0" encoding="UTF-8"?>\n<audit>\n')
+        for (i, generated) in enumerate(protocols):
+            if len(generated.protocols) != len(files):
+                raise ValueError("protocol #{0} is not for {1} nodes".format(i, len(files)))
+            for (f, protocol) in zip(files, generated.protocols):
+                f.write(xml_protocol(protocol))
+            if generated.fault is not None:
+                faults.append((i, generated.fault))
+        for f in files:
+            f.write("</audit>\n")
+    finally:
+        for f in files:
+            f.close()
+    return faults
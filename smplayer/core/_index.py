@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Sidecar index files for random access to the protocols of a log.
+
+An index records where every protocol of a log is stored, so that single
+protocols or ranges of them can be read without reading the log up to
+them. The index of a log is stored next to it, in a file with the suffix
+".idx", and rebuilt when the log has changed since.
+
+An index file starts with a header:
+
+    magic           8 bytes, b"SMPIDX1\\0"
+    log size        uint64, the size of the log in bytes
+    log mtime       uint64, the modification time of the log in nanoseconds
+    count           uint64, the number of protocols
+
+followed by four arrays with an element for every protocol:
+
+    offsets         uint64, the position of the protocol in the log
+    lengths         uint64, the number of bytes of the protocol
+    outputs         uint64, the number of values in the output of the protocol
+    types           uint8, the protocol tag as in binary logs (see
+                    smplayer._binlog), or 255 for unsupported tags
+
+All integers are little-endian. For XML logs, a protocol spans its element
+from the start tag to the end tag. For binary logs, it spans its record.
+
+"""
+
+import array
+import mmap
+import os
+import struct
+
+from . import _binlog as binlog
+from . import _parser as parser
+from . import _util as util
+from . import _vector as vector
+
+_MAGIC = b"SMPIDX1\0"
+_HEADER = struct.Struct("<8sQQQ")
+_UNKNOWN_TYPE = 255
+
+_xml_types = {tag.encode(): i for (i, tag) in enumerate(binlog._PROTOCOL_TAGS)}
+
+class LogIndex(object):
+
+    """The positions of the protocols in a log.
+
+    Attributes:
+        filename: The path of the indexed log.
+        offsets: An array('Q') with the position of every protocol in the log.
+        lengths: An array('Q') with the number of bytes of every protocol.
+        outputs: An array('Q') with the number of output values of every protocol.
+        types: A bytes object with the type number of every protocol.
+
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.offsets = array.array("Q")
+        self.lengths = array.array("Q")
+        self.outputs = array.array("Q")
+        self.types = b""
+        self._data = None
+        self._context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def close(self):
+        """Unmaps the log. It is mapped again if another protocol is read."""
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def protocol(self, index, arrays=False, context=None):
+        """Reads and returns the protocol at *index* of the log.
+
+        *context* is the context of the protocols of an XML log (see
+        smplayer._parser.parse_log). Binary logs contain their context.
+
+        Raises:
+            IndexError: If there is no such protocol.
+            LogError: If the protocol contains errors.
+
+        """
+        if arrays:
+            vector.require_numpy()
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("protocol index out of range")
+
+        data = self._map()
+        (start, end) = (self.offsets[index], self.offsets[index] + self.lengths[index])
+        if self._context is not None:
+            record = memoryview(data)[start + 8 : end]
+            return binlog._decode_protocol(record, self._context, arrays)
+
+        tag = parser._START_TAG.match(data, start).group(1)
+        try:
+            return parser._scan_element(data, tag, start, end - len(tag) - 3, arrays, context)
+        except parser._Unrecognized:
+            raise parser.LogError("the log is not in a layout that can be indexed")
+
+    def protocols(self, start, stop, arrays=False, context=None):
+        """Reads and returns a list of the protocols from *start* to *stop* - 1."""
+        return [self.protocol(i, arrays, context) for i in range(*slice(start, stop).indices(len(self)))]
+
+    def _map(self):
+        """Returns a memory map of the log, mapping it on first use.
+
+        Raises:
+            LogError: If the log is empty.
+
+        """
+        if self._data is None:
+            with open(self.filename, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    raise parser.LogError("the log is empty")
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._data[: len(binlog._MAGIC)] == binlog._MAGIC:
+                self._context = binlog._read_header(self._data)[0]
+        return self._data
+
+def index_filename(filename):
+    """Returns the path of the sidecar index file of the log *filename*."""
+    return filename + ".idx"
+
+def build_index(filename):
+    """Builds the index of a log by scanning it once.
+
+    Raises:
+        LogError: If the log is empty or not in a layout that can be indexed.
+            XML logs must be in the layout written by the Application Server
+            (see smplayer._parser._scan_protocols).
+
+    """
+    index = LogIndex(filename)
+    try:
+        _scan(index)
+    except BaseException:
+        index.close()
+        raise
+    return index
+
+def _scan(index):
+    """Fills in *index* by scanning the log."""
+    filename = index.filename
+    data = index._map()
+    offsets = index.offsets
+    lengths = index.lengths
+    outputs = index.outputs
+    types = bytearray()
+
+    if index._context is not None:
+        log = binlog.BinaryLog(filename)
+        pos = log._offsets[0]
+        for _ in range(0, len(log)):
+            (record, end) = log._record(pos)
+            (kind, n) = binlog._record_info(record)
+            offsets.append(pos)
+            lengths.append(end - pos)
+            outputs.append(n)
+            types.append(kind)
+            pos = end
+    else:
+        try:
+            (start, end) = parser._scan_bounds(data)
+            for (tag, start, close) in parser._protocol_spans(data, start, end):
+                offsets.append(start)
+                lengths.append(close + len(tag) + 3 - start)
+                outputs.append(_count_outputs(data, start, close))
+                types.append(_xml_types.get(tag, _UNKNOWN_TYPE))
+        except parser._Unrecognized:
+            raise parser.LogError("the log is not in a layout that can be indexed")
+
+    index.types = bytes(types)
+
+def _count_outputs(data, start, close):
+    """Returns the number of values in the <output> of a protocol element."""
+    begin = data.find(b"<output>", start, close)
+    if begin < 0:
+        return 0
+    end = data.find(b"</output>", begin, close)
+    return data[begin : end if end >= 0 else close].count(b"<value>")
+
+def save_index(index, filename=None):
+    """Saves an index to *filename*, which defaults to the sidecar file of
+    the indexed log.
+
+    The index is written to a temporary file first, which then replaces
+    *filename*, so that an interrupted save never leaves a truncated index.
+
+    """
+    filename = filename or index_filename(index.filename)
+    stat = os.stat(index.filename)
+    temp = filename + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns, len(index)))
+            for values in (index.offsets, index.lengths, index.outputs):
+                f.write(util.little_endian(values).tobytes())
+            f.write(index.types)
+        os.replace(temp, filename)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+def load_index(filename):
+    """Loads the sidecar index of the log *filename*.
+
+    Returns:
+        The LogIndex, or None if there is no index file or the log has
+        changed since it was written.
+
+    """
+    try:
+        with open(index_filename(filename), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    stat = os.stat(filename)
+    if len(data) < _HEADER.size:
+        return None
+    (magic, size, mtime, count) = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or size != stat.st_size or mtime != stat.st_mtime_ns or \
+            len(data) != _HEADER.size + 25 * count:
+        return None
+
+    index = LogIndex(filename)
+    pos = _HEADER.size
+    for values in (index.offsets, index.lengths, index.outputs):
+        values.frombytes(data[pos : pos + 8 * count])
+        values[:] = util.little_endian(values)
+        pos += 8 * count
+    index.types = data[pos:]
+    return index
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""A cache of parsed logs, so that a log is parsed only the first time it is
+opened.
+
+The protocols parsed from an XML log are saved in the binary log format (see
+smplayer._binlog), either next to the log or in a cache directory. A small
+JSON key file is saved with it, which contains the path, size and
+modification time of the log and the context it was parsed in. The cached
+protocols are only used while all of these match.
+
+A log that was modified just before it was cached could be modified again
+without changing its modification time, as file systems only store it with a
+limited precision. The key of such a log also contains its SHA-256 digest,
+which is then checked as well.
+
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from . import _binlog as binlog
+from . import _checkpoint as ckpt
+from . import _parser as parser
+from .protocol import context as ctx
+
+"""Logs modified less than this many nanoseconds before they are cached are
+also identified by their digest. Covers the coarsest common file system
+timestamps (2 seconds on FAT)."""
+_AMBIGUOUS_NS = 2 * 10**9
+
+class LogCache(object):
+
+    """The cache entry of a single log.
+
+    Attributes:
+        filename: The path of the cached binary log.
+        key_filename: The path of the key file.
+
+    """
+
+    def __init__(self, log_filename, cache_dir=None, context=None):
+        """Describes the cache entry of the log in *log_filename* parsed in
+        *context*, which is stored next to the log if *cache_dir* is None."""
+        self._log = os.path.abspath(log_filename)
+        if cache_dir is None:
+            self.filename = log_filename + ".cache"
+        else:
+            name = hashlib.sha256(self._log.encode()).hexdigest()
+            self.filename = os.path.join(cache_dir, name + ".cache")
+        self.key_filename = self.filename + ".key"
+        self._context = context or ctx.default_context
+        self._stat = os.stat(self._log)
+        self._digest = None
+
+    def load(self, arrays=False):
+        """Returns the cached protocols as a BinaryLog, or None if the log is
+        not cached or has changed since it was cached."""
+        try:
+            with open(self.key_filename) as f:
+                key = json.load(f)
+            digest = key.pop("sha256", None)
+            if key != self._key():
+                return None
+            # Only ambiguous keys have a digest, see save().
+            if digest is not None and digest != self._hexdigest():
+                return None
+            return binlog.BinaryLog(self.filename, arrays)
+        except (OSError, ValueError, AttributeError, TypeError, parser.LogError):
+            return None
+
+    def save(self, protocols):
+        """Saves protocols parsed from the log to the cache.
+
+        Nothing is saved if the log has changed since this object was created,
+        as the protocols may not match it anymore.
+
+        Raises:
+            OSError: If the cache can't be written.
+            ValueError: If the protocols can't be written to a binary log
+                (see write_binary_log()).
+
+        """
+        stat = os.stat(self._log)
+        if (stat.st_size, stat.st_mtime_ns) != (self._stat.st_size, self._stat.st_mtime_ns):
+            return
+
+        key = self._key()
+        if time.time_ns() - self._stat.st_mtime_ns < _AMBIGUOUS_NS:
+            key["sha256"] = self._hexdigest()
+        dirname = os.path.dirname(self.filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        # Remove the key first, so that the entry is never valid while the
+        # cached log is replaced.
+        try:
+            os.remove(self.key_filename)
+        except FileNotFoundError:
+            pass
+        binlog.write_binary_log(protocols, self.filename, self._context)
+        temp = self.key_filename + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(key, f)
+        os.replace(temp, self.key_filename)
+
+    def _key(self):
+        """Returns the key of the log, without its digest."""
+        return {"path": self._log, "size": self._stat.st_size,
+                "mtime_ns": self._stat.st_mtime_ns,
+                "mod": self._context.mod, "computing": self._context.computing}
+
+    def _hexdigest(self):
+        """Returns the SHA-256 digest of the log, which reads all of it."""
+        if self._digest is None:
+            prefix = ckpt.PrefixDigest(self._log)
+            prefix.advance(self._stat.st_size)
+            self._digest = prefix.hexdigest()
+        return self._digest
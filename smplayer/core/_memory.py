@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Memory profile of the phases of an audit.
+
+The memory allocated by Python is traced with tracemalloc while protocols are
+read from the log (parse), simulated and their results cached (simulate, see
+Block.result), verified in batches, in worker processes or without caching
+their results (verify, see SMPlayer.cache_results) and hashed (hash). For
+every phase and protocol type, the profile has
+
+    retained  the bytes still allocated after the phase, e.g. the protocols
+              read or the simulation results cached
+    freed     the bytes allocated before the phase that it released, e.g.
+              streamed protocols dropped after they were verified
+    peak      the most bytes allocated temporarily for a single protocol
+    high      the most bytes traced in total while in the phase, since
+              tracing started
+
+The sizes of the protocols and their cached ProtocolResults, including the
+protocol-specific traces (e.g. MultiplicationSimulation), are measured as
+well, which tells which structure dominates the memory of an audit.
+
+Profiling is enabled by setting SMPlayer.memory to a MemoryProfile and
+calling start(). Tracing slows down everything considerably, so this should
+not be combined with SMPlayer.stats. Protocols parsed or verified in worker
+processes are not traced.
+
+"""
+
+import json
+import sys
+import tracemalloc
+
+from . import _vector as vector
+
+"""The order in which phases are reported."""
+PHASES = ("parse", "simulate", "verify", "hash")
+
+def sizeof(value, seen=None):
+    """Returns the bytes used by *value*, including the objects it contains.
+
+    *value* can be a vector, a tuple or list of vectors or a dict of those.
+    Objects in *seen* (a set of ids) are not counted, and objects counted are
+    added to it, so objects shared by several values are counted once.
+
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if vector.is_array(value):
+        if value.base is not None and not isinstance(value.base, bytes):
+            size += sizeof(value.base, seen)
+        return size
+    if isinstance(value, dict):
+        for (k, v) in value.items():
+            size += sizeof(k, seen) + sizeof(v, seen)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += sizeof(v, seen)
+    return size
+
+def _nothing():
+    pass
+
+class MemoryStats(object):
+
+    """The memory of a phase (for one protocol type or in total).
+
+    Attributes:
+        count: The number of protocols.
+        retained: The bytes still allocated after the phase.
+        freed: The bytes allocated before the phase that it released.
+        peak: The most bytes allocated temporarily for a single protocol.
+        high: The most bytes traced in total while in the phase.
+
+    """
+
+    __slots__ = ("count", "retained", "freed", "peak", "high")
+
+    def __init__(self):
+        self.count = 0
+        self.retained = 0
+        self.freed = 0
+        self.peak = 0
+        self.high = 0
+
+    def add(self, other):
+        """Adds the counters of another MemoryStats to this one."""
+        self.count += other.count
+        self.retained += other.retained
+        self.freed += other.freed
+        self.peak = max(self.peak, other.peak)
+        self.high = max(self.high, other.high)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class SizeStats(object):
+
+    """The sizes of the protocols of a type and their simulation results.
+
+    Attributes:
+        count: The number of protocols.
+        protocol: The bytes of the vectors of the protocols (input, output
+            and messages).
+        output: The bytes of the simulated outputs, excluding vectors shared
+            with the protocols.
+        messages: The bytes of the simulated messages, excluding vectors
+            shared with the protocols.
+        trace: The bytes of the protocol-specific traces of the simulations
+            (the simulation attribute of ProtocolResult).
+
+    """
+
+    __slots__ = ("count", "protocol", "output", "messages", "trace")
+
+    def __init__(self):
+        self.count = 0
+        self.protocol = 0
+        self.output = 0
+        self.messages = 0
+        self.trace = 0
+
+    def add(self, other):
+        """Adds the sizes of another SizeStats to this one."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class MemoryProfile(object):
+
+    """The memory profile of all phases of an audit.
+
+    Measurements can be nested, e.g. reading protocols while verifying them;
+    the memory retained by a nested measurement is not counted again by the
+    enclosing one.
+
+    Attributes:
+        phases: A dict from phase names to dicts from protocol type names to
+            MemoryStats.
+        sizes: A dict from protocol type names to SizeStats.
+        sites: The number of source lines with the most memory allocated at
+            the end of the profile to report.
+        top: A list of (site, bytes) pairs, the source lines (as
+            "file:line") with the most memory allocated when the profile was
+            stopped.
+        peak: The most bytes traced in total while profiling.
+
+    """
+
+    def __init__(self, sites=10):
+        self.phases = {}
+        self.sizes = {}
+        self.sites = sites
+        self.top = []
+        self.peak = 0
+        self._baseline = 0
+        self._overhead = 0
+        self._started = False
+        self._frames = []
+
+    def start(self):
+        """Starts tracing memory allocations, unless tracemalloc is already
+        tracing."""
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        (self._baseline, _) = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self._calibrate()
+
+    def stop(self):
+        """Records the source lines with the most memory allocated and stops
+        tracing, if start() started it."""
+        if not tracemalloc.is_tracing():
+            return
+        (_, peak) = tracemalloc.get_traced_memory()
+        self._fold(peak)
+        if self.sites:
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__)))
+            self.top = [("{0}:{1}".format(s.traceback[0].filename, s.traceback[0].lineno), s.size)
+                    for s in snapshot.statistics("lineno")[:self.sites]]
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def get(self, phase, kind):
+        """Returns the MemoryStats of a phase and protocol type, creating it
+        if necessary."""
+        kinds = self.phases.setdefault(phase, {})
+        if kind not in kinds:
+            kinds[kind] = MemoryStats()
+        return kinds[kind]
+
+    def measure(self, phase, function, *args, kind=None):
+        """Returns *function(\\*args)*, recording the memory it allocates in
+        *phase*.
+
+        The protocol type is *kind*, or the type of the first argument if
+        None.
+
+        """
+        if not tracemalloc.is_tracing():
+            return function(*args)
+        self._begin()
+        try:
+            return function(*args)
+        finally:
+            self._end(phase, kind if kind is not None else args[0].__class__.__name__)
+
+    def track(self, phase, protocols, kind=None, count=True):
+        """Yields the items of the iterable *protocols*, recording the
+        memory allocated to get every one of them in *phase*.
+
+        The protocol type is *kind*, or the type of the item if None. If
+        *count* is False, the items are not counted as protocols (e.g. when
+        they are the indices of protocols that did not verify).
+
+        """
+        protocols = iter(protocols)
+        while True:
+            if not tracemalloc.is_tracing():
+                yield from protocols
+                return
+            self._begin()
+            try:
+                protocol = next(protocols, None)
+            except BaseException:
+                self._end(phase, kind or "*")
+                raise
+            if protocol is None:
+                self._end(phase, kind or "*", count=0)
+                return
+            self._end(phase, kind or protocol.__class__.__name__, count=int(count))
+            yield protocol
+
+    def record_sizes(self, protocol):
+        """Adds the sizes of *protocol* and its cached simulation result to
+        the sizes of its type."""
+        seen = set()
+        stats = self.sizes.setdefault(protocol.__class__.__name__, SizeStats())
+        stats.count += 1
+        for value in (protocol.input, protocol.output,
+                getattr(protocol, "send", None), getattr(protocol, "recv", None)):
+            stats.protocol += sizeof(value, seen) if value is not None else 0
+        result = protocol._cached
+        if result is None:
+            return
+        if not hasattr(result, "simulation"):
+            # Blocks that are not protocols only have an output.
+            stats.output += sizeof(result, seen)
+            return
+        stats.output += sizeof(result.output, seen)
+        stats.messages += sizeof(result.send, seen)
+        stats.trace += sizeof(result.simulation, seen) if result.simulation is not None else 0
+
+    def total(self, phase):
+        """Returns a MemoryStats with the totals over all protocol types of a
+        phase."""
+        total = MemoryStats()
+        for stats in self.phases.get(phase, {}).values():
+            total.add(stats)
+        return total
+
+    def total_sizes(self):
+        """Returns a SizeStats with the sum of the sizes of all protocol
+        types."""
+        total = SizeStats()
+        for stats in self.sizes.values():
+            total.add(stats)
+        return total
+
+    def _fold(self, peak):
+        """Folds the peak traced memory since the last reset into the peaks
+        of the profile and of all current measurements."""
+        peak -= self._baseline
+        self.peak = max(self.peak, peak)
+        for frame in self._frames:
+            frame[1] = max(frame[1], peak)
+
+    def _calibrate(self):
+        """Measures the memory that a measurement of nothing retains, which
+        is subtracted from all measurements."""
+        self._overhead = 0
+        for _ in range(3):
+            stats = MemoryStats()
+            self.phases[None] = {"*": stats}
+            self.measure(None, _nothing, kind="*")
+        del self.phases[None]
+        self._overhead = stats.retained - stats.freed
+
+    def _begin(self):
+        (current, peak) = tracemalloc.get_traced_memory()
+        self._fold(peak)
+        tracemalloc.reset_peak()
+        current -= self._baseline
+        # The traced memory at the start, the peak since then and the memory
+        # retained by nested measurements.
+        self._frames.append([current, current, 0])
+
+    def _finish(self):
+        """Ends the current measurement and returns the memory retained, the
+        traced memory at the start, the peak and the memory retained by
+        nested measurements."""
+        (current, peak) = tracemalloc.get_traced_memory()
+        self._fold(peak)
+        (start, high, nested) = self._frames.pop()
+        retained = current - self._baseline - start - self._overhead
+        if self._frames:
+            self._frames[-1][2] += retained
+        return (retained, start, high, nested)
+
+    def _end(self, phase, kind, count=1):
+        (retained, start, high, nested) = self._finish()
+        stats = self.get(phase, kind)
+        stats.count += count
+        # A phase can release memory retained by an earlier one, which is
+        # counted separately, so that neither counter is ever negative.
+        retained -= nested
+        stats.retained += max(retained, 0)
+        stats.freed += max(-retained, 0)
+        stats.peak = max(stats.peak, high - start)
+        stats.high = max(stats.high, high)
+
+    def _order(self):
+        return sorted(self.phases, key=lambda p: (PHASES.index(p) if p in PHASES else len(PHASES), p))
+
+    def as_dict(self):
+        """Returns the profile as a dict that can be serialized as JSON."""
+        return {"peak": self.peak,
+                "phases": {phase: {"total": self.total(phase).as_dict(),
+                                   "types": {kind: stats.as_dict() for (kind, stats) in sorted(self.phases[phase].items())}}
+                           for phase in self._order()},
+                "sizes": {"total": self.total_sizes().as_dict(),
+                          "types": {kind: stats.as_dict() for (kind, stats) in sorted(self.sizes.items())}},
+                "top": [{"site": site, "bytes": size} for (site, size) in self.top]}
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=1)
+
+    def format(self):
+        """Returns the profile as a human-readable report."""
+        lines = ["peak traced memory: {0} bytes".format(self.peak), "",
+                "{0:<24} {1:>10} {2:>14} {3:>14} {4:>14} {5:>14}".format(
+                "phase", "protocols", "retained", "freed", "peak", "high")]
+        row = "{0:<24} {1.count:10d} {1.retained:14d} {1.freed:14d} {1.peak:14d} {1.high:14d}"
+        for phase in self._order():
+            lines.append(row.format(phase, self.total(phase)))
+            kinds = self.phases[phase]
+            if len(kinds) > 1:
+                for (kind, stats) in sorted(kinds.items()):
+                    lines.append(row.format("  " + kind, stats))
+
+        if self.sizes:
+            lines += ["", "{0:<24} {1:>10} {2:>14} {3:>14} {4:>14} {5:>14}".format(
+                    "sizes", "protocols", "protocol", "output", "messages", "trace")]
+            row = "{0:<24} {1.count:10d} {1.protocol:14d} {1.output:14d} {1.messages:14d} {1.trace:14d}"
+            lines.append(row.format("total", self.total_sizes()))
+            for (kind, stats) in sorted(self.sizes.items()):
+                lines.append(row.format("  " + kind, stats))
+
+        if self.top:
+            lines += ["", "{0:<64} {1:>14}".format("allocated at", "bytes")]
+            lines += ["{0:<64} {1:14d}".format(site, size) for (site, size) in self.top]
+        return "\n".join(lines)
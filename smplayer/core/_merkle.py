@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Merkle trees of the messages sent or received over a channel.
+
+The leaves of a tree are the hashes of the individual messages in the order
+of the protocols that sent or received them, so two trees of the same
+channel can be compared to find the first differing message with a
+logarithmic number of hash comparisons instead of comparing whole logs.
+
+All hashes are SHA-256. A leaf is the hash of a zero byte followed by the
+binary encoding of the message (see smplayer._vector.message_buffers), an
+inner node is the hash of a one byte followed by its two children. A node
+without a sibling is moved up a level unchanged.
+
+"""
+
+import array
+import hashlib
+import struct
+
+from . import _util as util
+from . import _vector as vector
+
+_HASH_SIZE = 32
+
+class MerkleTree(object):
+
+    """A Merkle tree of the messages of a single channel.
+
+    Messages are added with append(). The inner nodes are computed when they
+    are first needed.
+
+    Attributes:
+        indices: For every leaf, the index of the protocol of the message.
+
+    """
+
+    def __init__(self):
+        self.indices = array.array("Q")
+        self._leaves = bytearray()
+        self._levels = None
+
+    def __len__(self):
+        """Returns the number of leaves (messages) in the tree."""
+        return len(self.indices)
+
+    def append(self, message, index):
+        """Adds a message sent or received by the protocol at *index*."""
+        digest = hashlib.sha256(b"\0")
+        for buffer in vector.message_buffers(message):
+            digest.update(buffer)
+        self._leaves += digest.digest()
+        self.indices.append(index)
+        self._levels = None
+
+    @property
+    def levels(self):
+        """A list of the levels of the tree, starting with the leaves. Each
+        level is a bytes object containing the concatenated node hashes."""
+        if self._levels is None:
+            levels = [bytes(self._leaves)]
+            while len(levels[-1]) > _HASH_SIZE:
+                level = levels[-1]
+                parents = bytearray()
+                for i in range(0, len(level), 2 * _HASH_SIZE):
+                    pair = level[i : i + 2 * _HASH_SIZE]
+                    if len(pair) == _HASH_SIZE:
+                        parents += pair
+                    else:
+                        parents += hashlib.sha256(b"\1" + pair).digest()
+                levels.append(bytes(parents))
+            self._levels = levels
+        return self._levels
+
+    @property
+    def root(self):
+        """The root hash of the tree, or None if the tree is empty."""
+        return self._node(len(self.levels) - 1, 0)
+
+    def _node(self, level, i):
+        """Returns the hash of node *i* of *level*, or None if there is none.
+
+        Levels above the root contain only the root, so that trees of
+        different heights can be compared level by level.
+
+        """
+        levels = self.levels
+        if level >= len(levels):
+            level = len(levels) - 1
+            if i > 0:
+                return None
+        return levels[level][i * _HASH_SIZE : (i + 1) * _HASH_SIZE] or None
+
+    def first_divergence(self, other):
+        """Returns the index of the first leaf which differs between this tree
+        and *other* (or is missing from one of them), or None if the trees are
+        equal.
+
+        Only one path from the root to a leaf is followed, comparing a single
+        pair of nodes on each level.
+
+        """
+        height = max(len(self.levels), len(other.levels))
+        if self._node(height - 1, 0) == other._node(height - 1, 0):
+            return None
+
+        # Equal nodes have equal leaves below them, so descend to the right
+        # child if the left children are equal and to the left one otherwise.
+        i = 0
+        for level in range(height - 1, 0, -1):
+            left = self._node(level - 1, 2 * i)
+            if left is not None and left == other._node(level - 1, 2 * i):
+                i = 2 * i + 1
+            else:
+                i = 2 * i
+        return i
+
+_MAGIC = b"SMPMRKL1"
+
+def save_merkle_trees(trees, filename):
+    """Saves a dict from channel names to MerkleTrees to a file."""
+    with open(filename, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<I", len(trees)))
+        for (name, tree) in trees.items():
+            encoded = name.encode()
+            f.write(struct.pack("<HQ", len(encoded), len(tree)))
+            f.write(encoded)
+            f.write(util.little_endian(tree.indices).tobytes())
+            for level in tree.levels:
+                f.write(level)
+
+def load_merkle_trees(filename):
+    """Loads a dict from channel names to MerkleTrees saved by
+    save_merkle_trees().
+
+    Raises:
+        ValueError: If the file is not a saved set of Merkle trees.
+
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if not data.startswith(_MAGIC):
+        raise ValueError("{0} does not contain Merkle trees".format(filename))
+
+    try:
+        pos = len(_MAGIC)
+        (count, ) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        trees = {}
+        for _ in range(0, count):
+            (name_len, n) = struct.unpack_from("<HQ", data, pos)
+            pos += 10
+            name = data[pos : pos + name_len].decode()
+            pos += name_len
+
+            tree = MerkleTree()
+            tree.indices.frombytes(data[pos : pos + 8 * n])
+            tree.indices = util.little_endian(tree.indices)
+            pos += 8 * n
+
+            levels = []
+            size = n
+            while True:
+                levels.append(data[pos : pos + size * _HASH_SIZE])
+                pos += size * _HASH_SIZE
+                if size <= 1:
+                    break
+                size = (size + 1) // 2
+            if pos > len(data):
+                raise struct.error("unexpected end of data")
+            tree._leaves = bytearray(levels[0])
+            tree._levels = levels
+            trees[name] = tree
+    except (struct.error, UnicodeDecodeError) as err:
+        raise ValueError("{0} is truncated or corrupt".format(filename)) from err
+    return trees
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Verification of protocols in a pool of worker processes.
+
+Consecutive protocols are verified in chunks, one chunk per task. Protocols
+with very long vectors are instead split into element ranges, which are
+verified in separate tasks. The vectors of such a protocol are copied into a
+multiprocessing.shared_memory block once and the workers create their slices
+of the protocol directly on top of it.
+
+"""
+
+import collections
+import concurrent.futures
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+from . import protocol as smprotocol
+from . import _batch as batch
+from . import _vector as vector
+
+def find_failures(protocols, jobs, chunk_size, batched=False, split_size=None, executor=None):
+    """Verify protocols in *jobs* worker processes and yield the indices of
+    the ones that do not verify in ascending order.
+
+    The protocols are sent to the workers in chunks of *chunk_size*
+    consecutive protocols. Only a few tasks per worker are read ahead from
+    *protocols*, so an iterator over a streamed log is never read into memory
+    as a whole.
+
+    Args:
+        protocols: An iterable of protocols.
+        jobs: The number of worker processes.
+        chunk_size: The number of protocols to verify in a single task.
+        batched: If True, the workers use the batch engine (see
+            smplayer._batch) to verify each chunk.
+        split_size: If given, protocols with at least this many output
+            elements are split into *jobs* element ranges which are verified
+            in parallel. Requires NumPy, ignored otherwise.
+        executor: A ProcessPoolExecutor with *jobs* workers to use instead of
+            starting new worker processes. It is not shut down afterwards, so
+            that it can be reused by successive calls.
+
+    """
+    if vector.numpy is None:
+        split_size = None
+
+    if executor is not None:
+        yield from _find_failures(executor, protocols, jobs, chunk_size, batched, split_size)
+        return
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        yield from _find_failures(executor, protocols, jobs, chunk_size, batched, split_size)
+
+def _find_failures(executor, protocols, jobs, chunk_size, batched, split_size):
+    """Implements find_failures() with the workers of *executor*."""
+    pending = collections.deque()
+    try:
+        for task in _tasks(executor, protocols, jobs, chunk_size, batched, split_size):
+            pending.append(task)
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().failures()
+        while pending:
+            yield from pending.popleft().failures()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _tasks(executor, protocols, jobs, chunk_size, batched, split_size):
+    """Submits the verification of *protocols* to *executor* and yields a task
+    for every chunk or split protocol in the order of the protocols."""
+    chunk = []
+    start = 0
+    for (i, protocol) in enumerate(protocols):
+        if split_size and _size(protocol) >= split_size and _is_splittable(protocol):
+            if chunk:
+                yield _ChunkTask(executor, start, chunk, batched)
+            yield _SplitTask(executor, i, protocol, jobs)
+            chunk = []
+        else:
+            chunk.append(protocol)
+            if len(chunk) == chunk_size:
+                yield _ChunkTask(executor, start, chunk, batched)
+                chunk = []
+        if not chunk:
+            start = i + 1
+    if chunk:
+        yield _ChunkTask(executor, start, chunk, batched)
+
+def _verify_chunk(start, protocols, batched):
+    """Verify a chunk of protocols starting at index *start* of the log and
+    return the indices of the ones that do not verify."""
+    if batched:
+        verdicts = batch.verify_batch(protocols)
+    else:
+        # The simulation results would be dropped with the worker's copy of
+        # the protocols anyway.
+        verdicts = [p.check() for p in protocols]
+    return [start + i for (i, ok) in enumerate(verdicts) if not ok]
+
+class _ChunkTask(object):
+
+    """Verification of a chunk of consecutive protocols in a worker."""
+
+    def __init__(self, executor, start, protocols, batched):
+        self._future = executor.submit(_verify_chunk, start, protocols, batched)
+
+    def failures(self):
+        """Waits for the task and returns the indices of failing protocols."""
+        return self._future.result()
+
+    def cancel(self):
+        self._future.cancel()
+
+class _SharedVector(object):
+
+    """Describes where a vector is stored in a shared memory block."""
+
+    def __init__(self, offset, length, dtype):
+        self.offset = offset
+        self.length = length
+        self.dtype = dtype
+
+class _SplitTask(object):
+
+    """Verification of a single protocol split into element ranges, each of
+    which is verified in a worker."""
+
+    def __init__(self, executor, index, protocol, parts):
+        self._index = index
+        self._memory = None
+        self._futures = []
+
+        # Lay out all vectors of the protocol one after another, aligned to 8
+        # bytes, and copy them to a shared memory block.
+        arrays = []
+        size = 0
+        def layout(v):
+            nonlocal size
+            array = v if vector.is_array(v) else vector.exact_array(v)
+            shared = _SharedVector(size, len(array), array.dtype.str)
+            arrays.append((shared, array))
+            size += (array.nbytes + 7) // 8 * 8
+            return shared
+        template = vector.map_vectors(layout, _arguments(protocol))
+
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            for (shared, array) in arrays:
+                _view(self._memory, shared)[:] = array
+            del arrays
+
+            n = _size(protocol)
+            spec = (self._memory.name, type(protocol), protocol.context, template, n)
+            for i in range(0, parts):
+                lo, hi = n * i // parts, n * (i + 1) // parts
+                if lo < hi:
+                    self._futures.append(executor.submit(_verify_range, spec, lo, hi))
+        except BaseException:
+            # Nobody else will release the block if the task is not created.
+            self.cancel()
+            raise
+
+    def failures(self):
+        """Waits for the task and returns [index] if the protocol failed."""
+        try:
+            ok = all([f.result() for f in self._futures])
+        finally:
+            self.cancel()
+        return [] if ok else [self._index]
+
+    def cancel(self):
+        for f in self._futures:
+            f.cancel()
+        if self._memory is not None:
+            # Workers that are still attached keep their mapping, this only
+            # removes the name of the block.
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+def _arguments(protocol):
+    """Returns the vector arguments *protocol* was initialized with."""
+    if isinstance(protocol, smprotocol.Protocol):
+        return (protocol.input, protocol.output, protocol.send, protocol.recv)
+    return (protocol.input, protocol.output)
+
+def _size(protocol):
+    """Returns the number of output elements of *protocol*."""
+    return len(protocol.output) if vector.is_vector(protocol.output) else 0
+
+def _is_splittable(protocol):
+    """Checks that every vector of *protocol* can be split into as many equal
+    parts as there are output elements, and fits in a shared array."""
+    n = _size(protocol)
+    splittable = True
+    def check(v):
+        nonlocal splittable
+        if not vector.is_vector(v) or len(v) % n != 0:
+            splittable = False
+        elif vector.is_array(v):
+            splittable = splittable and v.dtype != object
+        else:
+            splittable = splittable and 0 <= min(v) and max(v) < 2**64
+    vector.map_vectors(check, _arguments(protocol))
+    return splittable
+
+def _view(memory, shared):
+    """Returns an array view of a vector stored in shared memory."""
+    return vector.numpy.ndarray((shared.length, ), dtype=shared.dtype,
+            buffer=memory.buf, offset=shared.offset)
+
+def _attach(name):
+    """Attaches to an existing shared memory block without tracking it.
+
+    Only the creating process is responsible for unlinking the block. Before
+    Python 3.13, attaching always registers the block with the resource
+    tracker, which forked workers share with the parent, so the registration
+    is suppressed here rather than undone afterwards.
+
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = _ignore
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _ignore(*args):
+    """Does nothing."""
+
+def _verify_range(spec, lo, hi):
+    """Verify the output elements [lo, hi) of a protocol stored in shared memory."""
+    (name, protocol_type, context, template, n) = spec
+    memory = _attach(name)
+    try:
+        def view(shared):
+            # Every vector contains the same number of values per output element.
+            k = shared.length // n
+            return _view(memory, shared)[lo * k : hi * k]
+        protocol = protocol_type(*vector.map_vectors(view, template), context=context)
+        ok = protocol.check()
+        # Drop all views to the block before closing it.
+        del protocol
+        return ok
+    finally:
+        memory.close()
@@ -31,9 +31,17 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """
 
+import concurrent.futures
+import itertools
+import mmap
+import os
+import re
+import time
 import xml.etree.ElementTree as ET
 
 from . import protocol as smprotocol
+from . import _stats as smstats
+from . import _vector as smvector
 
 class LogError(Exception):
 
@@ -54,31 +62,169 @@ _supported_protocols = {
         "sum": smprotocol.Summation,
     }
 
-def parse_log(filename):
+def parse_log(filename, arrays=False, jobs=1, context=None):
     """Parse a Sharemind Application Server audit log and return a tuple of protocols.
 
     Args:
         filename: Path to the audit log.
+        arrays: If True, vectors are parsed into NumPy uint32 arrays instead
+            of lists of integers. Requires NumPy.
+        jobs: The number of worker processes to parse the log in. The log is
+            split into chunks of consecutive protocols, which are parsed in
+            parallel (see _parse_parallel).
+        context: The context of the protocols. The default context is used if
+            None. The log itself does not say how many computing nodes there
+            are, so this must be given for set-ups with other than 3 nodes.
 
     Raises:
         ParseError: If the log file can't be parsed.
         LogError: If the parsed log file contains errors.
 
     """
+    if jobs > 1:
+        protocols = _parse_parallel(filename, arrays, jobs, context)
+        if protocols is not None:
+            return protocols
+    return tuple(iter_log(filename, arrays, context))
+
+def iter_log(filename, arrays=False, context=None):
+    """Parse a Sharemind Application Server audit log incrementally, yielding
+    one protocol at a time.
+
+    The whole element tree is never built: every top-level protocol element is
+    discarded as soon as it has been parsed, so memory use is bounded by the
+    largest single protocol in the log instead of the size of the log.
+
+    Logs in the layout written by the Application Server are read with a fast
+    scanner (see _scan_protocols) from a memory map of the file. Anything the
+    scanner does not recognize is parsed with ElementTree instead, so the
+    protocols returned and the errors raised are the same either way.
+
+    Args:
+        filename: Path to the audit log.
+        arrays: If True, vectors are parsed into NumPy uint32 arrays instead
+            of lists of integers. Requires NumPy.
+        context: The context of the protocols, see parse_log().
+
+    Raises:
+        LogError: If the log file can't be parsed or contains errors. As the
+            log is read lazily, the error is raised only once the offending
+            part of the log is reached.
+
+    """
+    if arrays:
+        smvector.require_numpy()
+
+    count = 0
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped.
+            data = None
+
+    if data is not None:
+        with data:
+            try:
+                for protocol in _scan_protocols(data, arrays, context):
+                    yield protocol
+                    count += 1
+                return
+            except _Unrecognized:
+                pass
+
+    # Parse the whole log with ElementTree, skipping the protocols that the
+    # scanner already returned.
     try:
-        audit = ET.parse(filename).getroot()
+        events = ET.iterparse(filename, events=("start", "end"))
+        yield from itertools.islice(_iter_protocols(events, arrays, context), count, None)
     except ET.ParseError:
         raise LogError("XML parsing failed")
 
-    if audit.tag != "audit":
-        raise LogError("root element is not <audit>")
+def follow_log(filename, arrays=False, poll_interval=1.0, idle_timeout=None, context=None):
+    """Parse an audit log that is still being written, yielding every protocol
+    as soon as its element is complete.
 
-    protocols = []
-    for protocol in audit:
-        protocols.append(_parse_protocol(protocol))
-    return tuple(protocols)
+    New data is read from the end of the file whenever it appears. The log is
+    polled every *poll_interval* seconds until the <audit> element is closed
+    or, if *idle_timeout* is not None, until the log has not grown for that
+    many seconds. In the latter case, the protocols that are still incomplete
+    are not returned.
 
-def _parse_protocol(protocol):
+    Args:
+        filename: Path to the audit log.
+        arrays: If True, vectors are parsed into NumPy uint32 arrays instead
+            of lists of integers. Requires NumPy.
+        poll_interval: The number of seconds to wait for new data.
+        idle_timeout: The number of seconds without new data after which to
+            stop, or None to wait for the end of the log.
+        context: The context of the protocols, see parse_log().
+
+    Raises:
+        LogError: If the log can't be parsed, contains errors or is truncated
+            while it is followed.
+
+    """
+    if arrays:
+        smvector.require_numpy()
+    return _iter_protocols(_follow_events(filename, poll_interval, idle_timeout), arrays, context)
+
+"""The number of bytes read from a followed log at once."""
+_FOLLOW_BLOCK_SIZE = 2**16
+
+def _follow_events(filename, poll_interval, idle_timeout):
+    """Yield the ElementTree (event, element) pairs of a growing log for
+    _iter_protocols, see follow_log()."""
+    pull = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    last_data = time.monotonic()
+    with open(filename, "rb") as f:
+        while True:
+            data = f.read(_FOLLOW_BLOCK_SIZE)
+            if not data:
+                if os.fstat(f.fileno()).st_size < f.tell():
+                    raise LogError("log was truncated")
+                if idle_timeout is not None and time.monotonic() - last_data >= idle_timeout:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            last_data = time.monotonic()
+            try:
+                pull.feed(data)
+                events = list(pull.read_events())
+            except ET.ParseError:
+                raise LogError("XML parsing failed")
+            for (event, element) in events:
+                if root is None:
+                    root = element
+                yield (event, element)
+                if event == "end" and element is root:
+                    return
+
+def _iter_protocols(events, arrays=False, context=None):
+    """Yield the protocols described by an iterable of ElementTree (event, element)
+    pairs, where event is either "start" or "end"."""
+    root = None
+    depth = 0
+    for event, element in events:
+        if event == "start":
+            if root is None:
+                if element.tag != "audit":
+                    raise LogError("root element is not <audit>")
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            # A top-level protocol element is complete. Drop it from the root
+            # element once parsed to keep the tree from growing.
+            protocol = _parse_protocol(element, arrays, context)
+            root.clear()
+            yield protocol
+
+def _parse_protocol(protocol, arrays=False, context=None):
     if protocol.tag not in _supported_protocols:
         raise LogError("unknown protocol <%s>" % protocol.tag)
 
@@ -92,28 +238,39 @@ def _parse_protocol(protocol):
         if block.tag == "input":
             if input is not None:
                 raise LogError("extra <input> element")
-            input = _parse_vectors(block)
+            input = _parse_vectors(block, arrays)
 
         elif block.tag == "output":
             if output is not None:
                 raise LogError("extra <output> element")
-            output = _parse_vectors(block)
+            output = _parse_vectors(block, arrays)
 
         elif block.tag == "send":
             node = _get_node(block)
             if node in send:
                 raise LogError("extra <send node=\"%s\"> element" % node)
-            send[node] = _parse_vectors(block)
+            send[node] = _parse_vectors(block, arrays)
 
         elif block.tag == "recv":
             node = _get_node(block)
             if node in recv:
                 raise LogError("extra <recv node=\"%s\"> element" % node)
-            recv[node] = _parse_vectors(block)
+            recv[node] = _parse_vectors(block, arrays)
 
         else:
             raise LogError("unknown block <%s>" % block.tag)
 
+    return _new_protocol(protocol.tag, input, output, send, recv, context)
+
+def _new_protocol(tag, input, output, send, recv, context=None):
+    if smstats.active is not None:
+        start = smstats.clock()
+        protocol = _construct(tag, input, output, send, recv, context)
+        smstats.active.record_construct(protocol.__class__.__name__, start)
+        return protocol
+    return _construct(tag, input, output, send, recv, context)
+
+def _construct(tag, input, output, send, recv, context):
     args = [input, output]
     if len(send) > 0 or len(recv) > 0:
         # If the log contained send or receive blocks, then assume we are
@@ -125,19 +282,19 @@ def _parse_protocol(protocol):
 
     try:
         # Initialize a new protocol instance with the parsed arguments
-        return _supported_protocols[protocol.tag](*args)
+        return _supported_protocols[tag](*args, context=context)
     except Exception as err:
-        raise LogError("failed initializing <%s>" % protocol.tag) from err
+        raise LogError("failed initializing <%s>" % tag) from err
 
 def _get_node(block):
     if "node" not in block.attrib:
         raise LogError("<%s> element without \"node\" attribute" % block.tag)
     return block.attrib["node"]
 
-def _parse_vectors(parent):
+def _parse_vectors(parent, arrays=False):
     vectors = []
     for vector in parent:
-        vectors.append(_parse_vector(vector))
+        vectors.append(_parse_vector(vector, arrays))
 
     if len(vectors) == 0:
         raise LogError("no <vector> elements found in <%s>" % parent.tag)
@@ -146,9 +303,9 @@ def _parse_vectors(parent):
     else:
         return tuple(vectors)
 
-def _parse_vector(vector):
+def _parse_vector(vector, arrays=False):
     if vector.tag != "vector":
-        raise LogError("expected <vector>, but got <%s>" % s)
+        raise LogError("expected <vector>, but got <%s>" % vector.tag)
 
     values = []
     for value in vector:
@@ -156,11 +313,11 @@ def _parse_vector(vector):
 
     if len(values) == 0:
         raise LogError("empty <vector>")
-    return values
+    return smvector.array(values) if arrays else values
 
 def _parse_value(value):
     if value.tag != "value":
-        raise LogError("expected <value>, but got <%s>" % s)
+        raise LogError("expected <value>, but got <%s>" % value.tag)
 
     # All values should be 32-bit unsigned integers
     try:
@@ -170,3 +327,204 @@ def _parse_value(value):
         return integer
     except ValueError as err:
         raise LogError("<value> contains unsupported value") from err
+
+class _Unrecognized(Exception):
+    """Raised by _scan_protocols if the log is not in the layout it recognizes."""
+
+_XML_DECLARATION = re.compile(rb"(?:\xef\xbb\xbf)?\s*(?:<\?xml\s([^>]*)\?>)?\s*<audit>")
+_ENCODING = re.compile(rb"""encoding\s*=\s*["']([^"']*)["']""")
+_START_TAG = re.compile(rb"\s*<(\w+)>")
+_BLOCK = re.compile(rb"""\s*<(input|output|send|recv)(?:\s+node="([\w-]*)")?>"""
+        rb"""((?:\s*<vector>(?:\s*<value>\d+</value>)+\s*</vector>)+)\s*</\1>""")
+_AUDIT_END = re.compile(rb"\s*</audit>\s*\Z")
+
+"""A bytes.translate() table that replaces everything except digits with spaces."""
+_DIGITS_ONLY = bytes(c if c in b"0123456789" else ord(" ") for c in range(256))
+
+def _scan_protocols(data, arrays=False, context=None):
+    """Yield the protocols of a log given as bytes (or a memory map).
+
+    Audit logs are written in a rigid layout, so instead of building elements
+    this scanner matches the layout with regular expressions over the raw
+    bytes and converts all values of a block at once. A protocol that does
+    not match the layout (e.g. contains comments, entities or missing
+    attributes) is parsed with ElementTree and _parse_protocol, so the errors
+    raised for it are the usual ones.
+
+    Raises:
+        _Unrecognized: If the structure of the log outside the protocols is
+            not recognized (e.g. a DOCTYPE, comments between protocols or
+            another encoding than UTF-8). The log must then be parsed with
+            ElementTree.
+
+    """
+    (start, end) = _scan_bounds(data)
+    yield from _scan_range(data, start, end, arrays, context)
+
+def _scan_bounds(data):
+    """Return the positions in *data* where the first protocol may start and
+    where the closing </audit> tag is, or raise _Unrecognized."""
+    match = _XML_DECLARATION.match(data)
+    if match is None:
+        raise _Unrecognized()
+    if match.group(1) is not None:
+        encoding = _ENCODING.search(match.group(1))
+        if encoding is not None and encoding.group(1).lower() not in (b"utf-8", b"us-ascii"):
+            raise _Unrecognized()
+
+    end = data.rfind(b"</audit>")
+    if end < match.end() or _AUDIT_END.match(data, end) is None:
+        raise _Unrecognized()
+    return (match.end(), end)
+
+def _scan_range(data, pos, end, arrays=False, context=None):
+    """Yield the protocols in *data[pos:end]*, which must contain nothing but
+    whitespace between them, or raise _Unrecognized."""
+    for (tag, start, close) in _protocol_spans(data, pos, end):
+        yield _scan_element(data, tag, start, close, arrays, context)
+
+def _protocol_spans(data, pos, end):
+    """Yield the tag of every protocol element in *data[pos:end]* with the
+    positions of its start and end tags, or raise _Unrecognized if there is
+    anything but whitespace between the elements."""
+    while True:
+        match = _START_TAG.match(data, pos, end)
+        if match is None:
+            break
+        tag = match.group(1)
+        close = data.find(b"</" + tag + b">", match.end(), end)
+        if close < 0:
+            raise _Unrecognized()
+        yield (tag, match.start(1) - 1, close)
+        pos = close + len(tag) + 3
+
+    if pos < end and not data[pos:end].isspace():
+        raise _Unrecognized()
+
+def _scan_element(data, tag, start, close, arrays=False, context=None):
+    """Return the protocol of the element with *tag* whose start tag is at
+    *start* and end tag at *close*.
+
+    Raises:
+        _Unrecognized: If the element is not well-formed XML on its own, e.g.
+            because *close* is a closing tag inside a comment.
+
+    """
+    try:
+        return _scan_protocol(tag, data[start + len(tag) + 2 : close], arrays, context)
+    except _Unrecognized:
+        try:
+            return _parse_protocol(ET.fromstring(data[start : close + len(tag) + 3]), arrays, context)
+        except ET.ParseError:
+            # Let ElementTree decide whether the whole log is valid.
+            raise _Unrecognized()
+
+"""Matches the start tag of any supported protocol."""
+_PROTOCOL_START = re.compile(b"<(?:" + b"|".join(
+        re.escape(tag.encode()) for tag in _supported_protocols) + b")>")
+
+"""The number of chunks per worker process that _parse_parallel splits a log into."""
+_CHUNKS_PER_JOB = 4
+
+def _parse_parallel(filename, arrays, jobs, context=None):
+    """Parse a log in *jobs* worker processes and return a tuple of protocols,
+    or None if the log must be parsed sequentially instead.
+
+    A pre-scan splits the log into byte ranges at the start tags of
+    protocols, which can't occur anywhere else in the layout recognized by
+    _scan_protocols. Each worker scans its range from a memory map of the
+    file. If any range is not in the recognized layout (say a start tag was
+    found inside a comment), None is returned and the log is parsed again by
+    iter_log, so the results never depend on the number of jobs.
+
+    """
+    if arrays:
+        smvector.require_numpy()
+
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    with data:
+        try:
+            (start, end) = _scan_bounds(data)
+        except _Unrecognized:
+            return None
+
+        n = jobs * _CHUNKS_PER_JOB
+        bounds = [start]
+        for i in range(1, n):
+            match = _PROTOCOL_START.search(data, max(start + (end - start) * i // n, bounds[-1] + 1), end)
+            if match is None:
+                break
+            if match.start() > bounds[-1]:
+                bounds.append(match.start())
+        bounds.append(end)
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        chunks = executor.map(_scan_chunk, itertools.repeat(filename), bounds[:-1], bounds[1:],
+                itertools.repeat(arrays), itertools.repeat(context))
+        try:
+            return tuple(itertools.chain.from_iterable(chunks))
+        except _Unrecognized:
+            return None
+
+def _scan_chunk(filename, start, end, arrays, context=None):
+    """Return a list of the protocols in bytes *start* to *end* of a log."""
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return list(_scan_range(data, start, end, arrays, context))
+
+def _scan_protocol(tag, body, arrays=False, context=None):
+    """Return the protocol with the given tag and body (the bytes between the
+    tags), or raise _Unrecognized if the body is not in the usual layout."""
+    tag = tag.decode()
+    if tag not in _supported_protocols:
+        raise LogError("unknown protocol <%s>" % tag)
+
+    blocks = {}
+    send = {}
+    recv = {}
+    pos = 0
+    while pos < len(body):
+        match = _BLOCK.match(body, pos)
+        if match is None:
+            if body[pos:].isspace():
+                break
+            raise _Unrecognized()
+        pos = match.end()
+
+        (block, node, vectors) = match.groups()
+        if block == b"send" or block == b"recv":
+            if node is None:
+                raise _Unrecognized()
+            messages = send if block == b"send" else recv
+            key = node.decode()
+        else:
+            messages = blocks
+            key = block.decode()
+        if key in messages:
+            raise _Unrecognized()
+        messages[key] = _scan_vectors(vectors, arrays)
+
+    return _new_protocol(tag, blocks.get("input"), blocks.get("output"), send, recv, context)
+
+def _scan_vectors(vectors, arrays=False):
+    """Like _parse_vectors, but for the bytes of the <vector> elements."""
+    # The tags around the values contain no digits, so the values are the
+    # only words left once everything else is blanked out.
+    values = list(map(int, vectors.translate(_DIGITS_ONLY).split()))
+    if max(values) >= 2**32:
+        raise _Unrecognized()
+    if vectors.count(b"<vector>") == 1:
+        return smvector.array(values) if arrays else values
+
+    result = []
+    offset = 0
+    for vector in vectors.split(b"</vector>")[:-1]:
+        n = vector.count(b"<value>")
+        result.append(smvector.array(values[offset : offset + n]) if arrays
+                else values[offset : offset + n])
+        offset += n
+    return tuple(result)
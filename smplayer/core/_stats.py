@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Timing and counters of the phases of an audit.
+
+An audit consists of the phases
+
+    parse      reading protocols from the log (without construct)
+    construct  creating protocol objects, including the checks of their
+               vector lengths
+    simulate   simulating protocols
+    compare    comparing the simulated output and messages with the log
+    verify     simulate and compare together, for protocols verified in
+               batches, in worker processes or without caching their results
+               (SMPlayer.cache_results)
+    hash       hashing the messages of protocols
+
+For every phase and protocol type, the wall and CPU time, the number of
+protocols and the number of vector values are counted. Bytes are counted for
+the log read by the parse phase and the messages hashed.
+
+Recording is enabled by setting SMPlayer.stats to a Stats object. Protocols
+are constructed deep inside the parsers, which record into the Stats that is
+*active* while a protocol is read (see Stats.recording()). Protocols parsed
+in worker processes (SMPlayer.open() with jobs) are not recorded.
+
+"""
+
+import contextlib
+import json
+import time
+
+from . import _vector as vector
+
+"""The order in which phases are reported."""
+PHASES = ("parse", "construct", "simulate", "compare", "verify", "hash")
+
+"""The Stats that records protocol construction, or None."""
+active = None
+
+def clock():
+    """Returns the current wall and CPU time."""
+    return (time.perf_counter(), time.process_time())
+
+def count_values(protocol):
+    """Returns the number of values in the vectors of *protocol*."""
+    total = 0
+    for value in (protocol.input, protocol.output,
+            getattr(protocol, "send", None), getattr(protocol, "recv", None)):
+        total += _count(value)
+    return total
+
+def count_message_values(protocol):
+    """Returns the number of values in the messages sent and received by
+    *protocol*."""
+    return _count(getattr(protocol, "send", None)) + _count(getattr(protocol, "recv", None))
+
+def _count(value):
+    if value is None:
+        return 0
+    if isinstance(value, dict):
+        return sum(map(_count, value.values()))
+    if vector.is_vector(value):
+        return len(value)
+    return sum(map(_count, value))
+
+class PhaseStats(object):
+
+    """The counters of a phase (for one protocol type or in total).
+
+    Attributes:
+        wall: The wall time in seconds.
+        cpu: The CPU time of the process in seconds.
+        count: The number of protocols.
+        values: The number of vector values.
+        bytes: The number of bytes read or hashed.
+
+    """
+
+    __slots__ = ("wall", "cpu", "count", "values", "bytes")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.count = 0
+        self.values = 0
+        self.bytes = 0
+
+    def add(self, other):
+        """Adds the counters of another PhaseStats to this one."""
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.count += other.count
+        self.values += other.values
+        self.bytes += other.bytes
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class Stats(object):
+
+    """The counters of all phases of an audit.
+
+    Attributes:
+        phases: A dict from phase names to dicts from protocol type names to
+            PhaseStats. Counters that are not specific to a protocol type
+            (e.g. the bytes of the log) use the type name "*".
+        construct_time: The total wall and CPU time of the construct phase,
+            which is excluded from the parse phase.
+
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.construct_time = (0.0, 0.0)
+
+    def get(self, phase, kind):
+        """Returns the PhaseStats of a phase and protocol type, creating it
+        if necessary."""
+        kinds = self.phases.setdefault(phase, {})
+        if kind not in kinds:
+            kinds[kind] = PhaseStats()
+        return kinds[kind]
+
+    def record(self, phase, kind, start, count=1, values=0, bytes=0):
+        """Records that a phase ran from *start* (a clock() value) until now
+        for *count* protocols of the type *kind*.
+
+        Returns:
+            The wall and CPU time spent.
+
+        """
+        (wall, cpu) = clock()
+        (wall, cpu) = (wall - start[0], cpu - start[1])
+        stats = self.get(phase, kind)
+        stats.wall += wall
+        stats.cpu += cpu
+        stats.count += count
+        stats.values += values
+        stats.bytes += bytes
+        return (wall, cpu)
+
+    def record_construct(self, kind, start):
+        """Records the construction of a protocol of the type *kind* since
+        *start*."""
+        (wall, cpu) = self.record("construct", kind, start)
+        self.construct_time = (self.construct_time[0] + wall, self.construct_time[1] + cpu)
+
+    def record_read(self, kind, start, construct_time, values=0):
+        """Records reading a protocol of the type *kind* since *start*,
+        excluding the time spent constructing it (the difference between
+        *construct_time* and the current construct_time)."""
+        stats = self.get("parse", kind)
+        (wall, cpu) = clock()
+        stats.wall += wall - start[0] - (self.construct_time[0] - construct_time[0])
+        stats.cpu += cpu - start[1] - (self.construct_time[1] - construct_time[1])
+        stats.count += 1
+        stats.values += values
+
+    def total(self, phase):
+        """Returns a PhaseStats with the sum over all protocol types of a phase."""
+        total = PhaseStats()
+        for stats in self.phases.get(phase, {}).values():
+            total.add(stats)
+        return total
+
+    @contextlib.contextmanager
+    def recording(self):
+        """Makes this the active Stats, which records protocol construction,
+        within a with statement."""
+        global active
+        previous = active
+        active = self
+        try:
+            yield self
+        finally:
+            active = previous
+
+    def _order(self):
+        return sorted(self.phases, key=lambda p: (PHASES.index(p) if p in PHASES else len(PHASES), p))
+
+    def as_dict(self):
+        """Returns the counters as a dict that can be serialized as JSON."""
+        return {phase: {"total": self.total(phase).as_dict(),
+                        "types": {kind: stats.as_dict() for (kind, stats) in sorted(self.phases[phase].items())}}
+                for phase in self._order()}
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=1)
+
+    def format(self):
+        """Returns the counters as a human-readable table."""
+        lines = ["{0:<24} {1:>10} {2:>10} {3:>10} {4:>12} {5:>12}".format(
+                "phase", "wall (s)", "cpu (s)", "protocols", "values", "bytes")]
+        row = "{0:<24} {1.wall:10.3f} {1.cpu:10.3f} {1.count:10d} {1.values:12d} {1.bytes:12d}"
+        for phase in self._order():
+            lines.append(row.format(phase, self.total(phase)))
+            kinds = self.phases[phase]
+            if len(kinds) > 1:
+                for (kind, stats) in sorted(kinds.items()):
+                    lines.append(row.format("  " + kind, stats))
+        return "\n".join(lines)
@@ -31,6 +31,9 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 """
 
+import array
+import sys
+
 def check_len(ls, n, name="list"):
     """Checks if *len(ls) == n*, raising a ValueError otherwise."""
     if len(ls) != n:
@@ -41,8 +44,31 @@ def check_all_len(ls, n, name="list"):
     if any(map(lambda l: len(l) != n, ls)):
         raise ValueError("All elements in {0} must be contain {1} elements".format(name, n))
 
+def chunks(iterable, n):
+    """Splits *iterable* into lists of *n* consecutive elements (the last list may be shorter)."""
+    chunk = []
+    for x in iterable:
+        chunk.append(x)
+        if len(chunk) == n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 def check_keys(d, expected, name="dict"):
     """Checks if the dict *d* contains only the keys in *expected*, raising a ValueError otherwise."""
     extra = set(d.keys()) - set(expected)
     if len(extra) > 0:
         raise KeyError("{0} contains extra keys: {1}".format(name, extra))
+
+def little_endian(values):
+    """Returns a copy of an array.array in little-endian byte order.
+
+    Applying it twice restores the native byte order, so it is used both
+    before writing an array to a file and after reading one from it.
+
+    """
+    values = array.array(values.typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
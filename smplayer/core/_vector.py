@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""Helpers for protocol vectors.
+
+A vector is either a list of integers or, if NumPy is available, a
+one-dimensional NumPy array of unsigned integers. Arrays use about 8 times
+less memory per value than lists and allow vectorized simulation, but all
+protocols accept both representations.
+
+"""
+
+import array as _array
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def require_numpy():
+    """Raises an ImportError if NumPy is not available."""
+    if numpy is None:
+        raise ImportError("NumPy is required for array-backed vectors")
+
+def dtype(mod):
+    """Returns the smallest unsigned NumPy dtype which can hold all values
+    modulo *mod*, or None if there is no such dtype."""
+    require_numpy()
+    if mod <= 2**32:
+        return numpy.dtype(numpy.uint32)
+    if mod <= 2**64:
+        return numpy.dtype(numpy.uint64)
+    return None
+
+def array(values, mod=2**32):
+    """Converts a list of integers in the range [0, *mod*) to an array."""
+    return numpy.array(values, dtype=dtype(mod))
+
+def exact_array(values):
+    """Converts a list of integers to an array of the smallest unsigned type
+    that can hold all of them, or an object array if there is none."""
+    for dtype in (numpy.uint32, numpy.uint64):
+        try:
+            return numpy.array(values, dtype=dtype)
+        except OverflowError:
+            pass
+    return numpy.array(values, dtype=object)
+
+"""The typecode of 32-bit unsigned integers in the array module."""
+_uint32_typecode = next(c for c in "IL" if _array.array(c).itemsize == 4)
+
+_uint32_le = numpy.dtype("<u4") if numpy is not None else None
+
+def uint32_bytes(values):
+    """Returns a buffer containing the values of a vector as little-endian
+    32-bit unsigned integers.
+
+    Arrays of that type are returned as they are, without copying.
+
+    Raises:
+        ValueError: If any value does not fit in 32 bits.
+
+    """
+    if is_array(values):
+        if values.dtype != _uint32_le:
+            if len(values) > 0 and (values.min() < 0 or values.max() >= 2**32):
+                raise ValueError("vector contains values that don't fit in 32 bits")
+            values = values.astype("<u4")
+        return numpy.ascontiguousarray(values)
+
+    try:
+        buffer = _array.array(_uint32_typecode, values)
+    except OverflowError as err:
+        raise ValueError("vector contains values that don't fit in 32 bits") from err
+    if sys.byteorder == "big":
+        buffer.byteswap()
+    return buffer
+
+def from_uint32_bytes(buffer, arrays=False):
+    """Returns the vector stored in a buffer of little-endian 32-bit unsigned
+    integers (see uint32_bytes).
+
+    If *arrays* is True, the vector is an array which shares memory with
+    *buffer* on little-endian machines. Otherwise it is a list.
+
+    """
+    if arrays:
+        values = numpy.frombuffer(buffer, dtype=_uint32_le)
+        return values if sys.byteorder == "little" else values.astype(numpy.uint32)
+
+    values = _array.array(_uint32_typecode)
+    values.frombytes(buffer)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+def message_buffers(message):
+    """Yields the binary encoding of a message, which is either a vector or a
+    collection of vectors, in one or more buffers.
+
+    The encoding is the number of vectors (a little-endian uint32), followed
+    by the lengths of the vectors (little-endian uint64s) and then the values
+    of the vectors as little-endian uint32s.
+
+    """
+    vectors = (message, ) if is_vector(message) else message
+    yield struct.pack("<I%dQ" % len(vectors), len(vectors), *map(len, vectors))
+    for v in vectors:
+        yield uint32_bytes(v)
+
+def is_array(value):
+    """Returns True if *value* is a NumPy array."""
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+def is_vector(value):
+    """Returns True if *value* is a single vector and not a collection of them."""
+    if is_array(value):
+        return value.ndim == 1
+    return isinstance(value, list) and not (value and
+            (is_array(value[0]) or isinstance(value[0], (list, tuple))))
+
+def map_vectors(function, value):
+    """Applies *function* to every vector in *value*, which can be a vector,
+    a tuple or list of vectors or a dict of those, and returns the results in
+    a structure like *value*."""
+    if isinstance(value, dict):
+        return { k: map_vectors(function, v) for (k, v) in value.items() }
+    if isinstance(value, (list, tuple)) and not is_vector(value):
+        return type(value)(map_vectors(function, v) for v in value)
+    return function(value)
+
+def tolist(value):
+    """Recursively converts all arrays in *value* to lists of integers.
+
+    *value* can be a vector, a tuple or list of vectors or a dict of those.
+    Lists of integers are returned as they are, so this is cheap for logs
+    parsed without arrays.
+
+    """
+    if is_array(value):
+        return value.tolist()
+    if isinstance(value, tuple):
+        return tuple(map(tolist, value))
+    if isinstance(value, list) and value and (is_array(value[0]) or isinstance(value[0], (list, tuple))):
+        return list(map(tolist, value))
+    if isinstance(value, dict):
+        return { k: tolist(v) for (k, v) in value.items() }
+    return value
+
+def equal(x, y):
+    """Compares two vectors, tuples of vectors or dicts of those.
+
+    Works like *x == y*, except that an array and a list or another array
+    are equal if they contain the same values.
+
+    """
+    if is_array(x) or is_array(y):
+        return bool(numpy.array_equal(x, y))
+    if isinstance(x, tuple) and isinstance(y, tuple):
+        return len(x) == len(y) and all(map(equal, x, y))
+    if isinstance(x, dict) and isinstance(y, dict):
+        return x.keys() == y.keys() and all(equal(x[k], y[k]) for k in x)
+    return x == y
+
+"""A dict from moduli to the NumPy types whose arithmetic wraps around at them."""
+_native_dtypes = {
+        2**8: "uint8",
+        2**16: "uint16",
+        2**32: "uint32",
+        2**64: "uint64",
+    }
+
+class Ring(object):
+
+    """Elementwise arithmetic on arrays modulo *mod*.
+
+    If *mod* is the range of a native unsigned NumPy type (e.g. 2**32), the
+    arithmetic of that type wraps around at *mod* by itself. Otherwise values
+    are kept in uint64 arrays (for *mod* < 2**32) or object arrays of Python
+    integers and reduced explicitly after every operation. In all cases the
+    results are equal to computing with Python integers and reducing modulo
+    *mod*.
+
+    Attributes:
+        mod: The modulus.
+        dtype: The NumPy dtype of all arrays returned by the ring.
+
+    """
+
+    def __init__(self, mod):
+        require_numpy()
+        self.mod = mod
+        self._native = mod in _native_dtypes
+        if self._native:
+            self.dtype = numpy.dtype(_native_dtypes[mod])
+        elif mod < 2**32:
+            self.dtype = numpy.dtype(numpy.uint64)
+        else:
+            self.dtype = numpy.dtype(object)
+
+    def asarray(self, values):
+        """Converts a vector to an array of ring elements.
+
+        Arrays of the ring's dtype are returned as they are. Values out of the
+        range [0, *mod*) are reduced.
+
+        """
+        if is_array(values):
+            if values.dtype == self.dtype and self._native:
+                return values
+            if values.dtype.kind == "u":
+                if self._native:
+                    # Casting between unsigned types truncates, i.e. reduces
+                    # modulo a power of two.
+                    return values.astype(self.dtype)
+                if self.dtype.kind == "u":
+                    return values.astype(self.dtype) % self.mod
+            values = values.astype(object)
+        elif self._native:
+            try:
+                return numpy.array(values, dtype=self.dtype)
+            except OverflowError:
+                pass
+
+        values = numpy.array(values, dtype=object) % self.mod
+        return values.astype(self.dtype, copy=False)
+
+    def add(self, x, y):
+        """Adds two arrays elementwise."""
+        if self._native:
+            return x + y
+        return (x + y) % self.mod
+
+    def sub(self, x, y):
+        """Subtracts *y* from *x* elementwise."""
+        if self._native:
+            return x - y
+        return (x + (self.mod - y)) % self.mod
+
+    def mul(self, x, y):
+        """Multiplies two arrays elementwise."""
+        if self._native:
+            return x * y
+        return (x * y) % self.mod
+
+    def sum_slices(self, x, n):
+        """Divides *x* into *n* equal-length slices and sums each of them."""
+        sums = x.reshape(n, -1).sum(axis=1, dtype=self.dtype)
+        if self._native:
+            return sums
+        # Slices are shorter than 2**32 elements, so uint64 sums of values
+        # below 2**32 can not overflow.
+        return sums % self.mod
+
+_rings = {}
+
+def ring(mod):
+    """Returns a (shared) Ring instance for *mod*."""
+    if mod not in _rings:
+        _rings[mod] = Ring(mod)
+    return _rings[mod]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+"""A cache of verification verdicts that is kept across runs.
+
+Verdicts are stored in an SQLite database under a digest of the protocol
+(see protocol_digest), so a protocol that was verified before, in any log,
+does not have to be simulated again. The digest covers the type and context
+of the protocol, all its vectors and SIMULATION_VERSION, which is increased
+whenever a simulation changes, so that verdicts of older versions are not
+used.
+
+The number of cached verdicts is bounded. When the cache is full, the verdicts
+that were least recently used are removed.
+
+"""
+
+import hashlib
+import sqlite3
+import struct
+
+from . import protocol as smprotocol
+from . import _vector as vector
+
+"""The version of the protocol simulations, which is part of every digest."""
+SIMULATION_VERSION = 1
+
+def protocol_digest(protocol):
+    """Returns the SHA-256 digest identifying the verdict of *protocol*.
+
+    Protocols get the same digest if they are of the same type, have the same
+    context and vectors, regardless of whether the vectors are lists or NumPy
+    arrays.
+
+    Raises:
+        ValueError: If any value of a vector does not fit in 32 bits.
+
+    """
+    sha = hashlib.sha256()
+    cls = type(protocol)
+    header = "{0}\0{1}.{2}\0{3}\0{4}\0".format(SIMULATION_VERSION, cls.__module__,
+            cls.__qualname__, protocol.context.mod, protocol.context.computing)
+    sha.update(header.encode())
+    _update(sha, protocol.input)
+    _update(sha, protocol.output)
+    if isinstance(protocol, smprotocol.Protocol):
+        _update(sha, protocol.send)
+        _update(sha, protocol.recv)
+    return sha.digest()
+
+def _update(sha, value):
+    """Adds an unambiguous encoding of a vector, a collection of vectors or a
+    dict of those to *sha*."""
+    if value is None:
+        sha.update(b"N")
+    elif isinstance(value, dict):
+        sha.update(struct.pack("<cQ", b"D", len(value)))
+        for key in sorted(value):
+            encoded = str(key).encode()
+            sha.update(struct.pack("<Q", len(encoded)))
+            sha.update(encoded)
+            _update(sha, value[key])
+    elif vector.is_vector(value):
+        sha.update(struct.pack("<cQ", b"V", len(value)))
+        sha.update(vector.uint32_bytes(value))
+    else:
+        sha.update(struct.pack("<cQ", b"T", len(value)))
+        for v in value:
+            _update(sha, v)
+
+class VerdictCache(object):
+
+    """Verification verdicts stored in an SQLite database.
+
+    The cache can be used as a context manager, which closes it on exit.
+
+    Attributes:
+        filename: The path of the database.
+        max_entries: The maximum number of verdicts kept in the database.
+
+    """
+
+    """The default value of max_entries. A verdict takes about 100 bytes."""
+    default_max_entries = 10**6
+
+    def __init__(self, filename, max_entries=None):
+        """Opens the cache in *filename*, creating it if it does not exist.
+
+        Raises:
+            ValueError: If *max_entries* is not positive.
+            sqlite3.Error: If the database can't be opened.
+
+        """
+        if max_entries is None:
+            max_entries = self.default_max_entries
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.filename = filename
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(filename)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS verdicts "
+                    "(digest BLOB PRIMARY KEY, verified INTEGER NOT NULL, used INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS verdicts_used ON verdicts (used)")
+        (self._clock, ) = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM verdicts").fetchone()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def lookup(self, digests):
+        """Returns a dict from those of *digests* that are in the cache to
+        their verdicts and marks them as recently used."""
+        verdicts = {}
+        # SQLite limits the number of parameters of a statement.
+        for i in range(0, len(digests), 500):
+            part = digests[i:i + 500]
+            query = "SELECT digest, verified FROM verdicts WHERE digest IN ({0})".format(
+                    ", ".join("?" * len(part)))
+            verdicts.update((bytes(d), bool(v)) for (d, v) in self._db.execute(query, part))
+        if verdicts:
+            self._clock += 1
+            with self._db:
+                self._db.executemany("UPDATE verdicts SET used = ? WHERE digest = ?",
+                        ((self._clock, d) for d in verdicts))
+        return verdicts
+
+    def store(self, verdicts):
+        """Adds verdicts to the cache, given as (digest, verified) pairs, and
+        removes the least recently used ones if the cache is full."""
+        self._clock += 1
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?)",
+                    ((d, int(v), self._clock) for (d, v) in verdicts))
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                self._db.execute("DELETE FROM verdicts WHERE digest IN "
+                        "(SELECT digest FROM verdicts ORDER BY used LIMIT ?)", (excess, ))
@@ -32,6 +32,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 from . import block
+from .. import _vector as vector
 
 class Addition(block.Block):
 
@@ -67,4 +68,18 @@ class Addition(block.Block):
 
     def _simulate(self):
         """Simulate the addition protocol with the input attributes."""
-        return [(a + b) % self.context.mod for (a, b) in zip(self.input[0], self.input[1])]
+        if vector.is_array(self.input[0]):
+            ring = vector.ring(self.context.mod)
+            return ring.add(ring.asarray(self.input[0]), ring.asarray(self.input[1]))
+
+        vec_x, vec_y = map(vector.tolist, self.input)
+        return [(a + b) % self.context.mod for (a, b) in zip(vec_x, vec_y)]
+
+    def _check(self):
+        """Compare the sums with the output one element at a time."""
+        if vector.is_array(self.input[0]):
+            return super()._check()
+
+        mod = self.context.mod
+        vec_x, vec_y = map(vector.tolist, self.input)
+        return not any((a + b) % mod != c for (a, b, c) in zip(vec_x, vec_y, self.output))
@@ -32,6 +32,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 from . import context as ctx
+from .. import _vector as vector
 
 class Block(object):
 
@@ -45,6 +46,8 @@ class Block(object):
         output: The expected output of the code block.
         context: Necessary context for protocol simulation.
 
+    All vectors can be either lists of integers or NumPy arrays.
+
     """
 
     def __init__(self, input, output, context=None):
@@ -67,7 +70,7 @@ class Block(object):
         on the next read.
 
         """
-        if self._cached == None:
+        if self._cached is None:
             self._cached = self._simulate()
         return self._cached
 
@@ -75,6 +78,13 @@ class Block(object):
         """Clear the cached simulation result and force re-simulation."""
         self._cached = None
 
+    def __getstate__(self):
+        # Don't pickle the cached simulation result (e.g. when sending the
+        # block to a worker process), it can be recomputed when needed.
+        state = self.__dict__.copy()
+        state["_cached"] = None
+        return state
+
     def _simulate(self):
         """Execute the code block with *input* and return the result."""
         raise NotImplementedError
@@ -88,4 +98,29 @@ class Block(object):
             True if the calculated result is equal to the expected output.
 
         """
-        return self.result == self.output
+        return self._compare(self.result)
+
+    def check(self):
+        """Verify the attributes without keeping the simulation result.
+
+        Returns the same as verify(), but unless the result is already cached,
+        the block is simulated without storing the result or the trace of the
+        simulation. Inheriting classes compare the simulated values with the
+        expected ones one element at a time where possible, stopping at the
+        first mismatch. Reading *result* afterwards simulates the block again,
+        e.g. to show why it failed.
+
+        """
+        if self._cached is not None:
+            return self.verify()
+        return self._check()
+
+    def _check(self):
+        """Verify the attributes as described in check(), without looking at
+        the cached result."""
+        return self._compare(self._simulate())
+
+    def _compare(self, result):
+        """Returns True if the simulation result *result* is equal to the
+        expected values."""
+        return vector.equal(result, self.output)
@@ -35,6 +35,7 @@ import functools
 
 from . import protocol
 from .. import _util as util
+from .. import _vector as vector
 
 class Declassification(protocol.Protocol):
 
@@ -63,7 +64,10 @@ class Declassification(protocol.Protocol):
                 duplicated in "computing" even though the previous node is also
                 a computing node. "prev" must map to a single message and
                 "computing" must contain as many messages as there are
-                computing nodes (context.computing) minus one.
+                computing nodes (context.computing) minus one. With 2
+                computing nodes, the single message in "computing" may also be
+                given on its own instead of in a tuple, as logs don't tell
+                them apart.
 
             context: The context to use for simulation. A default is used if None.
 
@@ -87,6 +91,8 @@ class Declassification(protocol.Protocol):
         self._recv_prev = self.recv["prev"]
         util.check_len(self._recv_prev, n, "recv['prev']")
 
+        if self.context.computing == 2 and vector.is_vector(self.recv["computing"]):
+            self.recv = dict(self.recv, computing=(self.recv["computing"], ))
         self._recv_computing = self.recv["computing"]
         util.check_len(self._recv_computing, self.context.computing - 1, "recv['computing']")
         util.check_all_len(self._recv_computing, n, "recv['computing']")
@@ -96,16 +102,19 @@ class Declassification(protocol.Protocol):
 
     def _simulate(self):
         """Simulate the declassification protocol with the input attributes."""
+        if vector.is_array(self.input):
+            return self._simulate_arrays()
+
         mod = self.context.mod # Use a shorter alias.
 
         # The next node is sent a list of random values, so just use the random
         # values given in the _send_next attribute.
-        vec_sn = self._send_next
+        vec_sn = vector.tolist(self._send_next)
 
         # Reshare the input using the random values received from the previous
         # node and sent to next one. Send the result to all remote nodes.
-        vec_sr = [(x + rp - r) % mod
-                for (x, rp, r) in zip(self.input, self._recv_prev, vec_sn)]
+        vec_sr = [(x + rp - r) % mod for (x, rp, r) in
+                zip(vector.tolist(self.input), vector.tolist(self._recv_prev), vec_sn)]
 
         # Receive all the shares sent by other computing nodes and combine them
         # with our own share.
@@ -115,6 +124,42 @@ class Declassification(protocol.Protocol):
             """Sums two lists elementwise."""
             return [(x + y) % mod for (x, y) in zip(vec_x, vec_y)]
 
-        vec_out = functools.reduce(sum_vec, self._recv_computing, vec_sr)
+        vec_out = functools.reduce(sum_vec, vector.tolist(self._recv_computing), vec_sr)
+
+        return protocol.ProtocolResult(vec_out, { "next": vec_sn, "remote": vec_sr }, None)
+
+    def _check(self):
+        """Compare the reshared input and the output with the expected values
+        one element at a time.
+
+        The random values sent to the next node are sent as given, so only the
+        message sent to the remote nodes and the output need to be compared.
+
+        """
+        if vector.is_array(self.input):
+            return super()._check()
+
+        mod = self.context.mod
+        for (x, rp, r, sr, out, *computing) in zip(vector.tolist(self.input),
+                vector.tolist(self._recv_prev), vector.tolist(self._send_next),
+                self._send_remote, self.output, *vector.tolist(self._recv_computing)):
+            vr = (x + rp - r) % mod
+            if vr != sr or (vr + sum(computing)) % mod != out:
+                return False
+        return True
+
+    def _simulate_arrays(self):
+        """Simulate the declassification protocol on NumPy arrays.
+
+        Does the same computation as the list-based simulation in _simulate.
+
+        """
+        ring = vector.ring(self.context.mod)
+
+        # Like in _simulate, the random values are sent exactly as given.
+        vec_sn = self._send_next
+        vec_sr = ring.sub(ring.add(ring.asarray(self.input), ring.asarray(self._recv_prev)),
+                ring.asarray(vec_sn))
+        vec_out = functools.reduce(ring.add, map(ring.asarray, self._recv_computing), vec_sr)
 
         return protocol.ProtocolResult(vec_out, { "next": vec_sn, "remote": vec_sr }, None)
@@ -33,6 +33,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from . import protocol
 from .. import _util as util
+from .. import _vector as vector
 
 import collections
 
@@ -120,28 +121,36 @@ class Multiplication(protocol.Protocol):
 
     def _simulate(self):
         """Simulate the multiplication protocol with the input attributes."""
+        if vector.is_array(self._vec_a):
+            return self._simulate_arrays()
+
         mod = self.context.mod # Use a shorter alias.
 
+        # Work on lists even if the protocol was given arrays.
+        vec_in_a, vec_in_b = vector.tolist(self._vec_a), vector.tolist(self._vec_b)
+        recv_prev = vector.tolist(self._recv_prev)
+        recv_next = vector.tolist(self._recv_next)
+
         # The previous node is sent 2 lists of random integers, so just use
         # the random values given in the _send_prev attribute.
-        vec_sp = self._send_prev
+        vec_sp = vector.tolist(self._send_prev)
 
         # The next node is sent 3 lists of integers:
         # - _vec_a with the first list of vec_sp subtracted from it elementwise.
         # - _vec_b with the second list of vec_sp subtracted from it elementwise.
         # - a list of random integers given as the third list of the _send_next attribute.
-        vec_sn = ([(a - r) % mod for (a, r) in zip(self._vec_a, vec_sp[0])],
-                  [(b - r) % mod for (b, r) in zip(self._vec_b, vec_sp[1])],
-                  self._send_next[2])
+        vec_sn = ([(a - r) % mod for (a, r) in zip(vec_in_a, vec_sp[0])],
+                  [(b - r) % mod for (b, r) in zip(vec_in_b, vec_sp[1])],
+                  vector.tolist(self._send_next[2]))
 
         # Add the received random values to complete resharing of _vec_a and _vec_b.
-        vec_a = [(a + r) % mod for (a, r) in zip(vec_sn[0], self._recv_next[0])]
-        vec_b = [(b + r) % mod for (b, r) in zip(vec_sn[1], self._recv_next[1])]
+        vec_a = [(a + r) % mod for (a, r) in zip(vec_sn[0], recv_next[0])]
+        vec_b = [(b + r) % mod for (b, r) in zip(vec_sn[1], recv_next[1])]
 
         # Complete resharing the values received from the previous node.
-        vec_ap = [(ap + r) % mod for (ap, r) in zip(self._recv_prev[0], vec_sp[0])]
-        vec_bp = [(bp + r) % mod for (bp, r) in zip(self._recv_prev[1], vec_sp[1])]
-        vec_rp = [(r - rp) % mod for (r, rp) in zip(vec_sn[2], self._recv_prev[2])]
+        vec_ap = [(ap + r) % mod for (ap, r) in zip(recv_prev[0], vec_sp[0])]
+        vec_bp = [(bp + r) % mod for (bp, r) in zip(recv_prev[1], vec_sp[1])]
+        vec_rp = [(r - rp) % mod for (r, rp) in zip(vec_sn[2], recv_prev[2])]
 
         # Do the share multiplication and resharing.
         vec_out = [(a*b + a*bp + ap*b + r) % mod
@@ -149,3 +158,68 @@ class Multiplication(protocol.Protocol):
 
         return protocol.ProtocolResult(vec_out, { "prev": vec_sp, "next": vec_sn },
                 MultiplicationSimulation(vec_a, vec_b, vec_ap, vec_bp, vec_rp))
+
+    def _check(self):
+        """Compare the messages and the output with the expected values one
+        element at a time, without building a MultiplicationSimulation.
+
+        The random values sent to the previous node and the third message sent
+        to the next node are sent as given, so only the first two messages sent
+        to the next node and the output need to be compared.
+
+        """
+        if vector.is_array(self._vec_a):
+            return super()._check()
+
+        mod = self.context.mod
+        recv_prev = vector.tolist(self._recv_prev)
+        recv_next = vector.tolist(self._recv_next)
+        send_prev = vector.tolist(self._send_prev)
+        send_next = vector.tolist(self._send_next)
+        for (a, b, rpa, rpb, sna, snb, rsn, ra, rb, ap, bp, rp, out) in zip(
+                vector.tolist(self._vec_a), vector.tolist(self._vec_b),
+                send_prev[0], send_prev[1], send_next[0], send_next[1], send_next[2],
+                recv_next[0], recv_next[1], recv_prev[0], recv_prev[1], recv_prev[2],
+                self.output):
+            # The same computation as in _simulate, for a single element.
+            a = (a - rpa) % mod
+            b = (b - rpb) % mod
+            if a != sna or b != snb:
+                return False
+            a = (a + ra) % mod
+            b = (b + rb) % mod
+            ap = (ap + rpa) % mod
+            bp = (bp + rpb) % mod
+            if (a*b + a*bp + ap*b + rsn - rp) % mod != out:
+                return False
+        return True
+
+    def _simulate_arrays(self):
+        """Simulate the multiplication protocol on NumPy arrays.
+
+        Does the same computation as the list-based simulation in _simulate.
+
+        """
+        ring = vector.ring(self.context.mod)
+        recv_prev = tuple(map(ring.asarray, self._recv_prev))
+        recv_next = tuple(map(ring.asarray, self._recv_next))
+
+        # Like in _simulate, the random values are sent exactly as given.
+        vec_sp = self._send_prev
+        rand_a, rand_b = map(ring.asarray, vec_sp)
+        vec_sn = (ring.sub(ring.asarray(self._vec_a), rand_a),
+                  ring.sub(ring.asarray(self._vec_b), rand_b),
+                  self._send_next[2])
+
+        vec_a = ring.add(vec_sn[0], recv_next[0])
+        vec_b = ring.add(vec_sn[1], recv_next[1])
+
+        vec_ap = ring.add(recv_prev[0], rand_a)
+        vec_bp = ring.add(recv_prev[1], rand_b)
+        vec_rp = ring.sub(ring.asarray(vec_sn[2]), recv_prev[2])
+
+        vec_out = ring.add(ring.add(ring.mul(vec_a, vec_b), ring.mul(vec_a, vec_bp)),
+                           ring.add(ring.mul(vec_ap, vec_b), vec_rp))
+
+        return protocol.ProtocolResult(vec_out, { "prev": vec_sp, "next": vec_sn },
+                MultiplicationSimulation(vec_a, vec_b, vec_ap, vec_bp, vec_rp))
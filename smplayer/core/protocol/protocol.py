@@ -34,6 +34,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import collections
 
 from . import block
+from .. import _vector as vector
 
 class ProtocolResult(collections.namedtuple("ProtocolResult", "output send simulation")):
     __slots__ = ()
@@ -91,4 +92,8 @@ class Protocol(block.Block):
             output and messages.
 
         """
-        return self.result.output == self.output and self.result.send == self.send
+        return self._compare(self.result)
+
+    def _compare(self, result):
+        return vector.equal(result.output, self.output) and \
+                vector.equal(result.send, self.send)
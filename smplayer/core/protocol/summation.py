@@ -32,6 +32,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 from . import block
+from .. import _vector as vector
 
 class Summation(block.Block):
 
@@ -64,10 +65,26 @@ class Summation(block.Block):
 
     def _simulate(self):
         """Simulate the summation protocol with the input attributes."""
+        if vector.is_array(self.input):
+            ring = vector.ring(self.context.mod)
+            return ring.sum_slices(ring.asarray(self.input), len(self.output))
+
+        vec_x = vector.tolist(self.input)
         n = len(self.output)
-        slice_len = int(len(self.input) / n)
+        slice_len = int(len(vec_x) / n)
 
         # Take n slices from input, each slice_len long, and sum each slice to
         # an element of the result.
-        return [sum(self.input[i * slice_len : (i + 1) * slice_len]) % self.context.mod
+        return [sum(vec_x[i * slice_len : (i + 1) * slice_len]) % self.context.mod
                 for i in range(0, n)]
+
+    def _check(self):
+        """Compare the sums of the slices with the output one slice at a time."""
+        if vector.is_array(self.input):
+            return super()._check()
+
+        mod = self.context.mod
+        vec_x = vector.tolist(self.input)
+        slice_len = int(len(vec_x) / len(self.output)) if self.output else 0
+        return not any(sum(vec_x[i * slice_len : (i + 1) * slice_len]) % mod != c
+                for (i, c) in enumerate(self.output))
@@ -34,22 +34,63 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import collections
 import hashlib
 import base64
-
+import concurrent.futures
+import itertools
+import json
+import operator
+import os
+
+from . import _binlog as binlog
+from . import _checkpoint as ckpt
+from . import _index as logindex
+from . import _logcache as logcache
+from . import _merkle as merkle
 from . import _parser as parser
+from . import _batch as batch
+from . import _parallel as parallel
+from . import _stats as smstats
+from . import _util as util
+from . import _vector as vector
+from . import _verdicts as verdicts
 from . import protocol as smprotocol
 
+"""The versions of the message hash format supported by SMPlayer.hash().
+
+Version 1 hashes the Python representation of every message (e.g. the string
+"([1, 2], [3, 4])"). It is kept for compatibility with older hashes.
+
+Version 2 hashes the binary encoding of every message (see
+smplayer._vector.message_buffers), i.e. the vector lengths and values as
+little-endian integers. It is much faster, especially for NumPy arrays, which
+are hashed without copying.
+
+"""
+HASH_VERSIONS = (1, 2)
+
 class _sha256(object):
     """Internal private wrapper around hashlib.sha256."""
 
-    def __init__(self):
+    def __init__(self, version=1):
+        if version not in HASH_VERSIONS:
+            raise ValueError("unsupported hash version: {0}".format(version))
         self._digest = hashlib.sha256()
         self._updated = False
+        self._version = version
 
     def update(self, value):
-        if value != None:
-            self._digest.update(str(value).encode())
+        if value is not None:
+            if self._version == 1:
+                # Hash arrays like lists so that the digest does not depend on
+                # the vector representation.
+                self._digest.update(str(vector.tolist(value)).encode())
+            else:
+                self._update_binary(value)
             self._updated = True
 
+    def _update_binary(self, message):
+        for buffer in vector.message_buffers(message):
+            self._digest.update(buffer)
+
     def digest(self):
         return base64.b64encode(self._digest.digest()).decode() if self._updated else None
 
@@ -69,6 +110,154 @@ class MessageHash(collections.namedtuple("MessageHash",
 
     """
 
+def save_hash_report(hashes, filename, version=1):
+    """Saves a MessageHash computed with hash format *version* to a JSON file.
+
+    The report contains only the hashes, so it can be shared with other
+    parties without revealing any messages. *hashes* may be None for a log
+    without protocols.
+
+    """
+    if hashes is None:
+        hashes = MessageHash(None, None, None, None, None, [])
+    report = dict(hashes._asdict(), hash_version=version)
+    with open(filename, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+def load_hash_report(filename):
+    """Loads a report saved by save_hash_report().
+
+    Returns:
+        A tuple of the MessageHash and the version of the hash format.
+
+    Raises:
+        ValueError: If the file is not a valid hash report.
+
+    """
+    with open(filename) as f:
+        try:
+            report = json.load(f)
+            version = report.pop("hash_version")
+            hashes = MessageHash(**report)
+        except (ValueError, KeyError, TypeError, AttributeError) as err:
+            raise ValueError("{0} is not a valid hash report".format(filename)) from err
+    if version not in HASH_VERSIONS or not isinstance(hashes.recv_computing, list):
+        raise ValueError("{0} is not a valid hash report".format(filename))
+    return (hashes, version)
+
+class AuditResult(collections.namedtuple("AuditResult", "verified failures hashes trees")):
+    __slots__ = ()
+    """Contains the results of auditing a log with SMPlayer.audit().
+
+    Attributes:
+        verified: True if all protocols verified.
+        failures: A list with the indices of the protocols that did not verify.
+        hashes: A MessageHash of the messages in the log, or None if the log
+            contained no protocols.
+        trees: A dict from channel names to MerkleTrees of their messages
+            (see SMPlayer.merkle_trees()), or None if they were not requested.
+
+    """
+
+class FollowResult(collections.namedtuple("FollowResult", "index protocol verified hashes")):
+    __slots__ = ()
+    """Describes a protocol verified by SMPlayer.follow().
+
+    Attributes:
+        index: The index of the protocol in the log.
+        protocol: The protocol.
+        verified: True if the protocol verified.
+        hashes: A MessageHash of the messages of all protocols up to and
+            including this one.
+
+    """
+
+class _MessageHasher(object):
+    """Computes a MessageHash incrementally, one protocol at a time."""
+
+    def __init__(self, version=1, trees=False, stats=None, memory=None):
+        self._version = version
+        self._stats = stats
+        self._memory = memory
+        self._index = 0
+        self._trees = {} if trees else None
+        self._empty = True
+        self._send_prev = _sha256(version)
+        self._send_next = _sha256(version)
+        self._send_remote = _sha256(version)
+        self._recv_prev = _sha256(version)
+        self._recv_next = _sha256(version)
+        self._recv_computing = []
+
+    def update(self, protocol):
+        """Adds the messages of the next protocol of the log to the hashes."""
+        if self._memory is not None:
+            self._memory.measure("hash", self._add, protocol)
+            return
+        if self._stats is None:
+            self._add(protocol)
+            return
+
+        start = smstats.clock()
+        self._add(protocol)
+        values = smstats.count_message_values(protocol)
+        self._stats.record("hash", protocol.__class__.__name__, start, values=values,
+                bytes=4 * values)
+
+    def _add(self, protocol):
+        self._empty = False
+        self._index += 1
+        if not isinstance(protocol, smprotocol.Protocol):
+            # Ignore smprotocol.Blocks that don't send messages.
+            return
+
+        # use dict.get(key) instead of dict[key] to avoid KeyErrors.
+        if protocol.send:
+            self._update(self._send_prev, "send_prev", protocol.send.get("prev"))
+            self._update(self._send_next, "send_next", protocol.send.get("next"))
+            self._update(self._send_remote, "send_remote", protocol.send.get("remote"))
+
+        if protocol.recv:
+            self._update(self._recv_prev, "recv_prev", protocol.recv.get("prev"))
+            self._update(self._recv_next, "recv_next", protocol.recv.get("next"))
+            if "computing" in protocol.recv:
+                for i in range(0, len(protocol.recv["computing"])):
+                    if len(self._recv_computing) <= i:
+                        self._recv_computing.append(_sha256(self._version))
+                    self._update(self._recv_computing[i], "recv_computing[%d]" % i,
+                            protocol.recv["computing"][i])
+
+    def _update(self, sha, channel, message):
+        sha.update(message)
+        if self._trees is not None and message is not None:
+            if channel not in self._trees:
+                self._trees[channel] = merkle.MerkleTree()
+            self._trees[channel].append(message, self._index - 1)
+
+    def trees(self):
+        """Returns a dict from channel names to the MerkleTrees of their
+        messages, or None if trees were not requested."""
+        return self._trees
+
+    def digest(self):
+        """Returns the MessageHash of all added protocols, or None if no
+        protocols were added."""
+        if self._empty:
+            return None
+
+        return MessageHash(self._send_prev.digest(), self._send_next.digest(),
+                self._send_remote.digest(), self._recv_prev.digest(),
+                self._recv_next.digest(), list(map(lambda sha: sha.digest(), self._recv_computing)))
+
+def _protocol_digest(protocol):
+    """Returns the verdict cache digest of *protocol*, or None if it can't be
+    cached."""
+    try:
+        return verdicts.protocol_digest(protocol)
+    except ValueError:
+        return None
+
 class SMPlayer(object):
 
     """Sharemind Player class, which simulates protocols read from Sharemind
@@ -76,72 +265,578 @@ class SMPlayer(object):
     (i.e. the simulation yields the same results).
 
     Attributes:
-        protocols: A tuple containing the protocols parsed from the log. Used
-            to find out why verification failed. None if no file is opened.
+        protocols: A tuple containing the protocols parsed from the log (or a
+            BinaryLog for binary logs). Used to find out why verification
+            failed. None if no file is opened or if the file was opened in
+            streaming mode.
+        filename: The path of the opened audit log. None if no file is opened.
+        failures: A list with the (zero-based) indices of the protocols that
+            did not verify in ascending order. None if verify() has not been
+            called since opening the log.
+        verdict_cache: A VerdictCache (see smplayer._verdicts) consulted
+            before simulating a protocol, or None to simulate all protocols.
+            Not used by follow().
+        stats: A Stats object (see smplayer._stats) in which the time spent
+            in every phase of an audit is recorded, or None.
+        memory: A MemoryProfile (see smplayer._memory) in which the memory
+            allocated in every phase of an audit is recorded, or None.
+        cache_results: Whether protocols verified one at a time keep their
+            simulation results (see Block.result). If False, they are verified
+            with Block.check(), which neither builds nor keeps the traces of
+            the simulations; the result of a protocol is simulated again when
+            it is read, e.g. to show why the protocol failed. True by default.
 
     """
 
+    """The default number of protocols sent to a worker process at once."""
+    chunk_size = 1024
+
+    """The number of output elements from which on a single protocol is split
+    between worker processes."""
+    split_size = 2**20
+
+    """The number of protocols verified between two checkpoints."""
+    checkpoint_interval = 10000
+
+    """The number of consecutive protocols looked up in the verdict cache at
+    once."""
+    cache_window = 10000
+
     def __init__(self):
         self.protocols = None
-
-    def open(self, filename):
+        self.filename = None
+        self.failures = None
+        self.verdict_cache = None
+        self.stats = None
+        self.memory = None
+        self.cache_results = True
+        self._arrays = False
+        self._context = None
+        self._binary = False
+        self._index = None
+        self._size_recorded = False
+        self._executor = None
+
+    def open(self, filename, streaming=False, arrays=False, jobs=1, cache=None, context=None):
         """Opens a Sharemind Application Server audit log.
 
+        If *streaming* is True, the log is not parsed up front. Instead, every
+        pass over the protocols (verify(), hash(), iter_protocols()) reads the
+        log incrementally, so that memory use is bounded by the largest single
+        protocol in the log. Errors in the log are then raised by these
+        methods instead of open().
+
+        If *arrays* is True, vectors are stored as NumPy arrays instead of
+        lists, which uses considerably less memory. Requires NumPy.
+
+        If *jobs* is greater than 1 and *streaming* is False, the log is
+        parsed in that many worker processes.
+
+        Binary logs written by smplayer-convert are detected automatically
+        and read without parsing any XML. Unless *streaming* is True,
+        *protocols* is then a BinaryLog, which decodes protocols from a
+        memory map of the log on demand instead of loading them up front.
+
+        If *cache* is True or the path of a directory and *streaming* is False,
+        the parsed protocols of an XML log are cached in the binary format
+        (see smplayer._logcache) next to the log or in that directory. When
+        the log is opened again and has not changed, *protocols* is then a
+        BinaryLog of the cache instead of being parsed again.
+
+        *context* is the context of the protocols of an XML log. It must be
+        given for set-ups with other than 3 computing nodes, as XML logs don't
+        say how many nodes there are. Binary logs contain their context.
+
         See smplayer._parser.parse_log for more details.
 
         """
-        self.protocols = parser.parse_log(filename)
+        self._binary = binlog.is_binary_log(filename)
+        if self._index is not None:
+            self._index.close()
+        self._index = None
+        self._size_recorded = False
+        self.filename = filename
+        self.failures = None
+        self._arrays = arrays
+        self._context = context
+        if streaming:
+            self.protocols = None
+        elif self._binary:
+            self.protocols = binlog.BinaryLog(filename, arrays)
+        elif cache:
+            self.protocols = self._open_cached(filename, arrays, jobs,
+                    None if cache is True else cache)
+        elif (self.stats is not None or self.memory is not None) and jobs == 1:
+            self.protocols = tuple(self._reading(parser.iter_log(filename, arrays, context)))
+        else:
+            self.protocols = parser.parse_log(filename, arrays, jobs, context)
+
+    def _reading(self, protocols):
+        """Returns an iterator over *protocols*, recording reading them in
+        *stats* and *memory*."""
+        if self.stats is not None:
+            protocols = self._read(protocols)
+        if self.memory is not None:
+            protocols = self.memory.track("parse", protocols)
+        return iter(protocols)
+
+    def _read(self, protocols):
+        """Yields *protocols*, recording the time spent reading every one of
+        them in *stats*."""
+        stats = self.stats
+        # The log is counted once, however many passes are made over it.
+        if not self._size_recorded:
+            stats.get("parse", "*").bytes += os.path.getsize(self.filename)
+            self._size_recorded = True
+        protocols = iter(protocols)
+        while True:
+            (start, construct_time) = (smstats.clock(), stats.construct_time)
+            with stats.recording():
+                protocol = next(protocols, None)
+            if protocol is None:
+                return
+            stats.record_read(protocol.__class__.__name__, start, construct_time,
+                    smstats.count_values(protocol))
+            yield protocol
+
+    def _open_cached(self, filename, arrays, jobs, cache_dir):
+        """Returns the protocols of an XML log from the cache, parsing and
+        caching them if necessary."""
+        entry = logcache.LogCache(filename, cache_dir, self._context)
+        protocols = entry.load(arrays)
+        if protocols is None:
+            protocols = parser.parse_log(filename, arrays, jobs, self._context)
+            try:
+                entry.save(protocols)
+            except (OSError, ValueError):
+                # The log can still be used without the cache.
+                pass
+        return protocols
+
+    def iter_protocols(self):
+        """Returns an iterator over the protocols of the opened audit log.
+
+        In streaming mode the log is re-read from disk on every call.
 
-    def verify(self):
+        """
+        if self.protocols is not None:
+            if isinstance(self.protocols, binlog.BinaryLog):
+                return self._reading(self.protocols)
+            return iter(self.protocols)
+        if self.filename is not None:
+            if self._binary:
+                protocols = binlog.iter_binary_log(self.filename, self._arrays)
+            else:
+                protocols = parser.iter_log(self.filename, self._arrays, self._context)
+            return self._reading(protocols)
+        return iter(())
+
+    def verify(self, batch_size=None, jobs=1, checkpoint=None, resume=False):
         """Verify the chain of protocols read from the audit log.
 
-        If no protocols are present, returns True.
+        Returns True if all protocols verify. If no protocols are present,
+        returns True. The indices of the protocols that did not verify are
+        stored in *failures*.
+
+        If *batch_size* is given, up to that many consecutive protocols are
+        verified at once with the batch engine (see smplayer._batch), which is
+        considerably faster for logs of many short protocols.
+
+        If *jobs* is greater than 1, the protocols are verified in that many
+        worker processes (see smplayer._parallel). Each worker is given
+        *batch_size* or *chunk_size* protocols at a time. Protocols with at
+        least *split_size* output elements are split into element ranges
+        which are verified by all workers in parallel.
+
+        Simulation results are not cached in the protocols if either option is
+        used or if *cache_results* is False.
+
+        If *checkpoint* is given, a checkpoint (see smplayer._checkpoint) is
+        saved to that file after every *checkpoint_interval* protocols and
+        removed once all protocols are verified. If *resume* is True as well,
+        verification continues from the checkpoint in the file, if there is
+        one. Checkpoints use the index of the log (see index()) to find the
+        protocols.
+
+        Raises:
+            ValueError: If the part of the log before the checkpoint has
+                changed since the checkpoint was saved.
+
+        """
+        if checkpoint is None:
+            return self._verify(self.iter_protocols(), batch_size, jobs)
+
+        (start, failures, prefix) = self._resume(checkpoint, resume)
+        if self.protocols is not None:
+            protocols = itertools.islice(self.protocols, start, None)
+        else:
+            index = self.index()
+            protocols = (index.protocol(i, self._arrays, self._context) for i in range(start, len(index)))
+        return self._verify_checkpointed(protocols, start, failures, prefix,
+                batch_size, jobs, checkpoint)
+
+    def _verify(self, protocols, batch_size, jobs):
+        """Verify *protocols* as described in verify()."""
+        self.failures = list(self._find_failures(protocols, batch_size, jobs))
+        return not self.failures
+
+    def _resume(self, checkpoint, resume):
+        """Returns the index of the first protocol to verify, the failures so
+        far and a PrefixDigest of the log before that protocol."""
+        prefix = ckpt.PrefixDigest(self.filename)
+        saved = ckpt.load_checkpoint(checkpoint) if resume else None
+        if saved is None:
+            return (0, [], prefix)
+
+        try:
+            prefix.advance(saved.offset)
+        except ValueError:
+            pass
+        index = self.index()
+        if prefix.hexdigest() != saved.digest or saved.index > len(index):
+            raise ValueError("{0} has changed since the checkpoint was saved".format(self.filename))
+        return (saved.index, list(saved.failures), prefix)
+
+    def _verify_checkpointed(self, protocols, start, failures, prefix, batch_size, jobs, checkpoint):
+        """Verify *protocols*, which start at index *start* of the log, saving
+        a checkpoint after every *checkpoint_interval* protocols.
+
+        If *jobs* is greater than 1, the same worker processes verify every
+        segment between checkpoints.
+
+        """
+        index = self.index()
+        if jobs > 1:
+            self._executor = concurrent.futures.ProcessPoolExecutor(jobs)
+        try:
+            for segment in util.chunks(protocols, self.checkpoint_interval):
+                failures.extend(start + i for i in self._find_failures(segment, batch_size, jobs))
+                start += len(segment)
+                prefix.advance(index.offsets[start - 1] + index.lengths[start - 1])
+                ckpt.save_checkpoint(ckpt.Checkpoint(start, prefix.offset, prefix.hexdigest(),
+                        failures), checkpoint)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        ckpt.remove_checkpoint(checkpoint)
+        self.failures = failures
+        return not self.failures
+
+    def _find_failures(self, protocols, batch_size, jobs):
+        """Verify *protocols* as described in verify() and return an iterator
+        over the indices of the ones that do not verify."""
+        if self.verdict_cache is not None:
+            return self._find_cached_failures(protocols, batch_size, jobs)
+        return self._simulate_failures(protocols, batch_size, jobs)
+
+    def _find_cached_failures(self, protocols, batch_size, jobs):
+        """Like _find_failures(), but only simulate the protocols whose
+        verdicts are not in the verdict cache and add their verdicts to it."""
+        start = 0
+        for window in util.chunks(protocols, self.cache_window):
+            digests = [_protocol_digest(p) for p in window]
+            known = self.verdict_cache.lookup([d for d in digests if d is not None])
+            misses = [i for (i, d) in enumerate(digests) if d not in known]
+            failed = {misses[i] for i in self._simulate_failures(
+                    [window[i] for i in misses], batch_size, jobs)}
+            self.verdict_cache.store((digests[i], i not in failed)
+                    for i in misses if digests[i] is not None)
+
+            for (i, d) in enumerate(digests):
+                if (not known[d]) if d in known else (i in failed):
+                    yield start + i
+            start += len(window)
+
+    def _simulate_failures(self, protocols, batch_size, jobs):
+        """Simulate *protocols* as described in verify() and return an
+        iterator over the indices of the ones that do not verify."""
+        if self.memory is not None:
+            return self._simulate_failures_memory(protocols, batch_size, jobs)
+        if self.stats is not None:
+            return self._simulate_failures_stats(protocols, batch_size, jobs)
+        return self._run_engine(protocols, batch_size, jobs)
+
+    def _run_engine(self, protocols, batch_size, jobs):
+        """Verify *protocols* with the engine selected by *batch_size* and
+        *jobs*, see _simulate_failures()."""
+        if jobs > 1:
+            failures = parallel.find_failures(protocols, jobs, batch_size or self.chunk_size,
+                    bool(batch_size), self.split_size, self._executor)
+        elif batch_size:
+            verdicts = (ok for c in util.chunks(protocols, batch_size) for ok in batch.verify_batch(c))
+            failures = (i for (i, ok) in enumerate(verdicts) if not ok)
+        else:
+            verify = self._verifier()
+            failures = (i for (i, p) in enumerate(protocols) if not verify(p))
+        return failures
+
+    def _verifier(self):
+        """Returns the function that verifies a single protocol in this
+        process, see *cache_results*."""
+        return operator.methodcaller("verify" if self.cache_results else "check")
+
+    def _simulate_failures_stats(self, protocols, batch_size, jobs):
+        """Like _simulate_failures(), but record the time spent in *stats*.
+
+        Protocols verified one at a time are recorded in the simulate and
+        compare phases, or in the verify phase if *cache_results* is False.
+        Protocols verified in batches or worker processes are recorded in the
+        verify phase, excluding the time spent reading them.
 
         """
-        if self.protocols:
-            return all(map(lambda p: p.verify(), self.protocols))
-        return True
+        stats = self.stats
+        if not batch_size and jobs <= 1 and not self.cache_results:
+            for (i, p) in enumerate(protocols):
+                (kind, values) = (p.__class__.__name__, smstats.count_values(p))
+                start = smstats.clock()
+                ok = p.check()
+                stats.record("verify", kind, start, values=values)
+                if not ok:
+                    yield i
+            return
+        if not batch_size and jobs <= 1:
+            for (i, p) in enumerate(protocols):
+                (kind, values) = (p.__class__.__name__, smstats.count_values(p))
+                start = smstats.clock()
+                p.result
+                stats.record("simulate", kind, start, values=values)
+                start = smstats.clock()
+                ok = p.verify()
+                stats.record("compare", kind, start, values=values)
+                if not ok:
+                    yield i
+            return
+
+        verify = stats.get("verify", "batch" if jobs <= 1 else "parallel")
+        reading = [0.0, 0.0]
+        def read():
+            it = iter(protocols)
+            while True:
+                start = smstats.clock()
+                p = next(it, None)
+                (wall, cpu) = smstats.clock()
+                reading[0] += wall - start[0]
+                reading[1] += cpu - start[1]
+                if p is None:
+                    return
+                verify.count += 1
+                verify.values += smstats.count_values(p)
+                yield p
+
+        failures = self._run_engine(read(), batch_size, jobs)
+        while True:
+            (start, before) = (smstats.clock(), tuple(reading))
+            i = next(failures, None)
+            (wall, cpu) = smstats.clock()
+            verify.wall += wall - start[0] - (reading[0] - before[0])
+            verify.cpu += cpu - start[1] - (reading[1] - before[1])
+            if i is None:
+                return
+            yield i
+
+    def _simulate_failures_memory(self, protocols, batch_size, jobs):
+        """Like _simulate_failures(), but record the memory allocated in
+        *memory*.
+
+        Protocols verified one at a time are recorded in the simulate phase,
+        along with the sizes of their cached results, or in the verify phase
+        if *cache_results* is False. Protocols verified in batches or worker
+        processes are recorded in the verify phase.
 
-    def hash(self):
+        """
+        memory = self.memory
+        if not batch_size and jobs <= 1 and not self.cache_results:
+            for (i, p) in enumerate(protocols):
+                ok = memory.measure("verify", lambda p: p.check(), p)
+                memory.record_sizes(p)
+                if not ok:
+                    yield i
+            return
+        if not batch_size and jobs <= 1:
+            for (i, p) in enumerate(protocols):
+                memory.measure("simulate", lambda p: p.result, p)
+                memory.record_sizes(p)
+                if not p.verify():
+                    yield i
+            return
+
+        verify = memory.get("verify", "batch" if jobs <= 1 else "parallel")
+        def counted():
+            for p in protocols:
+                verify.count += 1
+                yield p
+
+        yield from memory.track("verify", self._run_engine(counted(), batch_size, jobs),
+                kind="batch" if jobs <= 1 else "parallel", count=False)
+
+    def index(self):
+        """Returns the index of the opened log (see smplayer._index), which
+        gives random access to its protocols.
+
+        The index is loaded from the sidecar file next to the log. If there is
+        none or the log has changed since it was written, the log is scanned
+        once to build the index, which is then saved if possible.
+
+        Raises:
+            ValueError: If no log is opened.
+            LogError: If the log can't be indexed.
+
+        """
+        if self.filename is None:
+            raise ValueError("no log is opened")
+        if self._index is None:
+            index = logindex.load_index(self.filename)
+            if index is None:
+                index = logindex.build_index(self.filename)
+                try:
+                    logindex.save_index(index)
+                except OSError:
+                    # Indexing still helps this session if the directory is read-only.
+                    pass
+            self._index = index
+        return self._index
+
+    def load_protocol(self, index):
+        """Returns the protocol at *index* of the log.
+
+        If the log is not loaded (see open()), only that protocol is read,
+        using the index of the log (see index()).
+
+        """
+        if self.protocols is not None:
+            return self.protocols[index]
+        return self.index().protocol(index, self._arrays, self._context)
+
+    def load_protocols(self, start, stop):
+        """Returns a list of the protocols from *start* to *stop* - 1 of the
+        log, reading only them if the log is not loaded (see load_protocol())."""
+        if self.protocols is not None:
+            return list(self.protocols[start:stop])
+        return self.index().protocols(start, stop, self._arrays, self._context)
+
+    def verify_range(self, start, stop, batch_size=None, jobs=1):
+        """Verify the protocols from *start* to *stop* - 1 of the log and
+        return a list with the indices of the ones that did not verify.
+
+        The protocols are read with load_protocols(), so only they are read
+        from a log that is not loaded. See verify() for *batch_size* and
+        *jobs*. Unlike verify(), *failures* is left unchanged.
+
+        """
+        length = len(self.protocols) if self.protocols is not None else len(self.index())
+        (start, stop, step) = slice(start, stop).indices(length)
+        protocols = self.load_protocols(start, stop)
+        return [start + i for i in self._find_failures(protocols, batch_size, jobs)]
+
+    def hash(self, version=1):
         """Returns the hashes of all sent and received messages in a MessageHash.
 
         These hashes can be compared with hashes computed from other audit logs
-        to verify that no messages were modified.
+        to verify that no messages were modified, as long as all of them use
+        the same *version* of the hash format (see HASH_VERSIONS).
 
         The hash function used is SHA-256.
 
         """
-        if not self.protocols:
-            return None
+        hasher = _MessageHasher(version, stats=self.stats, memory=self.memory)
+        for protocol in self.iter_protocols():
+            hasher.update(protocol)
+        return hasher.digest()
+
+    def merkle_trees(self):
+        """Returns a dict from channel names to MerkleTrees of their messages.
 
-        send_prev = _sha256()
-        send_next = _sha256()
-        send_remote = _sha256()
-        recv_prev = _sha256()
-        recv_next = _sha256()
-        recv_computing = []
-
-        for protocol in self.protocols:
-            if not isinstance(protocol, smprotocol.Protocol):
-                # Ignore smprotocol.Blocks that don't send messages.
-                continue
-
-            # use dict.get(key) instead of dict[key] to avoid KeyErrors.
-            if protocol.send:
-                send_prev.update(protocol.send.get("prev"))
-                send_next.update(protocol.send.get("next"))
-                send_remote.update(protocol.send.get("remote"))
-
-            if protocol.recv:
-                recv_prev.update(protocol.recv.get("prev"))
-                recv_next.update(protocol.recv.get("next"))
-                if "computing" in protocol.recv:
-                    for i in range(0, len(protocol.recv["computing"])):
-                        if len(recv_computing) <= i:
-                            recv_computing.append(_sha256())
-                        recv_computing[i].update(protocol.recv["computing"][i])
-
-
-        return MessageHash(send_prev.digest(), send_next.digest(), send_remote.digest(),
-                recv_prev.digest(), recv_next.digest(),
-                list(map(lambda sha: sha.digest(), recv_computing)))
+        The channels are named after the fields of MessageHash, except that
+        the messages received from remote computing nodes are split into
+        channels "recv_computing[0]", "recv_computing[1]" etc. The leaves of a
+        tree are the individual messages, so comparing the trees of two logs
+        (see MerkleTree.first_divergence()) quickly finds the first protocol
+        at which their messages differ.
+
+        """
+        hasher = _MessageHasher(trees=True, stats=self.stats, memory=self.memory)
+        for protocol in self.iter_protocols():
+            hasher.update(protocol)
+        return hasher.trees()
+
+    def follow(self, hash_version=1, poll_interval=1.0, idle_timeout=None):
+        """Verify and hash the protocols of a log that is still being written.
+
+        Every protocol is verified and hashed as soon as it has been completely
+        written to the log, so misbehaving nodes are detected while the log
+        grows. The log should be opened in streaming mode, as a log that is
+        still being written can't be parsed as a whole. The appended protocols
+        are read until the log is complete or, if *idle_timeout* is not None,
+        until it has not grown for that many seconds (see
+        smplayer._parser.follow_log for *poll_interval* and *idle_timeout*).
+
+        *failures* is updated with every protocol that does not verify. See
+        hash() for *hash_version*.
+
+        Returns:
+            An iterator over a FollowResult for every protocol.
+
+        Raises:
+            ValueError: If no log is opened or the log is a binary log.
+            LogError: If the log can't be parsed or contains errors.
+
+        """
+        if self.filename is None:
+            raise ValueError("no log is opened")
+        if self._binary:
+            raise ValueError("binary logs can't be followed")
+
+        self.failures = []
+        protocols = parser.follow_log(self.filename, self._arrays, poll_interval, idle_timeout,
+                self._context)
+        return self._follow(protocols, hash_version)
+
+    def _follow(self, protocols, hash_version):
+        """Verify and hash *protocols* as described in follow()."""
+        hasher = _MessageHasher(hash_version, stats=self.stats, memory=self.memory)
+        verify = self._verifier()
+        for (i, protocol) in enumerate(protocols):
+            verified = verify(protocol)
+            if not verified:
+                self.failures.append(i)
+            hasher.update(protocol)
+            yield FollowResult(i, protocol, verified, hasher.digest())
+
+    def audit(self, batch_size=None, jobs=1, hash_version=1, trees=False,
+            checkpoint=None, resume=False):
+        """Verify the protocols of the audit log and hash their messages in a
+        single pass.
+
+        This is equivalent to calling verify() and hash(), but every protocol
+        is hashed as soon as it is read from the log. In streaming mode, the
+        log is thus read only once and no protocols are retained.
+
+        See verify() for *batch_size*, *jobs*, *checkpoint* and *resume* and
+        hash() for *hash_version*. If *trees* is True, the Merkle trees of all
+        channels are computed too (see merkle_trees()).
+
+        Checkpoints do not contain the state of the hashes, so a resumed audit
+        reads and hashes the protocols before the checkpoint again, but does
+        not verify them again.
+
+        Returns:
+            An AuditResult.
+
+        """
+        hasher = _MessageHasher(hash_version, trees, self.stats, self.memory)
+        def hashed(protocols):
+            for protocol in protocols:
+                hasher.update(protocol)
+                yield protocol
+
+        protocols = hashed(self.iter_protocols())
+        if checkpoint is None:
+            verified = self._verify(protocols, batch_size, jobs)
+        else:
+            (start, failures, prefix) = self._resume(checkpoint, resume)
+            collections.deque(itertools.islice(protocols, start), maxlen=0)
+            verified = self._verify_checkpointed(protocols, start, failures, prefix,
+                    batch_size, jobs, checkpoint)
+        return AuditResult(verified, self.failures, hasher.digest(), hasher.trees())
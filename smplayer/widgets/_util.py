@@ -42,7 +42,7 @@ def int_to_color(value):
     """
     # Use a random odd constant (0xe170e5) to ensure that small differences
     # cause noticeably different colors.
-    color = 0x555555 + (0xe170e5 * value % 0xaaaaab)
+    color = 0x555555 + (0xe170e5 * int(value) % 0xaaaaab)
     return hex(color)[2:] # Strip '0x' from the hex representation.
 
 def format_value(value, color=None):
@@ -124,6 +124,18 @@ def _format_body(protocol):
 
 class ProtocolBody(TreeViewLabel):
 
+    """The trace of the simulation of a protocol.
+
+    The trace is only formatted (simulating the protocol again if its result
+    is not cached) when show() is called, i.e. when the node is expanded.
+
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.text = _format_body(kwargs["protocol"])
+        self._protocol = kwargs["protocol"]
+
+    def show(self):
+        """Formats the trace of the protocol, unless already done."""
+        if not self.text:
+            self.text = _format_body(self._protocol)
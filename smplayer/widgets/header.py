@@ -54,19 +54,30 @@ _protocol_headers = {
         smprotocol.Summation:        lambda p: _format_function("sum", p),
     }
 
-def _format_header(protocol):
-    """Returns a properly formatted header for *protocol*."""
-    result = protocol.result
-    if isinstance(result, smprotocol.ProtocolResult):
-        result = result.output
+def _format_header(protocol, verified):
+    """Returns a properly formatted header for *protocol*.
+
+    The protocol is only simulated again (to show the simulation result) if
+    it did not verify.
+
+    """
+    comment = ""
+    if not verified:
+        result = protocol.result
+        if isinstance(result, smprotocol.ProtocolResult):
+            result = result.output
+        comment = " (simulation result: {0})".format(util.format_values(result))
     return "{status} {label}{comment}".format(
-            status=util.format_ok(protocol.verify()),
+            status=util.format_ok(verified),
             label=_protocol_headers[type(protocol)](protocol),
-            comment="" if protocol.verify() else
-                    " (simulation result: {0})".format(util.format_values(result)))
+            comment=comment)
 
 class ProtocolHeader(TreeViewLabel):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.text = _format_header(kwargs["protocol"])
+        protocol = kwargs["protocol"]
+        verified = kwargs.get("verified")
+        if verified is None:
+            verified = protocol.check()
+        self.text = _format_header(protocol, verified)
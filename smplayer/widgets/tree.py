@@ -73,8 +73,15 @@ class ProtocolTree(TreeView):
         self.bind(minimum_height=self.setter("height"))
 
         self.add_node(TreeViewLabel(text=_format_hashes(player.hash())))
-        for protocol in player.protocols:
-            header = ProtocolHeader(protocol=protocol)
+        failures = set(player.failures)
+        for (i, protocol) in enumerate(player.protocols):
+            header = ProtocolHeader(protocol=protocol, verified=i not in failures)
             self.add_node(header)
             if isinstance(protocol, smprotocol.Protocol):
                 self.add_node(ProtocolBody(protocol=protocol), header)
+
+    def on_node_expand(self, node):
+        # Simulate protocols again only when their traces are shown.
+        for child in node.nodes:
+            if isinstance(child, ProtocolBody):
+                child.show()
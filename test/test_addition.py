@@ -51,5 +51,13 @@ class TestAdditionProtocol(unittest.TestCase):
         self.assertFalse(self._add.verify(), "Verification did not fail: " \
                 "got result {0}".format(self._add.result))
 
+    def test_check(self):
+        self.assertTrue(self._add.check())
+        self.assertIsNone(self._add._cached, "check() cached the simulation result")
+
+        self._add.output[0] = 0  # Break the expected output.
+        self.assertFalse(self._add.check())
+        self.assertFalse(self._add.verify())
+
 if __name__ == "__main__":
     unittest.main()
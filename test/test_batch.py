@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import unittest
+import os
+
+import smplayer.core as smplayer
+import smplayer.core._batch as batch
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+
+    def _check_failures(self, arrays):
+        protocols = parser.parse_log(self._filename, arrays)
+        self.assertTrue(all(batch.verify_batch(protocols)), "Batch did not verify")
+
+        # Break a multiplication, a declassification message and a summation.
+        protocols[0].output[0] ^= 1
+        protocols[2].send["remote"][0] ^= 1
+        protocols[9].output[0] ^= 1
+
+        verdicts = batch.verify_batch(protocols)
+        self.assertEqual(verdicts, [p.verify() for p in protocols])
+        self.assertEqual([i for (i, ok) in enumerate(verdicts) if not ok], [0, 2, 9])
+
+    def test_verify_batch(self):
+        self._check_failures(False)
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_verify_batch_arrays(self):
+        self._check_failures(True)
+
+    def test_player(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        self.assertTrue(player.verify(batch_size=5))
+
+        player.protocols[22].output[0] ^= 1
+        self.assertFalse(player.verify(batch_size=5))
+
+if __name__ == "__main__":
+    unittest.main()
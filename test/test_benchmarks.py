@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import functools
+import math
+import unittest
+
+from benchmarks import cases, runner, stats
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_welch_t(self):
+        (t, df) = stats.welch_t([1.0, 1.1, 0.9, 1.0], [2.0, 2.1, 1.9, 2.0])
+        self.assertAlmostEqual(t, 1.0 / math.sqrt(2 * 0.02 / 3 / 4))
+        self.assertAlmostEqual(df, 6.0)
+        self.assertEqual(stats.welch_t([1.0, 1.0], [1.0, 1.0]), (0.0, math.inf))
+        self.assertEqual(stats.t_critical(6.5), 3.143)
+        self.assertEqual(stats.t_critical(1000), 2.390)
+        self.assertEqual(stats.t_critical(math.inf), 2.326)
+
+    def test_compare_results(self):
+        def results(**times):
+            return {"results": {name: {"times": t} for (name, t) in times.items()}}
+        baseline = results(a=[1.0, 1.01, 0.99], b=[1.0, 1.01, 0.99], c=[1.0, 1.5, 0.5],
+                d=[1.0, 1.0, 1.0])
+        current = results(a=[1.5, 1.51, 1.49], b=[0.5, 0.51, 0.49], c=[1.2, 1.7, 0.7],
+                d=[1.02, 1.02, 1.02], e=[1.0, 1.0, 1.0])
+        (slower, faster, comparisons) = stats.compare_results(baseline, current)
+        self.assertEqual([c.name for c in slower], ["a"])
+        self.assertEqual([c.name for c in faster], ["b"])
+        # c is too noisy and d changed by less than the threshold.
+        self.assertEqual([c.name for c in comparisons], ["a", "b", "c", "d"])
+        self.assertFalse(comparisons[2].significant)
+        self.assertTrue(comparisons[3].significant)
+
+    def test_run_case(self):
+        case = cases.Case("verify", functools.partial(cases._verify, 10, 4, "mult"))
+        result = runner.run_case(case, 2)
+        self.assertEqual(len(result["times"]), 2)
+        # 10 protocols with 2 input, 1 output and 10 message vectors of 4 values.
+        self.assertEqual(result["values"], 10 * 13 * 4)
+        self.assertGreater(result["peak_rss"], 0)
+        self.assertGreater(result["alloc_peak"], 0)
+
+    def test_cases(self):
+        names = [c.name for c in cases.cases(quick=True)]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn("parse_log/n=200,size=4", names)
+        self.assertIn("mult.verify/n=200,size=64", names)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+import smplayer.core.protocol as smprotocol
+
+class TestBinaryLog(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._binary = os.path.join(self._tmpdir.name, "audit.smpb")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _assertSameProtocols(self, protocols, other):
+        self.assertEqual(len(other), len(protocols))
+        for (p, o) in zip(protocols, other):
+            self.assertIs(type(o), type(p))
+            self.assertEqual(o.context, p.context)
+            self.assertTrue(vector.equal(o.input, p.input))
+            self.assertTrue(vector.equal(o.output, p.output))
+            if isinstance(p, smprotocol.Protocol):
+                self.assertTrue(vector.equal(o.send, p.send))
+                self.assertTrue(vector.equal(o.recv, p.recv))
+
+    def test_round_trip(self):
+        protocols = parser.parse_log(self._filename)
+        self.assertEqual(smplayer.write_binary_log(iter(protocols), self._binary), len(protocols))
+        self.assertTrue(smplayer.is_binary_log(self._binary))
+        self.assertFalse(smplayer.is_binary_log(self._filename))
+
+        binary = list(smplayer.iter_binary_log(self._binary))
+        self._assertSameProtocols(protocols, binary)
+        self.assertTrue(all(p.verify() for p in binary))
+        self.assertLess(os.path.getsize(self._binary), os.path.getsize(self._filename) / 4)
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_arrays(self):
+        protocols = parser.parse_log(self._filename, arrays=True)
+        smplayer.write_binary_log(protocols, self._binary)
+        binary = list(smplayer.iter_binary_log(self._binary, arrays=True))
+        self._assertSameProtocols(protocols, binary)
+        self.assertEqual(binary[0].input[0].dtype, vector.numpy.uint32)
+        self.assertTrue(all(p.verify() for p in binary))
+
+    def test_context(self):
+        context = smprotocol.Context(mod=2**64, computing=4)
+        protocols = [smprotocol.Addition(([1, 2], [3, 4]), [4, 6], context)]
+        smplayer.write_binary_log(protocols, self._binary, context)
+        self._assertSameProtocols(protocols, list(smplayer.iter_binary_log(self._binary)))
+
+        with self.assertRaises(ValueError):
+            smplayer.write_binary_log(protocols, self._binary)
+        # The failed conversion left the log as it was.
+        self._assertSameProtocols(protocols, list(smplayer.iter_binary_log(self._binary)))
+        self.assertEqual(os.listdir(self._tmpdir.name), ["audit.smpb"])
+
+    def test_player(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        smplayer.write_binary_log(player.protocols, self._binary)
+
+        for streaming in (False, True):
+            binary = smplayer.SMPlayer()
+            binary.open(self._binary, streaming=streaming)
+            self.assertTrue(binary.verify())
+            self.assertEqual(binary.hash(), player.hash())
+
+    def test_binary_log(self):
+        protocols = parser.parse_log(self._filename)
+        smplayer.write_binary_log(protocols, self._binary)
+
+        log = smplayer.BinaryLog(self._binary)
+        self.assertEqual(len(log), len(protocols))
+        self._assertSameProtocols([protocols[9], protocols[-1]], [log[9], log[-1]])
+        self._assertSameProtocols(protocols[3:7], log[3:7])
+        self._assertSameProtocols(protocols, list(log))
+        with self.assertRaises(IndexError):
+            log[len(protocols)]
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_binary_log_views(self):
+        smplayer.write_binary_log(parser.parse_log(self._filename), self._binary)
+
+        player = smplayer.SMPlayer()
+        player.open(self._binary, arrays=True)
+        self.assertIsInstance(player.protocols, smplayer.BinaryLog)
+        self.assertFalse(player.protocols[0].input[0].flags.writeable)
+        self.assertTrue(player.verify())
+        self.assertTrue(player.verify(jobs=2))
+
+    def test_corrupt(self):
+        smplayer.write_binary_log(parser.parse_log(self._filename), self._binary)
+        with open(self._binary, "rb") as f:
+            data = f.read()
+
+        for corrupt in (data[:-10], data[:30], data[:8] + b"\2" + data[9:]):
+            with open(self._binary, "wb") as f:
+                f.write(corrupt)
+            with self.assertRaises(smplayer.LogError):
+                list(smplayer.iter_binary_log(self._binary))
+
+        with self.assertRaises(smplayer.LogError):
+            list(smplayer.iter_binary_log(self._filename))
+
+if __name__ == "__main__":
+    unittest.main()
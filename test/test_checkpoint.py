@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._checkpoint as ckpt
+import smplayer.core._parser as parser
+
+class Interrupted(Exception):
+    pass
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._tmpdir.name, "audit.log")
+        self._checkpoint = os.path.join(self._tmpdir.name, "audit.ckpt")
+        shutil.copy(basedir + "data/audit.log", self._filename)
+
+        with open(self._filename) as f:
+            text = f.read()
+        # Break the output of the summation (protocol #9).
+        output = parser.parse_log(self._filename)[9].output[0]
+        value = "<value>{0}</value>".format(output)
+        pos = text.index(value, text.index("<output>", text.index("<sum>")))
+        with open(self._filename, "w") as f:
+            f.write(text[:pos] + "<value>{0}</value>".format(output ^ 1) + text[pos + len(value):])
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _player(self, streaming=False):
+        player = smplayer.SMPlayer()
+        player.checkpoint_interval = 4
+        player.open(self._filename, streaming=streaming)
+        return player
+
+    def _interrupt(self, player, segments):
+        """Makes *player* stop verifying after *segments* segments."""
+        find_failures = player._find_failures
+        def interrupted(protocols, batch_size, jobs):
+            nonlocal segments
+            if not segments:
+                raise Interrupted()
+            segments -= 1
+            return find_failures(protocols, batch_size, jobs)
+        player._find_failures = interrupted
+
+    def test_save_load(self):
+        self.assertIsNone(ckpt.load_checkpoint(self._checkpoint))
+        checkpoint = ckpt.Checkpoint(4, 1000, "00", [1, 3])
+        ckpt.save_checkpoint(checkpoint, self._checkpoint)
+        self.assertEqual(ckpt.load_checkpoint(self._checkpoint), checkpoint)
+        with open(self._checkpoint, "w") as f:
+            f.write('{"index": 4}')
+        with self.assertRaises(ValueError):
+            ckpt.load_checkpoint(self._checkpoint)
+
+    def test_verify(self):
+        expected = self._player()
+        self.assertFalse(expected.verify())
+        self.assertIn(9, expected.failures)
+
+        for streaming in (False, True):
+            player = self._player(streaming)
+            self._interrupt(player, 3)
+            with self.assertRaises(Interrupted):
+                player.verify(checkpoint=self._checkpoint)
+            checkpoint = ckpt.load_checkpoint(self._checkpoint)
+            self.assertEqual(checkpoint.index, 12)
+            self.assertEqual(checkpoint.failures, [i for i in expected.failures if i < 12])
+
+            player = self._player(streaming)
+            self._interrupt(player, 100)
+            self.assertFalse(player.verify(checkpoint=self._checkpoint, resume=True))
+            self.assertEqual(player.failures, expected.failures)
+            self.assertFalse(os.path.exists(self._checkpoint))
+
+    def test_jobs(self):
+        expected = self._player()
+        expected.verify()
+
+        player = self._player()
+        executors = []
+        find_failures = player._find_failures
+        def recording(protocols, batch_size, jobs):
+            executors.append(player._executor)
+            return find_failures(protocols, batch_size, jobs)
+        player._find_failures = recording
+        self.assertFalse(player.verify(jobs=2, checkpoint=self._checkpoint))
+        self.assertEqual(player.failures, expected.failures)
+        # All segments are verified by the same worker processes.
+        self.assertGreater(len(executors), 1)
+        self.assertIsNotNone(executors[0])
+        self.assertEqual(set(executors), {executors[0]})
+        self.assertIsNone(player._executor)
+
+    def test_audit(self):
+        expected = self._player().audit(hash_version=2)
+
+        player = self._player(streaming=True)
+        self._interrupt(player, 2)
+        with self.assertRaises(Interrupted):
+            player.audit(hash_version=2, checkpoint=self._checkpoint)
+
+        player = self._player(streaming=True)
+        self._interrupt(player, 100)
+        self.assertEqual(player.audit(hash_version=2, checkpoint=self._checkpoint, resume=True),
+                expected)
+
+    def test_changed(self):
+        player = self._player()
+        self._interrupt(player, 1)
+        with self.assertRaises(Interrupted):
+            player.verify(checkpoint=self._checkpoint)
+
+        # Replace the first line break by a space.
+        with open(self._filename, "r+b") as f:
+            f.seek(f.read().index(b"\n"))
+            f.write(b" ")
+        player = self._player()
+        with self.assertRaises(ValueError):
+            player.verify(checkpoint=self._checkpoint, resume=True)
+
+        # Without resume, the checkpoint is ignored.
+        self.assertFalse(player.verify(checkpoint=self._checkpoint))
+
+if __name__ == "__main__":
+    unittest.main()
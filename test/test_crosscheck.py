@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core.protocol as smprotocol
+
+def declassifications(count, seed=0):
+    """Returns the logs of three nodes declassifying *count* random vectors."""
+    rand = random.Random(seed)
+    mod = 2**32
+    logs = ([], [], [])
+    for _ in range(0, count):
+        x = [[rand.randrange(mod) for k in range(0, 2)] for i in range(0, 3)]
+        r = [[rand.randrange(mod) for k in range(0, 2)] for i in range(0, 3)]
+        sr = [[(a + b - c) % mod for (a, b, c) in zip(x[i], r[i - 1], r[i])]
+                for i in range(0, 3)]
+        output = [sum(v) % mod for v in zip(*sr)]
+        for i in range(0, 3):
+            # Copy all vectors, so that changing one message does not change
+            # the same message in the log of another node.
+            computing = tuple(list(sr[j]) for j in range(0, 3) if j != i)
+            logs[i].append(smprotocol.Declassification(x[i], output,
+                    { "next": list(r[i]), "remote": list(sr[i]) },
+                    { "prev": list(r[i - 1]), "computing": computing }))
+    return logs
+
+def write_log(filename, protocols):
+    """Writes declassification protocols to an audit log."""
+    def vectors(tag, node, message):
+        if not isinstance(message, tuple):
+            message = (message, )
+        attr = ' node="{0}"'.format(node) if node else ""
+        return "<{0}{1}>{2}</{0}>".format(tag, attr, "".join("<vector>{0}</vector>".format(
+                "".join("<value>{0}</value>".format(x) for x in v)) for v in message))
+
+    with open(filename, "w") as f:
+        f.write("<audit>\n")
+        for p in protocols:
+            f.write("<declassify>" + vectors("input", None, p.input) +
+                    "".join(vectors("send", k, m) for (k, m) in p.send.items()) +
+                    vectors("recv", "prev", p.recv["prev"]) +
+                    vectors("recv", "computing", p.recv["computing"]) +
+                    vectors("output", None, p.output) + "</declassify>\n")
+        f.write("</audit>\n")
+
+class TestCrosscheck(unittest.TestCase):
+
+    def test_consistent(self):
+        logs = declassifications(20)
+        for log in logs:
+            self.assertTrue(all(p.verify() for p in log))
+        self.assertEqual(smplayer.crosscheck_protocols(logs), [])
+
+        # The order of the messages received from computing nodes is not fixed.
+        logs[0][3].recv["computing"] = logs[0][3].recv["computing"][::-1]
+        self.assertEqual(smplayer.crosscheck_protocols(logs), [])
+
+        with self.assertRaises(ValueError):
+            smplayer.crosscheck_protocols(logs[:1])
+
+    def test_mismatches(self):
+        logs = declassifications(20)
+        logs[1][7].send["next"][0] ^= 1
+        logs[2][4].send["remote"][0] ^= 1
+        logs[2][9].send["remote"][0] ^= 1
+        self.assertEqual(smplayer.crosscheck_protocols(logs), [
+                smplayer.LinkMismatch(2, 0, "remote", 4),
+                smplayer.LinkMismatch(2, 1, "remote", 4),
+                smplayer.LinkMismatch(1, 2, "next", 7),
+            ])
+
+        # A missing protocol breaks all links of the node.
+        logs = declassifications(5)
+        del logs[0][-1]
+        mismatches = smplayer.crosscheck_protocols(logs)
+        self.assertEqual(len(mismatches), 6)
+        self.assertTrue(all(m.protocol == 4 for m in mismatches))
+        self.assertTrue(all(0 in (m.sender, m.receiver) for m in mismatches))
+
+    def test_logs(self):
+        logs = declassifications(10)
+        logs[0][2].send["next"][0] ^= 1
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = [os.path.join(tmpdir, "node%d.log" % i) for i in range(0, 3)]
+            for (filename, log) in zip(filenames, logs):
+                write_log(filename, log)
+            self.assertEqual(smplayer.crosscheck_logs(filenames),
+                    [smplayer.LinkMismatch(0, 1, "next", 2)])
+
+            # Binary logs and mixed sets of logs are read as well.
+            binary = [filename + ".smpb" for filename in filenames]
+            for (filename, log) in zip(binary, logs):
+                smplayer.write_binary_log(log, filename)
+            for names in (binary, [filenames[0], binary[1], filenames[2]]):
+                self.assertEqual(smplayer.crosscheck_logs(names),
+                        [smplayer.LinkMismatch(0, 1, "next", 2)])
+
+    def _hashes(self, logs, version=1):
+        hashes = []
+        for log in logs:
+            player = smplayer.SMPlayer()
+            player.protocols = log
+            hashes.append(player.hash(version))
+        return hashes
+
+    def test_hashes(self):
+        logs = declassifications(10)
+        for version in smplayer.HASH_VERSIONS:
+            self.assertEqual(smplayer.crosscheck_hashes(self._hashes(logs, version)), [])
+
+        logs[0][2].send["next"][0] ^= 1
+        logs[1][5].send["remote"][1] ^= 1
+        self.assertEqual(smplayer.crosscheck_hashes(self._hashes(logs)), [
+                smplayer.LinkMismatch(0, 1, "next", None),
+                smplayer.LinkMismatch(1, 0, "remote", None),
+                smplayer.LinkMismatch(1, 2, "remote", None),
+            ])
+
+        with self.assertRaises(ValueError):
+            smplayer.crosscheck_hashes(self._hashes(logs)[:2])
+
+    def test_hash_reports(self):
+        hashes = self._hashes(declassifications(3))[0]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "report.json")
+            smplayer.save_hash_report(hashes, filename, version=2)
+            self.assertEqual(smplayer.load_hash_report(filename), (hashes, 2))
+
+            smplayer.save_hash_report(None, filename)
+            (empty, version) = smplayer.load_hash_report(filename)
+            self.assertEqual(empty.recv_computing, [])
+
+            with open(filename, "w") as f:
+                f.write('{"send_prev": null}')
+            with self.assertRaises(ValueError):
+                smplayer.load_hash_report(filename)
+
+if __name__ == "__main__":
+    unittest.main()
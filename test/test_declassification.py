@@ -58,5 +58,21 @@ class TestDeclassificationProtocol(unittest.TestCase):
         self.assertFalse(self._declass.verify(), "Verification did not fail: " \
                 "got result {0}".format(self._declass.result))
 
+    def test_check(self):
+        self.assertTrue(self._declass.check())
+        self.assertIsNone(self._declass._cached, "check() cached the simulation result")
+
+        self._declass.output[0] = 1  # Break the expected output.
+        self.assertFalse(self._declass.check())
+        self.assertFalse(self._declass.verify())
+
+        # Break a message instead.
+        self._declass.clear_cache()
+        self._declass.output[0] = self._declass.result.output[0]
+        self.assertTrue(self._declass.check())
+        self._declass.send["remote"][1] ^= 1
+        self.assertFalse(self._declass.check())
+        self.assertFalse(self._declass.verify())
+
 if __name__ == "__main__":
     unittest.main()
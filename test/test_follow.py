@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+
+class TestFollow(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        with open(basedir + "data/audit.log", "rb") as f:
+            self._data = f.read()
+        self._protocols = parser.parse_log(basedir + "data/audit.log")
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._tmpdir.name, "audit.log")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _write(self, pieces):
+        """Appends *pieces* of the log to the file one after another."""
+        with open(self._filename, "ab", buffering=0) as f:
+            for piece in pieces:
+                f.write(piece)
+                time.sleep(0.002)
+
+    def _assertSameProtocols(self, protocols):
+        self.assertEqual(len(protocols), len(self._protocols))
+        for (p, o) in zip(self._protocols, protocols):
+            self.assertIs(type(o), type(p))
+            self.assertTrue(vector.equal(o.input, p.input))
+            self.assertTrue(vector.equal(o.output, p.output))
+
+    def test_growing(self):
+        open(self._filename, "wb").close()
+        pieces = [self._data[i:i + 97] for i in range(0, len(self._data), 97)]
+        writer = threading.Thread(target=self._write, args=(pieces,))
+        writer.start()
+        try:
+            protocols = list(parser.follow_log(self._filename, poll_interval=0.001, idle_timeout=10))
+        finally:
+            writer.join()
+        self._assertSameProtocols(protocols)
+
+    def test_idle_timeout(self):
+        end = self._data.rindex(b"</audit>")
+        cut = self._data.rindex(b"<value>", 0, end)
+        self._write([self._data[:cut]])
+        protocols = list(parser.follow_log(self._filename, poll_interval=0.001, idle_timeout=0.05))
+        self.assertEqual(len(protocols), len(self._protocols) - 1)
+
+    def test_errors(self):
+        self._write([b"<log><add>"])
+        with self.assertRaises(smplayer.LogError):
+            list(parser.follow_log(self._filename, poll_interval=0.001, idle_timeout=0.05))
+
+        open(self._filename, "wb").close()
+        self._write([b"<audit><add>"])
+        self.assertEqual(list(parser.follow_log(self._filename, poll_interval=0.001,
+                idle_timeout=0.05)), [])
+        self._write([b"</sub>"])
+        with self.assertRaises(smplayer.LogError):
+            list(parser.follow_log(self._filename, poll_interval=0.001, idle_timeout=0.05))
+
+    def test_player(self):
+        self._write([self._data])
+        expected = smplayer.SMPlayer()
+        expected.open(self._filename)
+        audit = expected.audit(hash_version=2)
+
+        player = smplayer.SMPlayer()
+        player.open(self._filename, streaming=True)
+        results = list(player.follow(hash_version=2, poll_interval=0.001))
+        self.assertEqual([r.index for r in results], list(range(len(self._protocols))))
+        self.assertEqual([r.verified for r in results], [i not in audit.failures
+                for i in range(len(results))])
+        self.assertEqual(player.failures, audit.failures)
+        self.assertEqual(results[-1].hashes, audit.hashes)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import os
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+from smplayer.core.protocol import context as ctx
+
+class TestGenerate(unittest.TestCase):
+
+    def _check(self, generated, nodes):
+        for g in generated:
+            self.assertEqual(len(g.protocols), nodes)
+            for (i, p) in enumerate(g.protocols):
+                self.assertEqual(p.verify(), i != g.fault)
+        logs = [[g.protocols[i] for g in generated] for i in range(0, nodes)]
+        self.assertEqual(smplayer.crosscheck_protocols(logs), [])
+
+    def test_nodes(self):
+        for nodes in (2, 3, 4):
+            generated = list(smplayer.generate_protocols(200, nodes, seed=nodes, fault_rate=0.1))
+            self.assertTrue(any(g.fault is not None for g in generated))
+            self._check(generated, nodes)
+
+            # The logs can be read back.
+            context = ctx.Context(mod=ctx.default_context.mod, computing=nodes)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                filenames = [os.path.join(tmpdir, "audit-{0}.log".format(i)) for i in range(0, nodes)]
+                faults = smplayer.write_logs(generated, filenames)
+                for (node, filename) in enumerate(filenames):
+                    player = smplayer.SMPlayer()
+                    player.open(filename, context=context)
+                    player.verify()
+                    self.assertEqual(player.failures, [i for (i, n) in faults if n == node])
+                self.assertEqual(smplayer.crosscheck_logs(filenames, context=context), [])
+
+    def test_mix(self):
+        generated = list(smplayer.generate_protocols(50, mix={"mult": 1, "sum": 0}, sizes=(3, 5)))
+        self._check(generated, 3)
+        mod = ctx.default_context.mod
+        for g in generated:
+            self.assertIsInstance(g.protocols[0], smplayer.protocol.Multiplication)
+            self.assertTrue(3 <= len(g.protocols[0].output) <= 5)
+            # The shares of the output are shares of the product of the inputs.
+            (a, b, out) = ([sum(v) % mod for v in zip(*values)] for values in
+                    zip(*((p.input[0], p.input[1], p.output) for p in g.protocols)))
+            self.assertEqual(out, [x * y % mod for (x, y) in zip(a, b)])
+
+    def test_seed(self):
+        (a, b) = (list(smplayer.generate_protocols(20, seed=7)) for i in range(0, 2))
+        self.assertEqual([[p.output for p in g.protocols] for g in a],
+                [[p.output for p in g.protocols] for g in b])
+
+    def test_invalid(self):
+        for kwargs in ({"nodes": 1}, {"nodes": 4, "mix": {"mult": 1}}, {"mix": {"div": 1}},
+                {"mix": {"add": 0}}, {"sizes": (0, 3)}, {"fault_rate": 2}):
+            with self.assertRaises(ValueError):
+                next(smplayer.generate_protocols(1, **kwargs))
+
+    def test_write_logs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = [os.path.join(tmpdir, "audit-{0}.log".format(i)) for i in range(0, 4)]
+            generated = list(smplayer.generate_protocols(100, 4, seed=1, fault_rate=0.05))
+            faults = smplayer.write_logs(generated, filenames)
+            self.assertEqual(faults, [(i, g.fault) for (i, g) in enumerate(generated)
+                    if g.fault is not None])
+
+            context = ctx.Context(mod=ctx.default_context.mod, computing=4)
+            with self.assertRaises(smplayer.LogError):
+                parser.parse_log(filenames[0])
+            player = smplayer.SMPlayer()
+            player.open(filenames[1], context=context)
+            self.assertEqual(player.verify(), not any(node == 1 for (i, node) in faults))
+            self.assertEqual(player.failures, [i for (i, node) in faults if node == 1])
+            self.assertEqual(smplayer.crosscheck_logs(filenames), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._index as logindex
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._tmpdir.name, "audit.log")
+        shutil.copy(basedir + "data/audit.log", self._filename)
+        self._protocols = parser.parse_log(self._filename)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _assertSameProtocol(self, protocol, other):
+        self.assertIs(type(other), type(protocol))
+        self.assertTrue(vector.equal(other.input, protocol.input))
+        self.assertTrue(vector.equal(other.output, protocol.output))
+
+    def _check_index(self, filename):
+        index = logindex.build_index(filename)
+        self.assertEqual(len(index), len(self._protocols))
+        for (i, p) in enumerate(self._protocols):
+            self._assertSameProtocol(p, index.protocol(i))
+            self.assertEqual(index.outputs[i], len(vector.tolist(p.output)))
+        for (p, o) in zip(self._protocols[4:9], index.protocols(4, 9)):
+            self._assertSameProtocol(p, o)
+        with self.assertRaises(IndexError):
+            index.protocol(len(self._protocols))
+
+        logindex.save_index(index)
+        loaded = logindex.load_index(filename)
+        self.assertEqual(loaded.offsets, index.offsets)
+        self.assertEqual(loaded.lengths, index.lengths)
+        self.assertEqual(loaded.outputs, index.outputs)
+        self.assertEqual(loaded.types, index.types)
+        self._assertSameProtocol(self._protocols[-1], loaded.protocol(-1))
+        self.assertFalse(os.path.exists(logindex.index_filename(filename) + ".tmp"))
+
+        # The log is mapped again after closing the index.
+        index.close()
+        self.assertIsNone(index._data)
+        self._assertSameProtocol(self._protocols[0], index.protocol(0))
+        index.close()
+        loaded.close()
+
+    def test_xml(self):
+        self._check_index(self._filename)
+
+    def test_binary(self):
+        binary = os.path.join(self._tmpdir.name, "audit.smpb")
+        smplayer.write_binary_log(self._protocols, binary)
+        self._check_index(binary)
+
+    def test_stale(self):
+        logindex.save_index(logindex.build_index(self._filename))
+        self.assertIsNotNone(logindex.load_index(self._filename))
+        with open(self._filename, "a") as f:
+            f.write("\n")
+        self.assertIsNone(logindex.load_index(self._filename))
+
+    def test_unusual(self):
+        with open(self._filename, "a") as f:
+            f.write("<!-- comment -->\n")
+        with self.assertRaises(smplayer.LogError):
+            logindex.build_index(self._filename)
+
+    def test_empty(self):
+        open(self._filename, "w").close()
+        with self.assertRaises(smplayer.LogError):
+            logindex.build_index(self._filename)
+
+    def test_player(self):
+        with open(self._filename) as f:
+            text = f.read()
+        # Break the output of the summation (protocol #9).
+        value = "<value>{0}</value>".format(self._protocols[9].output[0])
+        pos = text.index(value, text.index("<output>", text.index("<sum>")))
+        with open(self._filename, "w") as f:
+            f.write(text[:pos] + "<value>{0}</value>".format(self._protocols[9].output[0] ^ 1) +
+                    text[pos + len(value):])
+
+        player = smplayer.SMPlayer()
+        player.open(self._filename, streaming=True)
+        failures = [i for (i, p) in enumerate(parser.iter_log(self._filename)) if not p.verify()]
+        self.assertIn(9, failures)
+
+        self.assertEqual(player.verify_range(0, None), failures)
+        self.assertEqual(player.verify_range(5, 10, batch_size=4), [i for i in failures if 5 <= i < 10])
+        self.assertTrue(os.path.exists(logindex.index_filename(self._filename)))
+        self._assertSameProtocol(self._protocols[3], player.load_protocol(3))
+
+        # Opening another log releases the index of this one.
+        index = player.index()
+        player.open(self._filename, streaming=True)
+        self.assertIsNone(index._data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._logcache as logcache
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+from smplayer.core.protocol import context as ctx
+
+class TestLogCache(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._tmpdir.name, "audit.log")
+        shutil.copy(basedir + "data/audit.log", self._filename)
+        self._protocols = parser.parse_log(self._filename)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _open(self, cache):
+        player = smplayer.SMPlayer()
+        player.open(self._filename, cache=cache)
+        self.assertEqual(len(player.protocols), len(self._protocols))
+        for (p, o) in zip(self._protocols, player.protocols):
+            self.assertIs(type(o), type(p))
+            self.assertTrue(vector.equal(o.input, p.input))
+            self.assertTrue(vector.equal(o.output, p.output))
+        return player
+
+    def test_sidecar(self):
+        self.assertIsInstance(self._open(True).protocols, tuple)
+        entry = logcache.LogCache(self._filename)
+        self.assertEqual(entry.filename, self._filename + ".cache")
+        self.assertTrue(os.path.exists(entry.key_filename))
+        self.assertIsInstance(self._open(True).protocols, smplayer.BinaryLog)
+
+        # The same size and time, but different contents.
+        stat = os.stat(self._filename)
+        with open(self._filename, "r+b") as f:
+            f.seek(f.read().index(b"\n"))
+            f.write(b" ")
+        os.utime(self._filename, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(logcache.LogCache(self._filename).load())
+        self.assertIsInstance(self._open(True).protocols, tuple)
+        self.assertIsInstance(self._open(True).protocols, smplayer.BinaryLog)
+
+    def test_trusted(self):
+        # The log was not modified just before it was cached, so the size and
+        # time are enough to identify it.
+        stat = os.stat(self._filename)
+        os.utime(self._filename, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**10))
+        self._open(True)
+        entry = logcache.LogCache(self._filename)
+        with open(entry.key_filename) as f:
+            self.assertNotIn("sha256", json.load(f))
+        self.assertIsInstance(entry.load(), smplayer.BinaryLog)
+        self.assertEqual(entry._digest, None)
+
+    def test_context(self):
+        self._open(True)
+        context = ctx.Context(mod=2**32, computing=2)
+        self.assertIsNotNone(logcache.LogCache(self._filename).load())
+        self.assertIsNone(logcache.LogCache(self._filename, context=context).load())
+
+    def test_directory(self):
+        cache_dir = os.path.join(self._tmpdir.name, "cache")
+        self._open(cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+        self.assertIsInstance(self._open(cache_dir).protocols, smplayer.BinaryLog)
+        self.assertFalse(os.path.exists(self._filename + ".cache"))
+
+    def test_changed(self):
+        self._open(True)
+        with open(self._filename, "a") as f:
+            f.write("\n")
+        self.assertIsNone(logcache.LogCache(self._filename).load())
+
+        with open(logcache.LogCache(self._filename).key_filename, "w") as f:
+            f.write("[]")
+        self.assertIsNone(logcache.LogCache(self._filename).load())
+
+if __name__ == "__main__":
+    unittest.main()
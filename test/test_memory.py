@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import json
+import os
+import tracemalloc
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._memory as memory
+import smplayer.core._parser as parser
+
+class TestMemory(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+        self._protocols = parser.parse_log(self._filename)
+        self._types = {type(p).__name__ for p in self._protocols}
+
+    def _audit(self, streaming=False, batch_size=None):
+        player = smplayer.SMPlayer()
+        player.memory = smplayer.MemoryProfile()
+        player.memory.start()
+        try:
+            player.open(self._filename, streaming=streaming)
+            result = player.audit(batch_size=batch_size)
+        finally:
+            player.memory.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        return (player, result)
+
+    def test_phases(self):
+        for streaming in (False, True):
+            (player, _) = self._audit(streaming=streaming)
+            profile = player.memory
+            self.assertEqual(profile._order(), ["parse", "simulate", "hash"])
+            for phase in ("parse", "simulate", "hash"):
+                total = profile.total(phase)
+                self.assertEqual(total.count, len(self._protocols))
+                self.assertGreaterEqual(total.high, total.peak)
+                self.assertLessEqual(total.high, profile.peak)
+                self.assertEqual(set(profile.phases[phase]) - {"*"}, self._types)
+            self.assertGreater(profile.total("parse").retained, 0)
+            self.assertGreater(profile.total("simulate").retained, 0)
+            self.assertTrue(profile.top)
+
+    def test_sizes(self):
+        (player, _) = self._audit()
+        sizes = player.memory.sizes
+        self.assertEqual(set(sizes), self._types)
+        self.assertEqual(player.memory.total_sizes().count, len(self._protocols))
+        # Only multiplications keep a trace of their simulation.
+        self.assertGreater(sizes["Multiplication"].trace, 0)
+        self.assertEqual(sizes["Addition"].trace, 0)
+        self.assertEqual(sizes["Addition"].messages, 0)
+        self.assertGreater(sizes["Declassification"].messages, 0)
+
+    def test_batch(self):
+        (player, result) = self._audit(batch_size=4)
+        self.assertEqual(result, self._audit()[1])
+        self.assertNotIn("simulate", player.memory.phases)
+        self.assertEqual(player.memory.total("verify").count, len(self._protocols))
+
+    def test_nested(self):
+        profile = smplayer.MemoryProfile(sites=0)
+        profile.start()
+        try:
+            def outer(_):
+                inner = profile.measure("inner", lambda x: [0] * 100000, None, kind="t")
+                return (inner, [1] * 1000)
+            kept = profile.measure("outer", outer, None, kind="t")
+        finally:
+            profile.stop()
+        inner = profile.get("inner", "t")
+        outer = profile.get("outer", "t")
+        self.assertGreaterEqual(inner.retained, 800000)
+        # The list retained by the inner measurement is not counted again.
+        self.assertLess(outer.retained, 100000)
+        self.assertGreaterEqual(outer.peak, inner.retained)
+        self.assertEqual(profile.top, [])
+        del kept
+
+    def test_freed(self):
+        profile = smplayer.MemoryProfile(sites=0)
+        profile.start()
+        try:
+            kept = profile.measure("alloc", lambda _: [0] * 100000, None, kind="t")
+            profile.measure("free", lambda _: kept.clear(), None, kind="t")
+        finally:
+            profile.stop()
+        alloc = profile.get("alloc", "t")
+        free = profile.get("free", "t")
+        self.assertGreaterEqual(alloc.retained, 800000)
+        # Memory released from an earlier phase is not negative retained memory.
+        self.assertEqual(free.retained, 0)
+        self.assertGreater(free.freed, 700000)
+        self.assertIn("freed", profile.format())
+
+    def test_sizeof(self):
+        shared = [1000, 2000]
+        seen = set()
+        size = memory.sizeof({"a": shared}, seen)
+        self.assertGreater(size, memory.sizeof(shared))
+        self.assertEqual(memory.sizeof((shared, shared), seen), memory.sizeof(()) + 8 * 2)
+
+    def test_report(self):
+        (player, _) = self._audit()
+        data = json.loads(player.memory.to_json())
+        self.assertEqual(list(data["phases"]), ["parse", "simulate", "hash"])
+        self.assertEqual(data["sizes"]["total"]["count"], len(self._protocols))
+        self.assertIn("Multiplication", player.memory.format())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+
+class TestMerkle(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+
+    def _tree(self, messages):
+        tree = smplayer.MerkleTree()
+        for (i, message) in enumerate(messages):
+            tree.append(message, 2 * i)
+        return tree
+
+    def test_first_divergence(self):
+        messages = [[i, i + 1] for i in range(0, 13)]
+        tree = self._tree(messages)
+        self.assertIsNone(tree.first_divergence(self._tree(messages)))
+        self.assertIsNone(smplayer.MerkleTree().first_divergence(smplayer.MerkleTree()))
+
+        for i in range(0, len(messages)):
+            changed = list(messages)
+            changed[i] = [0]
+            self.assertEqual(tree.first_divergence(self._tree(changed)), i)
+            self.assertEqual(self._tree(changed).first_divergence(tree), i)
+
+            # One tree is a prefix of the other.
+            self.assertEqual(tree.first_divergence(self._tree(messages[:i])), i)
+            self.assertEqual(self._tree(messages[:i]).first_divergence(tree), i)
+
+    def test_player(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        trees = player.merkle_trees()
+        self.assertEqual(player.audit(trees=True).trees.keys(), trees.keys())
+        self.assertIn("send_next", trees)
+
+        player.protocols[5].send["next"][0] ^= 1
+        tree = player.merkle_trees()["send_next"]
+        leaf = trees["send_next"].first_divergence(tree)
+        self.assertEqual(tree.indices[leaf], 5)
+
+    def test_save_load(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        trees = player.merkle_trees()
+        trees["empty"] = smplayer.MerkleTree()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "trees")
+            smplayer.save_merkle_trees(trees, filename)
+            loaded = smplayer.load_merkle_trees(filename)
+
+            with open(filename, "r+b") as f:
+                f.truncate(100)
+            with self.assertRaises(ValueError):
+                smplayer.load_merkle_trees(filename)
+
+        self.assertEqual(loaded.keys(), trees.keys())
+        for (name, tree) in trees.items():
+            self.assertEqual(loaded[name].root, tree.root)
+            self.assertEqual(loaded[name].indices, tree.indices)
+            self.assertIsNone(loaded[name].first_divergence(tree))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -58,5 +58,21 @@ class TestMultiplicationProtocol(unittest.TestCase):
         self.assertFalse(self._mult.verify(), "Verification did not fail: " \
                 "got result {0}".format(self._mult.result))
 
+    def test_check(self):
+        self.assertTrue(self._mult.check())
+        self.assertIsNone(self._mult._cached, "check() cached the simulation result")
+
+        self._mult.output[0] = 0  # Break the expected output.
+        self.assertFalse(self._mult.check())
+        self.assertFalse(self._mult.verify())
+
+        # Break a message instead.
+        self._mult.clear_cache()
+        self._mult.output[0] = self._mult.result.output[0]
+        self.assertTrue(self._mult.check())
+        self._mult.send["next"][0][1] ^= 1
+        self.assertFalse(self._mult.check())
+        self.assertFalse(self._mult.verify())
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import concurrent.futures
+import os
+import random
+import subprocess
+import sys
+import unittest
+from multiprocessing import shared_memory
+
+import smplayer.core._parallel as parallel
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+import smplayer.core.protocol as protocol
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(3)
+        vec = lambda: [rand.randrange(2**32) for _ in range(0, 1000)]
+        vecs = lambda k: tuple(vec() for _ in range(0, k))
+
+        mult = protocol.Multiplication(vecs(2), vec(),
+                { "prev": vecs(2), "next": vecs(3) }, { "prev": vecs(3), "next": vecs(2) })
+        result = mult.result
+        self._mult = protocol.Multiplication(mult.input, result.output, result.send, mult.recv)
+
+        summation = protocol.Summation(vec(), [0] * 100)
+        self._sum = protocol.Summation(summation.input, summation.result)
+
+    def test_find_failures(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        protocols = parser.parse_log(basedir + "data/audit.log")
+        protocols[5].output[0] ^= 1
+        protocols[17].output[0] ^= 1
+
+        self.assertEqual(list(parallel.find_failures(protocols, 2, 4)), [5, 17])
+        self.assertEqual(list(parallel.find_failures(protocols, 2, 4, batched=True)), [5, 17])
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_split(self):
+        protocols = [self._mult, self._sum, protocol.Addition(([1], [2]), [3])]
+        self.assertEqual(list(parallel.find_failures(protocols, 3, 2, split_size=100)), [])
+
+        self._mult.output[999] ^= 1
+        self._sum.output[0] ^= 1
+        self.assertEqual(list(parallel.find_failures(protocols, 3, 2, split_size=100)), [0, 1])
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_split_clean_exit(self):
+        # Workers must leave the shared memory blocks to the parent, so that
+        # neither the resource tracker nor the parent reports any problem.
+        script = "\n".join([
+            "import smplayer.core._parallel as parallel",
+            "import smplayer.core.protocol as protocol",
+            "bad = protocol.Summation(list(range(1000)), [0] * 10)",
+            "good = protocol.Summation(bad.input, bad.result)",
+            "protocols = [good, bad, good, good]",
+            "assert list(parallel.find_failures(protocols, 3, 2, split_size=5)) == [1]",
+        ])
+        env = dict(os.environ)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        result = subprocess.run([sys.executable, "-c", script], env=env,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stderr, "")
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_split_submit_fails(self):
+        names = []
+        class Executor(object):
+            def submit(self, function, spec, lo, hi):
+                names.append(spec[0])
+                if len(names) > 1:
+                    raise RuntimeError("submit failed")
+                future = concurrent.futures.Future()
+                future.set_result(True)
+                return future
+
+        with self.assertRaises(RuntimeError):
+            parallel._SplitTask(Executor(), 0, self._mult, 3)
+        # The shared memory block was released.
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=names[0])
+
+if __name__ == "__main__":
+    unittest.main()
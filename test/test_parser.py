@@ -33,8 +33,11 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import unittest
 import os
+import tempfile
+import xml.etree.ElementTree as ET
 
 import smplayer.core._parser as parser
+import smplayer.core._vector as vector
 import smplayer.core.protocol as protocol
 
 class TestParser(unittest.TestCase):
@@ -60,5 +63,107 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(protocols[22], protocol.Addition)
         self.assertTrue(protocols[22].verify(), "Parsed addition protocol did not verify")
 
+    def test_iter_log(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        protocols = parser.parse_log(basedir + "data/audit.log")
+        streamed = list(parser.iter_log(basedir + "data/audit.log"))
+
+        self.assertEqual(len(streamed), len(protocols))
+        for (p, s) in zip(protocols, streamed):
+            self.assertIs(type(s), type(p))
+            self.assertEqual(s.input, p.input)
+            self.assertEqual(s.output, p.output)
+
+    def test_parse_log_jobs(self):
+        text = self._read_log()
+        for t in (text, text.replace("</mult>", "</mult><!-- <add> -->")):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                filename = os.path.join(tmpdir, "audit.log")
+                with open(filename, "w") as f:
+                    f.write(t)
+                protocols = parser.parse_log(filename)
+                parallel = parser.parse_log(filename, jobs=3)
+
+            self.assertEqual(len(parallel), len(protocols))
+            for (p, s) in zip(protocols, parallel):
+                self.assertIs(type(s), type(p))
+                self.assertEqual((s.input, s.output), (p.input, p.output))
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_parse_log_arrays(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        protocols = parser.parse_log(basedir + "data/audit.log")
+        arrays = parser.parse_log(basedir + "data/audit.log", arrays=True)
+
+        self.assertEqual(len(arrays), len(protocols))
+        for (p, a) in zip(protocols, arrays):
+            self.assertIs(type(a), type(p))
+            self.assertTrue(vector.equal(a.input, p.input))
+            self.assertTrue(vector.equal(a.output, p.output))
+            self.assertTrue(a.verify(), "{0} with arrays did not verify".format(type(a).__name__))
+
+        self.assertEqual(arrays[0].input[0].dtype, vector.numpy.uint32)
+
+    def _read_log(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        with open(basedir + "data/audit.log") as f:
+            return f.read()
+
+    def _iter_text(self, text):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "audit.log")
+            with open(filename, "w") as f:
+                f.write(text)
+            scanned = list(parser.iter_log(filename))
+            events = ET.iterparse(filename, events=("start", "end"))
+            parsed = list(parser._iter_protocols(events))
+
+        self.assertEqual(len(scanned), len(parsed))
+        for (s, p) in zip(scanned, parsed):
+            self.assertIs(type(s), type(p))
+            self.assertEqual((s.input, s.output), (p.input, p.output))
+            if isinstance(p, protocol.Protocol):
+                self.assertEqual((s.send, s.recv), (p.send, p.recv))
+        return scanned
+
+    def _assertLogError(self, text, message):
+        with self.assertRaises(parser.LogError) as cm:
+            self._iter_text(text)
+        self.assertEqual(str(cm.exception), message)
+
+    def test_scanner(self):
+        text = self._read_log()
+        n = len(self._iter_text(text))
+
+        # Unusual but valid logs are parsed with ElementTree.
+        unusual = [
+            text.replace("</mult>", "</mult><!-- comment -->", 1),
+            text.replace("<input>", "<input><!-- comment -->", 1),
+            text.replace("<value>0</value>", "<value> 0 </value>"),
+            text.replace("<value>0</value>", "<value>&#48;</value>"),
+            text.replace("<sub>", "<sub >"),
+            text.replace("<add>", "<add><!-- </add> -->", 1),
+            text.replace('encoding="UTF-8"', 'encoding="ISO-8859-1"'),
+        ]
+        for t in unusual:
+            self.assertEqual(len(self._iter_text(t)), n)
+
+        self._assertLogError(text.replace("<value>0</value>", "<value>4294967296</value>", 1),
+                "<value> contains unsupported value")
+        self._assertLogError(text.replace("<sub>", "<div>", 1).replace("</sub>", "</div>", 1),
+                "unknown protocol <div>")
+        self._assertLogError(text.replace("<vector>", "<vec>", 1).replace("</vector>", "</vec>", 1),
+                "expected <vector>, but got <vec>")
+        self._assertLogError(text.replace('<send node="prev">', "<send>", 1),
+                "<send> element without \"node\" attribute")
+        self._assertLogError(text[: len(text) // 2], "XML parsing failed")
+        self._assertLogError("", "XML parsing failed")
+
 if __name__ == "__main__":
     unittest.main()
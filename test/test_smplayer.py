@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import unittest
+import os
+
+import smplayer.core as smplayer
+import smplayer.core._vector as vector
+
+class TestSMPlayer(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+
+    def test_streaming(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+
+        streaming = smplayer.SMPlayer()
+        streaming.open(self._filename, streaming=True)
+        self.assertIsNone(streaming.protocols)
+
+        self.assertTrue(streaming.verify(), "Streamed log did not verify")
+        self.assertEqual(streaming.hash(), player.hash())
+        self.assertEqual(len(list(streaming.iter_protocols())), len(player.protocols))
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_arrays(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+
+        arrays = smplayer.SMPlayer()
+        arrays.open(self._filename, arrays=True)
+
+        self.assertTrue(arrays.verify(), "Log with arrays did not verify")
+        self.assertEqual(arrays.hash(), player.hash())
+        self.assertEqual(arrays.hash(version=2), player.hash(version=2))
+
+    def test_audit(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        hashes = player.hash()
+
+        streaming = smplayer.SMPlayer()
+        streaming.open(self._filename, streaming=True)
+        self.assertEqual(streaming.audit(), (True, [], hashes, None))
+        self.assertEqual(streaming.audit(batch_size=4, jobs=2), (True, [], hashes, None))
+
+    def test_hash_versions(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+
+        legacy = player.hash()
+        binary = player.hash(version=2)
+        self.assertEqual(player.hash(version=1), legacy)
+        self.assertEqual(len(binary.recv_computing), len(legacy.recv_computing))
+        self.assertNotEqual(binary.send_next, legacy.send_next)
+        self.assertEqual(player.audit(hash_version=2).hashes, binary)
+
+        with self.assertRaises(ValueError):
+            player.hash(version=3)
+
+    def test_failures(self):
+        player = smplayer.SMPlayer()
+        player.open(self._filename)
+        self.assertTrue(player.verify())
+        self.assertEqual(player.failures, [])
+
+        player.protocols[9].output[0] ^= 1
+        player.protocols[22].output[0] ^= 1
+        for p in player.protocols:
+            p.clear_cache()
+
+        self.assertFalse(player.verify())
+        self.assertEqual(player.failures, [9, 22])
+
+        player.chunk_size = 4
+        self.assertFalse(player.verify(jobs=2))
+        self.assertEqual(player.failures, [9, 22])
+
+        self.assertFalse(player.verify(batch_size=3, jobs=3))
+        self.assertEqual(player.failures, [9, 22])
+
+    def test_cache_results(self):
+        player = smplayer.SMPlayer()
+        player.cache_results = False
+        player.open(self._filename)
+        self.assertTrue(player.verify())
+        self.assertTrue(all(p._cached is None for p in player.protocols))
+
+        player.protocols[9].output[0] ^= 1
+        player.protocols[13].output[0] ^= 1
+        self.assertFalse(player.verify())
+        self.assertEqual(player.failures, [9, 13])
+        self.assertTrue(all(p._cached is None for p in player.protocols))
+        # The trace of a failing protocol is still available on demand.
+        self.assertNotEqual(player.protocols[13].result.output, player.protocols[13].output)
+
+    def test_empty(self):
+        player = smplayer.SMPlayer()
+        self.assertTrue(player.verify())
+        self.assertIsNone(player.hash())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import json
+import os
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._filename = basedir + "data/audit.log"
+        self._protocols = parser.parse_log(self._filename)
+        self._types = {type(p).__name__ for p in self._protocols}
+
+    def _audit(self, streaming=False, batch_size=None):
+        player = smplayer.SMPlayer()
+        player.stats = smplayer.Stats()
+        player.open(self._filename, streaming=streaming)
+        result = player.audit(batch_size=batch_size)
+        return (player.stats, result)
+
+    def test_phases(self):
+        for streaming in (False, True):
+            (stats, _) = self._audit(streaming=streaming)
+            self.assertEqual(stats._order(), ["parse", "construct", "simulate", "compare", "hash"])
+            for phase in ("parse", "construct", "simulate", "compare", "hash"):
+                total = stats.total(phase)
+                self.assertEqual(total.count, len(self._protocols))
+                self.assertGreaterEqual(total.wall, 0)
+                self.assertEqual(set(stats.phases[phase]) - {"*"}, self._types)
+            self.assertEqual(stats.total("parse").bytes, os.path.getsize(self._filename))
+            self.assertEqual(stats.total("simulate").values, stats.total("parse").values)
+
+    def test_passes(self):
+        player = smplayer.SMPlayer()
+        player.stats = smplayer.Stats()
+        player.open(self._filename, streaming=True)
+        for _ in range(0, 2):
+            self.assertEqual(len(list(player.iter_protocols())), len(self._protocols))
+        # Every pass is counted, but the log only once.
+        self.assertEqual(player.stats.total("parse").count, 2 * len(self._protocols))
+        self.assertEqual(player.stats.total("parse").bytes, os.path.getsize(self._filename))
+
+    def test_batch(self):
+        (stats, result) = self._audit(batch_size=4)
+        self.assertEqual(result, self._audit()[1])
+        self.assertNotIn("simulate", stats.phases)
+        self.assertEqual(stats.total("verify").count, len(self._protocols))
+
+    def test_json(self):
+        (stats, _) = self._audit()
+        data = json.loads(stats.to_json())
+        self.assertEqual(list(data), stats._order())
+        self.assertEqual(data["hash"]["total"]["count"], len(self._protocols))
+        self.assertEqual(set(data["simulate"]["types"]), self._types)
+        self.assertIn("Multiplication", stats.format())
+
+    def test_recording(self):
+        stats = smplayer.Stats()
+        with stats.recording():
+            protocols = parser.parse_log(self._filename)
+        self.assertEqual(stats.total("construct").count, len(protocols))
+        parser.parse_log(self._filename)
+        self.assertEqual(stats.total("construct").count, len(protocols))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -51,5 +51,13 @@ class TestSubtractionProtocol(unittest.TestCase):
         self.assertFalse(self._sub.verify(), "Verification did not fail: " \
                 "got result {0}".format(self._sub.result))
 
+    def test_check(self):
+        self.assertTrue(self._sub.check())
+        self.assertIsNone(self._sub._cached, "check() cached the simulation result")
+
+        self._sub.output[0] = 0  # Break the expected output.
+        self.assertFalse(self._sub.check())
+        self.assertFalse(self._sub.verify())
+
 if __name__ == "__main__":
     unittest.main()
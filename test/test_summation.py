@@ -51,5 +51,13 @@ class TestSummationProtocol(unittest.TestCase):
         self.assertFalse(self._sum.verify(), "Verification did not fail: " \
                 "got result {0}".format(self._sum.result))
 
+    def test_check(self):
+        self.assertTrue(self._sum.check())
+        self.assertIsNone(self._sum._cached, "check() cached the simulation result")
+
+        self._sum.output[0] = 0  # Break the expected output.
+        self.assertFalse(self._sum.check())
+        self.assertFalse(self._sum.verify())
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+import random
+import unittest
+
+import smplayer.core._vector as vector
+import smplayer.core.protocol as protocol
+
+def _random_vector(rand, n):
+    return [rand.randrange(2**32) for _ in range(0, n)]
+
+def _random_protocols(rand, n, context):
+    """Returns a random instance of every protocol with vectors of length *n*."""
+    vec = lambda: _random_vector(rand, n)
+    vecs = lambda k: tuple(vec() for _ in range(0, k))
+    return [
+        protocol.Addition(vecs(2), vec(), context),
+        protocol.Subtraction(vecs(2), vec(), context),
+        protocol.Summation(vec() + vec(), vec()[:2], context),
+        protocol.Multiplication(vecs(2), vec(),
+                { "prev": vecs(2), "next": vecs(3) },
+                { "prev": vecs(3), "next": vecs(2) }, context),
+        protocol.Declassification(vec(), vec(),
+                { "next": vec(), "remote": vec() },
+                { "prev": vec(), "computing": vecs(context.computing - 1) }, context),
+    ]
+
+def _to_arrays(p, mod):
+    """Returns a copy of the protocol *p* with all vectors converted to arrays."""
+    to_array = lambda v: vector.array(v) if isinstance(v, list) else tuple(map(to_array, v))
+    args = [to_array(p.input), to_array(p.output)]
+    if isinstance(p, protocol.Protocol):
+        args.append({ k: to_array(v) for (k, v) in p.send.items() })
+        args.append({ k: to_array(v) for (k, v) in p.recv.items() })
+    return type(p)(*args, context=p.context)
+
+@unittest.skipIf(vector.numpy is None, "NumPy is not available")
+class TestArraySimulation(unittest.TestCase):
+
+    def test_simulate(self):
+        rand = random.Random(1)
+        for mod in (2**32, 2**16, 1000, 2**32 - 5, 2**40):
+            context = protocol.Context(mod=mod, computing=3)
+            for p in _random_protocols(rand, 16, context):
+                a = _to_arrays(p, mod)
+                self.assertTrue(vector.is_array(a.input) or vector.is_array(a.input[0]))
+                self.assertTrue(vector.equal(a.result, p.result),
+                        "{0} differs for mod {1}".format(type(p).__name__, mod))
+
+    def test_verify(self):
+        rand = random.Random(2)
+        for p in _random_protocols(rand, 4, protocol.Context(mod=2**32, computing=3)):
+            # Use the simulated values as the expected values.
+            if isinstance(p, protocol.Protocol):
+                p = type(p)(p.input, vector.tolist(p.result.output), p.result.send, p.recv)
+            else:
+                p = type(p)(p.input, vector.tolist(p.result))
+            a = _to_arrays(p, 2**32)
+            self.assertTrue(p.verify())
+            self.assertTrue(a.verify(), "{0} with arrays did not verify".format(type(p).__name__))
+
+            a.output[0] ^= 1  # Break the expected output.
+            a.clear_cache()
+            self.assertFalse(a.verify())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+Copyright (c) 2014, Cybernetica AS, STACC
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this
+   list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice,
+   this list of conditions and the following disclaimer in the documentation
+   and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+   may be used to endorse or promote products derived from this software
+   without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+import os
+import tempfile
+import unittest
+
+import smplayer.core as smplayer
+import smplayer.core._parser as parser
+import smplayer.core._vector as vector
+import smplayer.core._verdicts as verdicts
+
+class TestVerdicts(unittest.TestCase):
+
+    def setUp(self):
+        basedir = os.path.dirname(__file__)
+        if basedir:
+            basedir += '/'
+        self._log = basedir + "data/audit.log"
+        self._protocols = parser.parse_log(self._log)
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._tmpdir.name, "verdicts.db")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_digest(self):
+        digests = [verdicts.protocol_digest(p) for p in self._protocols]
+        self.assertEqual(digests, [verdicts.protocol_digest(p) for p in parser.parse_log(self._log)])
+
+        protocol = parser.parse_log(self._log)[9]
+        protocol.output[0] ^= 1
+        self.assertNotEqual(verdicts.protocol_digest(protocol), digests[9])
+
+    @unittest.skipIf(vector.numpy is None, "NumPy is not available")
+    def test_digest_arrays(self):
+        self.assertEqual([verdicts.protocol_digest(p) for p in parser.parse_log(self._log, arrays=True)],
+                [verdicts.protocol_digest(p) for p in self._protocols])
+
+    def test_cache(self):
+        with smplayer.VerdictCache(self._filename, max_entries=3) as cache:
+            cache.store([(b"a", True), (b"b", False)])
+            self.assertEqual(cache.lookup([b"a", b"b", b"c"]), {b"a": True, b"b": False})
+            cache.lookup([b"a"])
+            cache.store([(b"c", True), (b"d", True)])
+            # b was used least recently.
+            self.assertEqual(len(cache), 3)
+            self.assertEqual(cache.lookup([b"a", b"b", b"c", b"d"]), {b"a": True, b"c": True, b"d": True})
+
+        with smplayer.VerdictCache(self._filename) as cache:
+            self.assertEqual(cache.lookup([b"a", b"b"]), {b"a": True})
+        with self.assertRaises(ValueError):
+            smplayer.VerdictCache(self._filename, max_entries=0)
+
+    def test_player(self):
+        protocols = list(parser.parse_log(self._log))
+        protocols[9].output[0] ^= 1
+        expected = smplayer.SMPlayer()
+        expected.protocols = protocols
+        expected.verify()
+        self.assertIn(9, expected.failures)
+
+        simulated = []
+        class Player(smplayer.SMPlayer):
+            def _simulate_failures(self, protocols, batch_size, jobs):
+                simulated.extend(protocols)
+                return super()._simulate_failures(protocols, batch_size, jobs)
+
+        for batch_size in (None, 4):
+            with smplayer.VerdictCache(self._filename) as cache:
+                player = Player()
+                player.cache_window = 4
+                player.verdict_cache = cache
+                player.protocols = protocols
+                simulated.clear()
+                self.assertFalse(player.verify(batch_size=batch_size))
+                self.assertEqual(player.failures, expected.failures)
+                if batch_size is None:
+                    self.assertEqual(len(simulated), len(protocols))
+                else:
+                    self.assertEqual(simulated, [])
+
+if __name__ == "__main__":
+    unittest.main()